@@ -1,28 +1,88 @@
+import argparse
+import importlib
+import json
+import os
 import random
+import subprocess
 import sys
-import os
-import numpy as np
+import time
+from contextlib import redirect_stdout
+from functools import partial
+from pathlib import Path
 from typing import List, Callable
 
-from src.models.basics import Utilisateur
-from src.simulation.waterfall.infinite import WaterfallMoulinetteInfinite
-from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
-from src.simulation.waterfall.backup import WaterfallMoulinetteFiniteBackup
-from src.simulation.channels_dams.channelsdams import ChannelsAndDams
-from src.simulation.priority import run_priority_sim # My addition
-from src.scenarios.scenario5_comparison import compare_theory_sim # My addition
+# Heavy modules (numpy, simpy, the simulators, matplotlib, scipy) are imported
+# by the functions that need them, so that `python main.py list` or a quick
+# `python main.py simulate` does not load the whole plotting stack.
+
+USER_LOADS = {"normal": 30, "high": 60} # Reduced for speed in this demo environment
+
+CONFIG_INFINITE = {
+    "base": {"K": 3, "process_time": 2, "result_time": 1, "tag_limit": 5, "nb_exos": 5},
+}
+
+CONFIG_FINITE = {
+    "standard": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 10, "nb_exos": 5},
+}
+
+CONFIG_BACKUP = {
+    "with_backup": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 5, "nb_exos": 5},
+}
+
+CONFIG_CHANNELS = {
+    "regulated": {"K": 3, "process_time": 2, "result_time": 1, "ks": 15, "kf": 8, "tb": 10, "block_option": True, "nb_exos": 5},
+    "not_regulated": {"K": 3, "process_time": 2, "result_time": 1, "ks": 15, "kf": 8, "tb": 10, "block_option": False, "nb_exos": 5},
+}
+
+# name -> (module, class, default configs)
+ARCHITECTURES = {
+    "infinite": ("src.simulation.waterfall.infinite", "WaterfallMoulinetteInfinite", CONFIG_INFINITE),
+    "finite": ("src.simulation.waterfall.finite", "WaterfallMoulinetteFinite", CONFIG_FINITE),
+    "backup": ("src.simulation.waterfall.backup", "WaterfallMoulinetteFiniteBackup", CONFIG_BACKUP),
+    "channels": ("src.simulation.channels_dams.channelsdams", "ChannelsAndDams", CONFIG_CHANNELS),
+}
+
+# --profile modes (cf. src.utils.profiling) and output of the merged profile of the cases
+PROFILE_MODES = ("deterministic", "sampling")
+CASES_PROFILE = "output/profiles/cases"
+
+# budget of `import main` (the CLI start-up), in seconds
+IMPORT_BUDGET = 0.3
+HEAVY_MODULES = ("matplotlib", "scipy", "numpy", "simpy")
+
+
+def load_architecture(name: str):
+    """Moulinette class from its short name (infinite, finite, backup, channels) or class name"""
+    for short, (module, class_name, _) in ARCHITECTURES.items():
+        if name in (short, class_name):
+            return getattr(importlib.import_module(module), class_name)
+    raise ValueError(f"Unknown architecture: {name} (choose among {', '.join(ARCHITECTURES)})")
+
+
+def default_configs(name: str) -> dict:
+    for short, (_, class_name, configs) in ARCHITECTURES.items():
+        if name in (short, class_name):
+            return configs
+    raise ValueError(f"Unknown architecture: {name}")
+
 
 def generate_users_names(n: int):
     return ["USER" + str(i) for i in range(n)]
 
-def create_user_list(names: List[str], promo_ratio=0.5) -> List[Utilisateur]:
+def create_user_list(names: List[str], promo_ratio=0.5) -> List:
+    from src.models.basics import Utilisateur
+
     users = []
     for name in names:
         promo = "ING" if random.random() < promo_ratio else "PREPA"
         users.append(Utilisateur(name=name, promo=promo))
     return users
 
-def launch_test(moulinette, user_list, until=None, save_filename="metrics.png"):
+def prepare_test(moulinette, user_list):
+    """Add the users and the background processes of the architecture"""
+    from src.simulation.channels_dams.channelsdams import ChannelsAndDams
+    from src.simulation.waterfall.backup import WaterfallMoulinetteFiniteBackup
+
     for user in user_list:
         moulinette.add_user(user)
 
@@ -32,83 +92,366 @@ def launch_test(moulinette, user_list, until=None, save_filename="metrics.png"):
     if isinstance(moulinette, WaterfallMoulinetteFiniteBackup) or isinstance(moulinette, ChannelsAndDams):
         moulinette.env.process(moulinette.free_backup())
 
-    moulinette.start_simulation(until=until, save_filename=save_filename)
+def launch_test(moulinette, user_list, until=None, save_filename="metrics.png"):
+    prepare_test(moulinette, user_list)
+    return moulinette.start_simulation(until=until, save_filename=save_filename)
+
+def exec_simulations(nb_user: int, module: Callable, configs: dict, promo_ratio: float = 0.7, seed: int = 42, trace: bool = False, instrument: bool = False):
+    import numpy as np
+    from src.utils.cache import default_cache
+    from src.utils.checkpoint import SweepJournal
 
-def exec_simulations(nb_user: int, module: Callable, configs: dict, promo_ratio: float = 0.7):
+    cache = default_cache()
+    base_path = f"output/{module.__name__}"
+    # the completed cells of an interrupted sweep are not run again when it restarts
+    journal = SweepJournal(f"{base_path}/sweep.jsonl", enabled=cache.enabled)
     for key in configs.keys():
+        cache_key = cache.key(
+            module, {"config": configs[key], "nb_user": nb_user, "promo_ratio": promo_ratio}, seed
+        )
+        log_file = f"{base_path}/files/U{nb_user}_{key}.txt"
+        graph_file = f"{base_path}/graphs/U{nb_user}_{key}.png"
+        # a known result only skips the cell while its log and plots are on disk;
+        # a trace or an instrumentation summary can only come from an actual run
+        fresh_run = trace or instrument or not (os.path.exists(log_file) and os.path.exists(graph_file))
+        if not fresh_run and cache_key in journal:
+            print(f"Running {module.__name__} - {key} ({nb_user} users)... (done)")
+            continue
+        if not fresh_run and cache.get(cache_key) is not None:
+            print(f"Running {module.__name__} - {key} ({nb_user} users)... (cached)")
+            continue
+
+        random.seed(seed)
+        np.random.seed(seed)
         user_list = create_user_list(generate_users_names(nb_user), promo_ratio)
         m_config = module(**configs[key])
-        
-        base_path = f"output/{m_config.__class__.__name__}"
+
         os.makedirs(f"{base_path}/files", exist_ok=True)
         os.makedirs(f"{base_path}/graphs", exist_ok=True)
+        if trace:
+            m_config.enable_trace(f"{base_path}/traces/U{nb_user}_{key}")
+        if instrument:
+            m_config.enable_instrumentation(f"{base_path}/files/U{nb_user}_{key}.perf.json")
 
-        log_file = f"{base_path}/files/U{len(user_list)}_{key}.txt"
-        graph_file = f"{base_path}/graphs/U{len(user_list)}_{key}.png"
-        
         print(f"Running {m_config.__class__.__name__} - {key} ({nb_user} users)...")
-        
-        old_stdout = sys.stdout
-        with open(log_file, "w") as f:
-            sys.stdout = f
-            launch_test(m_config, user_list, until=None, save_filename=graph_file)
-        sys.stdout = old_stdout
-
-if __name__ == "__main__":
-    random.seed(42)
-    np.random.seed(42)
-
-    user_loads = {"normal": 30, "high": 60} # Reduced for speed in this demo environment
 
-    config_infinite = {
-        "base": {"K": 3, "process_time": 2, "result_time": 1, "tag_limit": 5, "nb_exos": 5},
-    }
+        with open(log_file, "w") as f, redirect_stdout(f):
+            result = launch_test(m_config, user_list, until=None, save_filename=graph_file)
 
-    config_finite = {
-        "standard": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 10, "nb_exos": 5},
-    }
+        cache.put(cache_key, result)
+        journal.record(cache_key, result)
+    journal.clear()
 
-    config_backup = {
-        "with_backup": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 5, "nb_exos": 5},
-    }
-
-    config_channels = {
-        "regulated": {"K": 3, "process_time": 2, "result_time": 1, "ks": 15, "kf": 8, "tb": 10, "block_option": True, "nb_exos": 5},
-        "not_regulated": {"K": 3, "process_time": 2, "result_time": 1, "ks": 15, "kf": 8, "tb": 10, "block_option": False, "nb_exos": 5},
-    }
 
-    print("=== Starting Improved Moulinette Simulations ===")
-    
-    print("\n[Case 1: Waterfall Infinite]")
-    exec_simulations(user_loads["normal"], WaterfallMoulinetteInfinite, config_infinite)
+def case_waterfall_infinite():
+    exec_simulations(USER_LOADS["normal"], load_architecture("infinite"), CONFIG_INFINITE)
 
-    print("\n[Case 2: Waterfall Finite]")
-    exec_simulations(user_loads["normal"], WaterfallMoulinetteFinite, config_finite)
+def case_waterfall_finite():
+    exec_simulations(USER_LOADS["normal"], load_architecture("finite"), CONFIG_FINITE)
 
-    print("\n[Case 3: Waterfall Finite with Backup]")
-    exec_simulations(user_loads["normal"], WaterfallMoulinetteFiniteBackup, config_backup)
+def case_waterfall_backup():
+    exec_simulations(USER_LOADS["normal"], load_architecture("backup"), CONFIG_BACKUP)
 
-    print("\n[Case 4: Channels and Dams]")
-    exec_simulations(user_loads["normal"], ChannelsAndDams, config_channels)
+def case_channels():
+    exec_simulations(USER_LOADS["normal"], load_architecture("channels"), CONFIG_CHANNELS)
 
-    print("\n[Case 5: Theoretical Comparison]")
+def case_theory_comparison():
     from src.scenarios.scenario5_comparison import compare_theory_sim
     compare_theory_sim()
 
-    print("\n[Case 6: Comparison Plots]")
+def case_theory_plots():
     from src.scenarios.scenario6_theory_plots import generate_comparison_plots
     generate_comparison_plots()
 
-    print("\n[Case 7: Cost Analysis - Scaling W.Finite]")
+def case_cost_finite():
     from src.scenarios.scenario_cost import analyze_server_costs
     analyze_server_costs()
 
-    print("\n[Case 8: Cost Analysis - All Architectures]")
+def case_cost_architectures():
     from src.scenarios.scenario_all_architectures import compare_all_architectures
     compare_all_architectures()
 
-    print("\n[Case 9: Cost Analysis - Scaling All Architectures]")
+def case_cost_scaling():
     from src.scenarios.scenario_all_scaling import analyze_all_architectures_scaling
     analyze_all_architectures_scaling()
 
-    print("\nSimulation complete. Outputs are in 'output/' directory.")
\ No newline at end of file
+# number -> (title, function, cases to run before)
+# Case 9 sweeps the W.Finite cells of case 7 and the K=3/K=4 cells of case 8:
+# run after them, it reads those cells from the result cache instead of simulating them twice.
+CASES = {
+    1: ("Waterfall Infinite", case_waterfall_infinite, ()),
+    2: ("Waterfall Finite", case_waterfall_finite, ()),
+    3: ("Waterfall Finite with Backup", case_waterfall_backup, ()),
+    4: ("Channels and Dams", case_channels, ()),
+    5: ("Theoretical Comparison", case_theory_comparison, ()),
+    6: ("Comparison Plots", case_theory_plots, ()),
+    7: ("Cost Analysis - Scaling W.Finite", case_cost_finite, ()),
+    8: ("Cost Analysis - All Architectures", case_cost_architectures, ()),
+    9: ("Cost Analysis - Scaling All Architectures", case_cost_scaling, (7, 8)),
+}
+
+
+def disable_cache():
+    """Recompute every simulation: no cache or journal hit, here and in the case workers"""
+    os.environ["ERO2_NO_CACHE"] = "1"
+
+def seed_all(seed: int):
+    import numpy as np
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+def run_cases(numbers: List[int], seed: int = 42, jobs: int = 1, profile: str = None) -> bool:
+    """
+    Run some of the cases: in this process one after the other (``jobs=1``), or
+    as a task graph on ``jobs`` worker processes. In parallel, each case is seeded
+    on its own and its output is captured, then printed as one block when it ends.
+
+    :param profile: "deterministic" or "sampling" to profile the simulation phase of
+        every case; the per-case profiles are merged in output/profiles/cases at the end.
+    :return: True if every case succeeded.
+    """
+    cases = {number: CASES[number][1] for number in numbers}
+    if profile:
+        from src.utils.profiling import profile_call, reset_profiles
+
+        reset_profiles(CASES_PROFILE)
+        # each case saves its own part (in its worker), merged once they are all done
+        cases = {
+            number: partial(profile_call, case, mode=profile, directory=CASES_PROFILE, merge=False)
+            for number, case in cases.items()
+        }
+
+    if jobs <= 1:
+        seed_all(seed)
+        for number in numbers:
+            print(f"\n[Case {number}: {CASES[number][0]}]")
+            cases[number]()
+        ok = True
+    else:
+        from src.utils.taskgraph import Task, print_timings, run_graph
+
+        names = {number: f"Case {number}: {CASES[number][0]}" for number in numbers}
+        tasks = [
+            Task(names[number], cases[number], tuple(names[dep] for dep in CASES[number][2] if dep in names), seed)
+            for number in numbers
+        ]
+
+        def report(result):
+            print(f"\n[{result.name}] ({result.wall:.1f}s)")
+            print(result.output, end="")
+            if not result.ok:
+                print(result.error, end="")
+
+        start = time.time()
+        results = run_graph(tasks, workers=jobs, on_done=report)
+        print_timings(tasks, results, time.time() - start)
+        ok = all(result.ok for result in results.values())
+
+    if profile:
+        from src.utils.profiling import merge_profiles
+
+        print(f"\nProfile ({profile}): {merge_profiles(CASES_PROFILE)['hot_functions']}")
+    return ok
+
+
+def load_config(path) -> dict:
+    """JSON or TOML config file"""
+    path = Path(path)
+    if path.suffix == ".toml":
+        import tomllib
+
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+def parse_overrides(items: List[str]) -> dict:
+    """KEY=VALUE pairs, values read as JSON when possible (4, 2.5, true, "text")"""
+    overrides = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected KEY=VALUE, got: {item}")
+        try:
+            overrides[key] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[key] = value
+    return overrides
+
+
+def simulate(architecture: str, config: dict, nb_user: int, promo_ratio: float = 0.7, seed: int = 42,
+             until=None, plot: str = None, trace: str = None, instrument: str = None):
+    """
+    One run of one architecture, without the cache and (unless ``plot``) without matplotlib.
+
+    :return: compact result of the run.
+    """
+    seed_all(seed)
+    moulinette = load_architecture(architecture)(**config)
+    moulinette.verbose = False
+    if trace:
+        moulinette.enable_trace(trace)
+    if instrument:
+        moulinette.enable_instrumentation(instrument)
+    prepare_test(moulinette, create_user_list(generate_users_names(nb_user), promo_ratio))
+    if plot:
+        with open(os.devnull, "w") as f, redirect_stdout(f):
+            return moulinette.start_simulation(until=until, save_filename=plot)
+
+    moulinette.run_simulation(until)
+    if moulinette.instrumentation is not None:
+        moulinette.instrumentation.write(instrument, label=type(moulinette).__name__)
+    return moulinette.result()
+
+
+def measure_import_time(module: str = "main") -> dict:
+    """
+    Import time of a module in a fresh interpreter (python -X importtime).
+
+    :return: total time (s), heavy modules imported, slowest imports.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # the nesting depth is the indentation after the single separating space
+        imports.append((name.rstrip()[1:], int(cumulative) / 1e6))
+    top_level = [(name, seconds) for name, seconds in imports if not name.startswith(" ")]
+    loaded = {name.strip().split(".")[0] for name, _ in imports}
+    return {
+        "module": module,
+        "total": sum(seconds for _, seconds in top_level),
+        "heavy": sorted(loaded & set(HEAVY_MODULES)),
+        "slowest": sorted(top_level, key=lambda item: -item[1])[:10],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Moulinette simulations")
+    commands = parser.add_subparsers(dest="command")
+
+    all_command = commands.add_parser("all", help="run the nine cases (default)")
+    commands.add_parser("list", help="list the cases and the architectures")
+
+    case = commands.add_parser("case", help="run some of the cases")
+    case.add_argument("numbers", type=int, nargs="+", choices=sorted(CASES))
+
+    for command in (all_command, case):
+        command.add_argument(
+            "--jobs", "-j", type=int, default=os.cpu_count() or 1,
+            help="worker processes, independent cases run concurrently (default: one per core, 1: sequential)",
+        )
+
+    for name, help_text in (("simulate", "one run of one architecture"), ("sweep", "exec_simulations over a set of configs")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("architecture", help=f"{', '.join(ARCHITECTURES)} or class name")
+        command.add_argument("--config", help="JSON/TOML file (simulate: arguments of the class, sweep: name -> arguments)")
+        command.add_argument("--users", type=int, default=USER_LOADS["normal"])
+        command.add_argument("--promo-ratio", type=float, default=0.7)
+        command.add_argument("--seed", type=int, default=42)
+
+    simulate_command = commands.choices["simulate"]
+    simulate_command.add_argument("--set", nargs="*", metavar="KEY=VALUE", help="override config values (ex: K=6 ks=30)")
+    simulate_command.add_argument("--until", type=float, default=None)
+    simulate_command.add_argument("--plot", help="save the metric plots to this file")
+    simulate_command.add_argument("--trace", help="trace directory")
+    simulate_command.add_argument("--instrument", help="instrumentation summary (JSON file)")
+    simulate_command.add_argument("--json", action="store_true", help="print the result as one JSON row")
+
+    sweep_command = commands.choices["sweep"]
+    sweep_command.add_argument("--trace", action="store_true")
+    sweep_command.add_argument("--instrument", action="store_true")
+
+    for command in (all_command, case, simulate_command, sweep_command):
+        command.add_argument(
+            "--profile", choices=PROFILE_MODES,
+            help="profile the simulation phase (merged report in output/profiles/)",
+        )
+
+    for command in (all_command, case, sweep_command):
+        command.add_argument("--fresh", action="store_true", help="ignore the result cache and the sweep journals (ERO2_NO_CACHE=1)")
+
+    import_time = commands.add_parser("import-time", help="measure the start-up import time against its budget")
+    import_time.add_argument("modules", nargs="*", default=["main"])
+    import_time.add_argument("--budget", type=float, default=IMPORT_BUDGET, help="seconds")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "fresh", False):
+        disable_cache()
+
+    if args.command in (None, "all"):
+        print("=== Starting Improved Moulinette Simulations ===")
+        ok = run_cases(
+            sorted(CASES), jobs=getattr(args, "jobs", os.cpu_count() or 1), profile=getattr(args, "profile", None)
+        )
+        print("\nSimulation complete. Outputs are in 'output/' directory.")
+        sys.exit(0 if ok else 1)
+
+    elif args.command == "list":
+        print("Cases:")
+        for number, (title, _, deps) in CASES.items():
+            after = f" (after {', '.join(map(str, deps))})" if deps else ""
+            print(f"  {number}. {title}{after}")
+        print("Architectures:")
+        for short, (_, class_name, configs) in ARCHITECTURES.items():
+            print(f"  {short:<9} {class_name} (configs: {', '.join(configs)})")
+
+    elif args.command == "case":
+        sys.exit(0 if run_cases(args.numbers, jobs=args.jobs, profile=args.profile) else 1)
+
+    elif args.command == "simulate":
+        config = load_config(args.config) if args.config else next(iter(default_configs(args.architecture).values()))
+        config = {**config, **parse_overrides(args.set)}
+        run = simulate
+        if args.profile:
+            from src.utils.profiling import profile_call
+
+            run = partial(profile_call, simulate, mode=args.profile)
+        result = run(
+            args.architecture, config, args.users, args.promo_ratio, args.seed,
+            until=args.until, plot=args.plot, trace=args.trace, instrument=args.instrument,
+        )
+        if args.json:
+            print(json.dumps(result.to_row()))
+        else:
+            total = result.stage("total")
+            print(f"{result.engine}: {result.total_requests} pushes, {result.completed} completed")
+            print(f"- refused: {result.rejection_rate:.2%}, blank pages: {result.blank_page_rate:.2%}")
+            print(f"- throughput: {result.throughput:.4f} per time unit over {result.duration:.0f}")
+            print(f"- total sojourn: avg {total.avg:.2f}, p95 {total.p95:.2f}")
+
+    elif args.command == "sweep":
+        configs = load_config(args.config) if args.config else default_configs(args.architecture)
+        run = exec_simulations
+        if args.profile:
+            from src.utils.profiling import profile_call
+
+            run = partial(profile_call, exec_simulations, mode=args.profile)
+        run(
+            args.users, load_architecture(args.architecture), configs, args.promo_ratio, args.seed,
+            trace=args.trace, instrument=args.instrument,
+        )
+
+    elif args.command == "import-time":
+        over = False
+        for module in args.modules:
+            report = measure_import_time(module)
+            status = "ok" if report["total"] <= args.budget else "OVER BUDGET"
+            over |= report["total"] > args.budget
+            print(f"import {module}: {report['total']:.3f}s (budget {args.budget:.3f}s) {status}")
+            print(f"  heavy modules loaded: {', '.join(report['heavy']) or 'none'}")
+            for name, seconds in report["slowest"][:5]:
+                print(f"  {seconds:.3f}s {name.strip()}")
+        sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
-from typing import List
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Sequence
+import copy
+import dataclasses
+import itertools
 import simpy
 import random
-import string
 
-from src.utils.metrics import QueueMetrics
+import numpy as np
+
+from src.simulation.autoscaling import Autoscaler, AutoscalerPolicy, ElasticResource
+from src.simulation.distributions import Distribution, ServiceMultiplier, as_distribution
+from src.simulation.failures import FailureModel
+from src.simulation.pipeline import Pipeline
+from src.simulation.rate_limit import TagLimiter
+from src.simulation.server_pool import ServerClass, ServerPool
+from src.utils.checkpoint import read_snapshot, write_snapshot
+from src.utils.instrumentation import Instrumentation
+from src.utils.metrics import QueueMetrics, RunResult
+from src.utils.trace import TraceWriter
 
 
 class Utilisateur:
@@ -14,6 +29,8 @@ class Utilisateur:
     :param promo: Promotion de l'étudiant.
     """
 
+    __slots__ = ("name", "promo", "current_exo", "intelligence", "last_chance", "next_push")
+
     def __init__(
         self,
         name: str,
@@ -23,6 +40,10 @@ class Utilisateur:
         self.promo = promo
         self.current_exo = 1
         self.intelligence = max(min(random.gauss(mu=0.6, sigma=0.075), 0.75), 0.2)
+        # chance de passer du prochain commit après un échec (None : intelligence)
+        self.last_chance = None
+        # date de fin de la réflexion en cours (reprise depuis un snapshot)
+        self.next_push = 0.0
 
     def __str__(self):
         return f"[{self.name} - {self.promo}]"
@@ -37,19 +58,31 @@ class Commit:
     :param exo: exercice du commit.
     """
 
+    __slots__ = ("user", "id", "date", "exo", "chance_to_pass")
+
+    # identifiants entiers, uniques dans le processus (aussi identifiants de job des métriques)
+    _ids = itertools.count()
+
     def __init__(
         self, user: Utilisateur, date: int, exo: int, chance_to_pass: float | None
     ):
         self.user = user
-        self.id = self._generate_id()
+        self.id = next(Commit._ids)
         self.date = date
         self.exo = exo
         self.chance_to_pass = (
             user.intelligence if chance_to_pass == None else chance_to_pass
         )
 
-    def _generate_id(self):
-        return "".join(random.choices(string.ascii_lowercase + string.digits, k=6))
+    @classmethod
+    def next_id(cls) -> int:
+        """Réserve et renvoie le prochain identifiant"""
+        return next(cls._ids)
+
+    @classmethod
+    def skip_ids(cls, start: int):
+        """Les prochains identifiants seront au moins ``start`` (reprise d'un snapshot)"""
+        cls._ids = itertools.count(max(start, next(cls._ids)))
 
     def __str__(self):
         return f"[{self.id} - exo {self.exo} - time {self.date}] by {self.user}"
@@ -60,43 +93,399 @@ class Moulinette:
     Initialise une instance de moulinette.
 
     :param K: Nombre de FIFOs pour les tests.
-    :param process_time: Temps de process d'un utilisateur dans la file de test.
-    :param result_time: Temps de process d'un utilisateur dans la file d'envoi.
-    :param tag_limit: Nombre de tag limite par heure (60 unités de temps).
+    :param process_time: Temps de process d'un utilisateur dans la file de test (nombre ou Distribution).
+    :param result_time: Temps de process d'un utilisateur dans la file d'envoi (nombre ou Distribution).
+    :param tag_limit: Nombre de tags ratés autorisés dans la fenêtre tag_window.
     :param nb_exos: Nombre d'exos par utilisateur.
+    :param front_servers: Nombre de serveurs d'envoi des résultats au front.
+    :param tag_window: Durée de la fenêtre glissante de la limite de tag (une heure de minutes de 2 unités par défaut).
     """
 
+    # traitement d'un commit, défini par chaque architecture (cf. src/simulation/pipeline.py)
+    pipeline: Pipeline | None = None
+
     def __init__(
         self,
         K: int = 10,
-        process_time: int = 1,
-        result_time: int = 1,
+        process_time: int | Distribution = 1,
+        result_time: int | Distribution = 1,
         tag_limit: int = 5,
         nb_exos: int = 10,
+        front_servers: int = 1,
+        tag_window: float = 120,
     ):
         self.env = simpy.Environment()
         self.test_server = simpy.Resource(self.env, capacity=K)
-        self.result_server = simpy.Resource(self.env, capacity=1)
+        self.result_server = simpy.Resource(self.env, capacity=front_servers)
         self.tag_limit = tag_limit
-        self.process_time = process_time
-        self.result_time = result_time
+        self.tag_window = tag_window
+        # lois des temps de service ; process_time / result_time en gardent la moyenne
+        self.test_distribution = as_distribution(process_time)
+        self.result_distribution = as_distribution(result_time)
+        self.process_time = self.test_distribution.mean
+        self.result_time = self.result_distribution.mean
+        # facteur du temps de test par promo / exercice
+        self.service_multiplier = ServiceMultiplier()
         self.nb_exos = nb_exos
         self.users: List[Utilisateur] = []
-        self.users_commit_time = {}  # user -> [timestep, ...] (maxlen tag_limit)
+        self.tag_limiter = TagLimiter(tag_limit, tag_window)
         self.backup_storage = simpy.FilterStore(self.env)
         self.metrics = QueueMetrics()
+        self.user_index = {}  # user name -> index in self.users
+        self.trace: TraceWriter | None = None
+        self._traced_jobs = 0
+        # compteurs d'événements et chronos des phases (cf. enable_instrumentation)
+        self.instrumentation: Instrumentation | None = None
+        self.instrumentation_path: str | None = None
+        # sources d'arrivées externes encore actives (ex: rejeu de logs)
+        self.open_sources = 0
+        self.autoscaler: Autoscaler | None = None
+        # processus de pannes (cf. enable_failures), arrêtés par collect_metrics
+        self.failure_processes = []
+        # fin de la simulation vue par collect_metrics (des timeouts de pannes peuvent la dépasser)
+        self.finished_at: float | None = None
+        self.deadline: float | None = None
+        # fichier des snapshots périodiques (cf. enable_checkpoints)
+        self.checkpoint_path: str | None = None
+        self.deadline_horizon = 0.0
+        self.deadline_min_factor = 1.0
+        # commits en cours de traitement (user_id -> commit), cf. snapshot
+        self.in_flight = {}
+        self.backup_in_flight = {}
+        # utilisateurs en attente d'un nouvel essai après un refus
+        self.orbit = 0
+        # journal détaillé des commits sur stdout (le formatage n'a lieu que s'il est actif)
+        self.verbose = True
+
+    def log(self, message: str, *args):
+        """
+        Écrit un message du journal de simulation, formaté seulement si verbose.
+
+        :param message: Message au format %.
+        :param args: Arguments du message.
+        """
+        if self.verbose:
+            print(message % args if args else message)
+
+    def set_deadline(self, deadline: float, horizon: float, min_factor: float = 0.3):
+        """
+        Active le comportement "rendu" : à l'approche de la deadline, les étudiants
+        réfléchissent moins longtemps entre deux push.
+
+        :param deadline: Date (temps de simulation) de la deadline.
+        :param horizon: Durée avant la deadline pendant laquelle le rythme s'accélère.
+        :param min_factor: Facteur appliqué au temps de réflexion à la deadline.
+        """
+        self.deadline = deadline
+        self.deadline_horizon = horizon
+        self.deadline_min_factor = min_factor
+
+    def set_retry_policy(self, policy):
+        """
+        Change le comportement des étudiants après un refus (attente, abandon).
+
+        :param policy: UniformRetry ou ExponentialBackoff (cf. src/simulation/pipeline.py).
+        """
+        behaviour = copy.copy(self.pipeline.behaviour)
+        behaviour.retry = policy
+        # le pipeline de la classe est partagé : la moulinette en garde sa propre copie
+        self.pipeline = dataclasses.replace(self.pipeline, behaviour=behaviour)
+
+    def think_time(self, mu: float, sigma: float) -> int:
+        """
+        Temps de réflexion (en minutes) avant le prochain push.
+
+        :param mu: Moyenne du temps de réflexion hors deadline.
+        :param sigma: Écart-type du temps de réflexion.
+        """
+        minutes = max(random.gauss(mu=mu, sigma=sigma), 1)
+        if self.deadline is not None and self.deadline_horizon > 0:
+            remaining = self.deadline - self.env.now
+            if 0 <= remaining < self.deadline_horizon:
+                factor = self.deadline_min_factor + (1 - self.deadline_min_factor) * (
+                    remaining / self.deadline_horizon
+                )
+                minutes = max(minutes * factor, 1)
+        return round(minutes)
+
+    def enable_trace(self, directory: str, chunk_size: int = 65536):
+        """
+        Active l'export colonnaire des jobs et de l'état du système (cf. TraceWriter).
+
+        :param directory: Dossier de sortie de la trace.
+        :param chunk_size: Nombre de lignes écrites par bloc.
+        """
+        self.trace = TraceWriter(directory, chunk_size=chunk_size)
+
+    def enable_instrumentation(self, path: str | None = None) -> Instrumentation:
+        """
+        Compte les événements SimPy de chaque type de processus et chronomètre les phases
+        de start_simulation (simulate, calculate_metrics, plot_metrics). Le résumé JSON est
+        écrit après chaque run.
+
+        :param path: Fichier du résumé (par défaut à côté du graphe : <graphe>.perf.json).
+        :return: L'instrumentation (résumé avec summary()).
+        """
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(self.env)
+        self.instrumentation_path = path
+        return self.instrumentation
+
+    def _phase(self, name: str):
+        """Chrono d'une phase du run si l'instrumentation est active"""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.phase(name)
+
+    def _trace_commit(
+        self,
+        commit: Commit,
+        user_id: int,
+        passed: int = -1,
+        blocked_test: bool = False,
+        blocked_result: bool = False,
+        backup: bool = False,
+    ):
+        """
+        Écrit l'enregistrement d'un commit dans la trace (si elle est active).
+        """
+        if self.trace is None:
+            return
+        m = self.metrics
+        nan = float("nan")
+        self.trace.write_job(
+            job=user_id,
+            user=self.user_index.get(commit.user.name, -1),
+            promo=commit.user.promo,
+            exo=commit.exo,
+            test_entry=nan if blocked_test else m.test_queue_entry_times.get(user_id, nan),
+            test_exit=nan if blocked_test else m.test_queue_exit_times.get(user_id, nan),
+            result_entry=m.result_queue_entry_times.get(user_id, nan),
+            result_exit=m.result_queue_exit_times.get(user_id, nan),
+            passed=passed,
+            blocked_test=blocked_test,
+            blocked_result=blocked_result,
+            backup=backup,
+        )
+        self._traced_jobs += 1
+
+    def _users_done(self) -> bool:
+        """
+        Vrai si plus aucun commit ne peut arriver (utilisateurs finis et sources externes fermées).
+        """
+        return self.open_sources == 0 and all(
+            user.current_exo > self.nb_exos for user in self.users
+        )
+
+    def _simulation_finished(self) -> bool:
+        """
+        Vrai si plus rien ne peut se passer : utilisateurs finis, backup et files vides.
+        """
+        return (
+            self._users_done()
+            and len(self.backup_storage.items) == 0
+            and self.test_server.count == 0
+            and len(self.test_server.queue) == 0
+            and self.result_server.count == 0
+            and len(self.result_server.queue) == 0
+        )
+
+    def enable_autoscaling(self, policy: AutoscalerPolicy) -> Autoscaler:
+        """
+        Remplace la ferme de test par un pool élastique piloté par la longueur de file.
+
+        :param policy: Politique de dimensionnement (cf. AutoscalerPolicy).
+        :return: L'autoscaler (compteurs de scale-up / scale-down).
+        """
+        if self.checkpoint_path is not None:
+            raise ValueError("An autoscaled run cannot be checkpointed")
+        capacity = min(max(self.test_server.capacity, policy.min_servers), policy.max_servers)
+        self.test_server = ElasticResource(self.env, capacity=capacity)
+        self.autoscaler = Autoscaler(self, policy)
+        self.env.process(self.autoscaler.run())
+        return self.autoscaler
+
+    def enable_server_pool(self, classes: Sequence[ServerClass], dispatch=None) -> ServerPool:
+        """
+        Remplace la ferme de test par des serveurs de vitesses différentes (ex: vieilles et nouvelles machines).
+
+        :param classes: Classes de serveurs (nombre, vitesse, prix).
+        :param dispatch: Politique d'affectation (FastestFree, RandomFree, SlowServerThreshold).
+        :return: Le pool (occupation et jobs par classe).
+        """
+        if self.autoscaler is not None:
+            raise ValueError("A heterogeneous pool cannot be autoscaled")
+        self.test_server = ServerPool(self.env, classes, dispatch)
+        return self.test_server
+
+    def enable_failures(self, model: FailureModel, server: str = "test_server") -> ServerPool:
+        """
+        Pannes et réparations de chaque serveur d'un pool (ferme de test ou serveurs d'envoi).
+        Un job interrompu repasse en tête de file et recommence ou reprend son service.
+
+        :param model: Lois MTBF / MTTR et mode de reprise (cf. FailureModel).
+        :param server: Pool concerné (test_server ou result_server).
+        :return: Le pool (serveurs en panne).
+        """
+        if self.checkpoint_path is not None:
+            raise ValueError("A run with failures cannot be checkpointed")
+        pool = getattr(self, server)
+        if isinstance(pool, ElasticResource):
+            raise ValueError("Failures of an autoscaled pool are not supported")
+        if not isinstance(pool, ServerPool):
+            # serveurs identiques, mais identifiés pour savoir quel job interrompre
+            pool = ServerPool(self.env, [ServerClass(server, pool.capacity)])
+            setattr(self, server, pool)
+        model = model.fresh()
+        for index in range(pool.capacity):
+            self.failure_processes.append(self.env.process(self._failures(server, index, model)))
+        return pool
+
+    def _failures(self, server: str, index: int, model: FailureModel):
+        pool = getattr(self, server)
+        start = None
+        try:
+            while True:
+                yield self.env.timeout(model.time_to_failure())
+                if self._simulation_finished():
+                    break
+                start = self.env.now
+                pool.fail(index, model)
+                self.log("%s %s down at %s.", server, index, start)
+                yield self.env.timeout(model.time_to_repair())
+                pool.repair(index)
+                self.log("%s %s repaired at %s.", server, index, self.env.now)
+                self.metrics.record_outage(server, index, start, self.env.now)
+                start = None
+        except simpy.Interrupt:
+            if start is not None:
+                self.metrics.record_outage(server, index, start, self.env.now)
+
+    def is_admitted(self, user: Utilisateur) -> bool:
+        """
+        Vrai si l'utilisateur peut pousser un tag maintenant.
+
+        :param user: Utilisateur.
+        """
+        return True
+
+    def test_service_time(self, commit: Commit):
+        """
+        Durée de passage d'un commit sur un serveur de test.
+
+        :param commit: Commit traité.
+        """
+        return self.test_distribution.draw() * self.service_multiplier(commit)
+
+    def result_service_time(self, commit: Commit):
+        """
+        Durée d'envoi d'un résultat au front.
+
+        :param commit: Commit traité.
+        """
+        return self.result_distribution.draw()
+
+    def serve_commit(self, commit: Commit, user_id: int):
+        """
+        Partie service du traitement d'un commit : les étapes du pipeline de l'architecture, en série.
+
+        :param commit: Commit à traiter.
+        :param user_id: Identifiant du job dans les métriques.
+        :return: "served", "refused_test", "refused_result" ou "backed_up".
+        """
+        for stage in self.pipeline.stages:
+            status = yield from stage.serve(self, commit, user_id)
+            if status is not None:
+                return status
+        return "served"
+
+    def _serve(self, commit: Commit, user_id: int):
+        """
+        serve_commit en gardant la trace des commits en cours (cf. snapshot).
+
+        :param commit: Commit à traiter.
+        :param user_id: Identifiant du job dans les métriques.
+        """
+        self.in_flight[user_id] = commit
+        try:
+            status = yield from self.serve_commit(commit, user_id)
+        finally:
+            self.in_flight.pop(user_id, None)
+        return status
+
+    def _pause(self, user: Utilisateur, delay: float):
+        """
+        Réflexion de l'utilisateur avant son prochain push.
+
+        :param user: Utilisateur.
+        :param delay: Durée de la réflexion.
+        """
+        user.next_push = self.env.now + delay
+        yield self.env.timeout(delay)
+
+    def _resume_wait(self, user: Utilisateur):
+        """
+        Fin de la réflexion interrompue par le snapshot.
+
+        :param user: Utilisateur.
+        """
+        yield self.env.timeout(max(user.next_push - self.env.now, 0))
+
+    def handle_commit(self, user: Utilisateur, resume: bool = False):
+        """
+        Simule la réception et le traitement des commits d'un utilisateur jusqu'à son dernier exercice.
+
+        :param user: Utilisateur.
+        :param resume: Reprise depuis un snapshot (la réflexion en cours se termine d'abord).
+        """
+        pipeline = self.pipeline
+        behaviour = pipeline.behaviour
+        if resume:
+            yield from self._resume_wait(user)
+        else:
+            # working on first exercise
+            wating_before_next = behaviour.first_think(self)
+            if wating_before_next > 0:
+                yield from self._pause(user, wating_before_next)
+
+        attempt = 0
+        while user.current_exo <= self.nb_exos:
+            # portes (barrage, limite de tag) : attente puis nouvel essai
+            wating_before_next = pipeline.gate_delay(self, user)
+            if wating_before_next > 0:
+                yield from self._pause(user, wating_before_next)
+                continue
+
+            commit = Commit(user, self.env.now, user.current_exo, user.last_chance)
+            attempt += 1
+            status = yield from self._serve(commit, commit.id)
+            if status != "served":
+                wating_before_next = behaviour.retry_delay(self, attempt)
+                if wating_before_next is None:
+                    # abandon du push : l'étudiant quitte l'orbite
+                    self.metrics.record_push(attempt, served=False)
+                    attempt = 0
+                    yield from self._pause(user, behaviour.give_up_delay(self))
+                    continue
+                # orbite : étudiants refusés qui vont réessayer
+                self.orbit += 1
+                yield from self._pause(user, wating_before_next)
+                self.orbit -= 1
+                continue
+
+            self.metrics.record_push(attempt, served=True)
+            attempt = 0
+            wating_before_next = behaviour.outcome(self, commit, commit.id)
+            if wating_before_next is None:
+                break
+            yield from self._pause(user, wating_before_next)
 
     def collect_metrics(self):
         """
         Collect metrics at regular intervals
         """
         while True:
-            if (all(user.current_exo > self.nb_exos for user in self.users) and
-                len(self.backup_storage.items) == 0 and
-                self.test_server.count == 0 and
-                len(self.test_server.queue) == 0 and
-                self.result_server.count == 0 and
-                len(self.result_server.queue) == 0):
+            if self._simulation_finished():
                 break
 
             # Test queue metrics
@@ -127,10 +516,27 @@ class Moulinette:
                 result_queue_length=result_queue_length,
                 test_server_utilization=test_utilization,
                 result_server_utilization=result_utilization,
+                orbit=self.orbit,
             )
+            if self.trace is not None:
+                self.trace.write_state(
+                    self.env.now,
+                    test_server_count,
+                    test_queue_length,
+                    backup_length,
+                    result_server_count,
+                    result_queue_length,
+                    test_utilization,
+                    result_utilization,
+                )
 
             yield self.env.timeout(1)
 
+        self.finished_at = self.env.now
+        for process in self.failure_processes:
+            if process.is_alive:
+                process.interrupt()
+
     def add_user(self, user: Utilisateur = None):
         """
         Ajoute un nouvel utilisateur dans la moulinette.
@@ -139,38 +545,216 @@ class Moulinette:
         """
         if user is None:
             user = Utilisateur()
+        self.user_index[user.name] = len(self.users)
         self.users.append(user)
-        self.users_commit_time[user.name] = []
+        self.tag_limiter.add(user.name)
 
-    def start_simulation(self, until: int | None, save_filename: str = "metrics.png"):
+    def result(self) -> RunResult:
         """
-        Lance une simulation complète sur tous les utilisateurs dans la moulinette et affiche des métriques.
+        Résultat compact de la simulation (cf. RunResult).
+        """
+        result = self.metrics.to_result(type(self).__name__)
+        end = self.finished_at if self.finished_at is not None else self.env.now
+        # temps serveur provisionné (intégrale de la capacité pour un pool élastique)
+        result.server_time = {
+            "test": (
+                self.test_server.total_server_time()
+                if isinstance(self.test_server, ElasticResource)
+                else self.test_server.capacity * end
+            ),
+            "result": self.result_server.capacity * end,
+        }
+        if isinstance(self.test_server, ServerPool):
+            # facturation et occupation par classe de serveurs
+            busy = self.test_server.class_busy_time()
+            for server_class in self.test_server.classes:
+                provisioned = server_class.count * end
+                result.server_time[f"test:{server_class.name}"] = provisioned
+                result.utilization[f"test:{server_class.name}"] = (
+                    busy[server_class.name] / provisioned if provisioned > 0 else 0.0
+                )
+        return result
+
+    def snapshot(self, path: str):
+        """
+        Sauvegarde l'état de la simulation : horloge, utilisateurs, limites de tag,
+        métriques, backup, commits en cours et états des générateurs aléatoires.
+
+        Les commits en cours de traitement sont enregistrés avec leur utilisateur :
+        à la reprise, ils sont poussés à nouveau (leur attente déjà écoulée est perdue).
+        La trace n'est pas continuée.
+
+        :param path: Fichier du snapshot (écrit de façon atomique).
+        """
+        if self.open_sources > 0:
+            raise ValueError("A run with external sources (replay) cannot be snapshotted")
+        if self.autoscaler is not None:
+            raise ValueError("An autoscaled run cannot be snapshotted")
+        if self.failure_processes:
+            raise ValueError("A run with failures cannot be snapshotted")
+        write_snapshot(path, {
+            "architecture": type(self).__name__,
+            "now": self.env.now,
+            "users": self.users,
+            "tag_limiter": self.tag_limiter,
+            "metrics": self.metrics,
+            "backup": list(self.backup_storage.items),
+            "in_flight": self.in_flight,
+            "backup_in_flight": self.backup_in_flight,
+            "deadline": (self.deadline, self.deadline_horizon, self.deadline_min_factor),
+            "traced_jobs": self._traced_jobs,
+            "next_commit_id": Commit.next_id(),
+            "random": random.getstate(),
+            "numpy": np.random.get_state(),
+            "test_pool": (
+                (self.test_server.busy_time, self.test_server.jobs)
+                if isinstance(self.test_server, ServerPool) else None
+            ),
+        })
+
+    def enable_checkpoints(self, path: str, interval: float):
+        """
+        Écrit un snapshot toutes les ``interval`` unités de temps jusqu'à la fin de la simulation.
+
+        :param path: Fichier du snapshot (remplacé à chaque écriture).
+        :param interval: Période des snapshots.
+        """
+        if self.autoscaler is not None:
+            raise ValueError("An autoscaled run cannot be checkpointed")
+        if self.failure_processes:
+            raise ValueError("A run with failures cannot be checkpointed")
+        self.checkpoint_path = path
+
+        def checkpoint():
+            while not self._simulation_finished():
+                yield self.env.timeout(interval)
+                self.snapshot(path)
+
+        self.env.process(checkpoint())
+
+    def load_snapshot(self, path: str):
+        """
+        Restaure un snapshot dans une moulinette fraîchement construite avec la même
+        configuration (serveurs et files vides), puis la simulation se poursuit avec resume.
+
+        :param path: Fichier du snapshot.
+        """
+        state = read_snapshot(path)
+        if state["architecture"] != type(self).__name__:
+            raise ValueError(
+                f"Snapshot of {state['architecture']} cannot be loaded in {type(self).__name__}"
+            )
+
+        # nouvel environnement à la date du snapshot, serveurs et files recréés vides
+        self.env = simpy.Environment(initial_time=state["now"])
+        rebuilt = {}
+        for name, value in list(vars(self).items()):
+            if isinstance(value, (simpy.Resource, simpy.Store)):
+                # un même pool peut être exposé sous plusieurs noms
+                if id(value) not in rebuilt:
+                    rebuilt[id(value)] = (
+                        value.fresh(self.env) if isinstance(value, ServerPool)
+                        else type(value)(self.env, capacity=value.capacity)
+                    )
+                setattr(self, name, rebuilt[id(value)])
+
+        self.users = state["users"]
+        self.user_index = {user.name: i for i, user in enumerate(self.users)}
+        self.tag_limiter = state["tag_limiter"]
+        self.metrics = state["metrics"]
+        self.deadline, self.deadline_horizon, self.deadline_min_factor = state["deadline"]
+        self._traced_jobs = state["traced_jobs"]
+        Commit.skip_ids(state["next_commit_id"])
+
+        # les commits en cours seront poussés à nouveau : on oublie leur passage partiel
+        m = self.metrics
+        for user_id in state["in_flight"]:
+            for times in (m.test_queue_entry_times, m.test_queue_exit_times,
+                          m.result_queue_entry_times, m.result_queue_exit_times):
+                times.pop(user_id, None)
+        # les résultats en cours d'envoi depuis le backup y retournent
+        backup = list(state["backup"])
+        for user_id, commit in state["backup_in_flight"].items():
+            m.result_queue_entry_times.pop(user_id, None)
+            backup.append((commit, user_id))
+        self.backup_storage.items.extend(backup)
+
+        if state.get("test_pool") is not None and isinstance(self.test_server, ServerPool):
+            self.test_server.busy_time, self.test_server.jobs = (list(v) for v in state["test_pool"])
+
+        random.setstate(state["random"])
+        np.random.set_state(state["numpy"])
+
+    def resume(self, until: int | None = None) -> RunResult:
+        """
+        Poursuit une simulation restaurée par load_snapshot.
 
         :param until: Limite de temps de la simulation.
+        :return: Résultat compact de la simulation complète.
         """
+        if hasattr(self, "regulate_ing"):
+            self.env.process(self.regulate_ing())
+        if hasattr(self, "free_backup"):
+            self.env.process(self.free_backup())
         self.env.process(self.collect_metrics())
-
         for user in self.users:
-            self.env.process(self.handle_commit(user))
+            if user.current_exo <= self.nb_exos:
+                self.env.process(self.handle_commit(user, resume=True))
 
         self.env.run(until=until)
+        return self.result()
+
+    def run_simulation(self, until: int | None = None):
+        """
+        Lance la simulation de tous les utilisateurs, sans calcul ni tracé des métriques.
+
+        :param until: Limite de temps de la simulation.
+        """
+        with self._phase("simulate"):
+            self.env.process(self.collect_metrics())
+
+            for user in self.users:
+                self.env.process(self.handle_commit(user))
+
+            self.env.run(until=until)
+            if self.trace is not None:
+                self.trace.close()
+
+    def start_simulation(
+        self, until: int | None, save_filename: str = "metrics.png"
+    ) -> RunResult:
+        """
+        Lance une simulation complète sur tous les utilisateurs dans la moulinette et affiche des métriques.
+
+        :param until: Limite de temps de la simulation.
+        :return: Résultat compact de la simulation.
+        """
+        self.run_simulation(until)
+
+        with self._phase("calculate_metrics"):
+            metrics = self.metrics.calculate_metrics()
+            print("\nSimulation Metrics:")
+            print("\nTest Queue Metrics:")
+            for metric, value in metrics["test_queue"].items():
+                print(f"- {metric}: {value}")
+
+            print("\nResult Queue Metrics:")
+            for metric, value in metrics["result_queue"].items():
+                print(f"- {metric}: {value}")
 
-        metrics = self.metrics.calculate_metrics()
-        print("\nSimulation Metrics:")
-        print("\nTest Queue Metrics:")
-        for metric, value in metrics["test_queue"].items():
-            print(f"- {metric}: {value}")
+            print("\nSojourn Times:")
+            for queue, times in metrics["sojourn_times"].items():
+                print(f"- {queue}:")
+                print(f"  - Average: {times['avg']}")
+                print(f"  - Variance: {times['var']}")
 
-        print("\nResult Queue Metrics:")
-        for metric, value in metrics["result_queue"].items():
-            print(f"- {metric}: {value}")
+            print(f"\nThroughput: {metrics['throughput']}")
 
-        print("\nSojourn Times:")
-        for queue, times in metrics["sojourn_times"].items():
-            print(f"- {queue}:")
-            print(f"  - Average: {times['avg']}")
-            print(f"  - Variance: {times['var']}")
+        with self._phase("plot_metrics"):
+            self.metrics.plot_metrics(save_filename=save_filename)
 
-        print(f"\nThroughput: {metrics['throughput']}")
+        if self.instrumentation is not None:
+            path = self.instrumentation_path or Path(save_filename).with_suffix(".perf.json")
+            self.instrumentation.write(path, label=type(self).__name__)
 
-        self.metrics.plot_metrics(save_filename=save_filename)
+        return self.result()
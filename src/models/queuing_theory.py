@@ -1,5 +1,4 @@
 import math
-import scipy.stats
 
 def mm1_theory(lam, mu):
     if lam >= mu:
@@ -77,4 +76,61 @@ def mmk_finite_theory(lam, mu, k, capacity):
     n = capacity
     p_k = ((r**n) / (math.factorial(k) * k**(n-k))) * p0
     
-    return {"p_block": p_k}
+    # Mean number in system / in queue, waits through Little with the admitted rate
+    p = [(r**n) / math.factorial(n) * p0 if n < k else (r**n) / (math.factorial(k) * k**(n-k)) * p0
+         for n in range(capacity + 1)]
+    l = sum(n * p_n for n, p_n in enumerate(p))
+    lq = sum((n - k) * p_n for n, p_n in enumerate(p) if n > k)
+    lam_eff = lam * (1 - p_k)
+    w = l / lam_eff if lam_eff > 0 else 0
+    wq = lq / lam_eff if lam_eff > 0 else 0
+    
+    return {"p_block": p_k, "w": w, "wq": wq, "l": l, "lq": lq, "ls": l - lq}
+
+def mmk_retrial_theory(lam, mu, k, capacity, retry_delay, max_attempts=None, tol=1e-10, max_iter=1000):
+    """
+    M/M/k/K queue with retrials (orbit), fixed-point approximation.
+    A refused push is retried after a mean delay retry_delay (a number, or a
+    function attempt -> mean delay), and abandoned after max_attempts refusals.
+    Retrials are assumed to arrive as a Poisson flow, so the offered rate
+    lam_total = lam * E[attempts] solves lam_total = lam * A(p_block(lam_total)).
+    """
+    delay = retry_delay if callable(retry_delay) else (lambda attempt: retry_delay)
+    n_max = max_attempts if max_attempts is not None else max_iter
+
+    def attempts(b):
+        # E[attempts] = sum_{i=0}^{n-1} b^i, orbit = lam * sum_{i=1}^{n-1} b^i * delay(i)
+        expected, orbit_time, p = 0.0, 0.0, 1.0
+        for i in range(n_max):
+            expected += p
+            if i > 0:
+                orbit_time += p * delay(i)
+            p *= b
+            if p < tol and max_attempts is None:
+                break
+        return expected, orbit_time
+
+    lam_total = lam
+    p_block = 0.0
+    for _ in range(max_iter):
+        p_block = mmk_finite_theory(lam_total, mu, k, capacity)["p_block"]
+        expected, _ = attempts(p_block)
+        # damping: the plain iteration oscillates near saturation
+        new_total = 0.5 * lam_total + 0.5 * lam * expected
+        if abs(new_total - lam_total) < tol * max(lam, 1):
+            lam_total = new_total
+            break
+        lam_total = new_total
+
+    p_block = mmk_finite_theory(lam_total, mu, k, capacity)["p_block"]
+    expected, orbit_time = attempts(p_block)
+    abandon = p_block ** max_attempts if max_attempts is not None else 0.0
+    return {
+        "offered": lam_total,
+        "effective": lam_total * (1 - p_block),
+        "p_block": p_block,
+        "attempts": expected,
+        "orbit": lam * orbit_time,
+        "abandon": abandon,
+        "throughput": lam * (1 - abandon),
+    }
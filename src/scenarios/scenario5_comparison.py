@@ -5,6 +5,7 @@ import os
 # from src.simulation.engine import run_waterfall_sim
 from src.models.queuing_theory import mm1_theory, mmk_theory, mg1_theory
 from src.utils.metrics import calculate_empirical_stats
+from src.utils.cache import default_cache
 
 def run_generic_sim(env, arrival_rate, num_servers, service_dist, duration=5000):
     stay_times = []
@@ -26,6 +27,19 @@ def run_generic_sim(env, arrival_rate, num_servers, service_dist, duration=5000)
     env.run(until=duration)
     return stay_times
 
+def cached_sim_mean(name, arrival_rate, num_servers, service_dist, duration, seed=42):
+    """Mean stay time of run_generic_sim, fetched from the result cache when possible"""
+    def run():
+        random.seed(seed)
+        env = simpy.Environment()
+        mean, var = calculate_empirical_stats(
+            run_generic_sim(env, arrival_rate, num_servers, service_dist, duration)
+        )
+        return {"mean": float(mean), "var": float(var)}
+
+    config = {"arrival_rate": arrival_rate, "num_servers": num_servers, "duration": duration}
+    return default_cache().run(f"{__name__}.{name}", config, seed, run)["mean"]
+
 def compare_theory_sim():
     print("\n--- Theoretical vs Simulation Comparison ---")
     
@@ -35,9 +49,7 @@ def compare_theory_sim():
 
     # 1. M/M/1
     print("\n[M/M/1 Case]")
-    env = simpy.Environment()
-    sim_mm1 = run_generic_sim(env, lam, 1, lambda: random.expovariate(mu), duration)
-    mean_sim, _ = calculate_empirical_stats(sim_mm1)
+    mean_sim = cached_sim_mean(f"mm1(mu={mu})", lam, 1, lambda: random.expovariate(mu), duration)
     mean_theory = mm1_theory(lam, mu)["w"]
     print(f"  Simulation Mean: {mean_sim:.4f}")
     print(f"  Theoretical Mean: {mean_theory:.4f}")
@@ -47,9 +59,7 @@ def compare_theory_sim():
     k = 3
     lam_k = 2.0
     print(f"\n[M/M/{k} Case]")
-    env = simpy.Environment()
-    sim_mmk = run_generic_sim(env, lam_k, k, lambda: random.expovariate(mu), duration)
-    mean_sim, _ = calculate_empirical_stats(sim_mmk)
+    mean_sim = cached_sim_mean(f"mmk(mu={mu})", lam_k, k, lambda: random.expovariate(mu), duration)
     mean_theory = mmk_theory(lam_k, mu, k)["w"]
     print(f"  Simulation Mean: {mean_sim:.4f}")
     print(f"  Theoretical Mean: {mean_theory:.4f}")
@@ -57,9 +67,7 @@ def compare_theory_sim():
 
     # 3. M/G/1 (Constant service time - variance = 0)
     print("\n[M/G/1 Case] (Constant Service)")
-    env = simpy.Environment()
-    sim_mg1 = run_generic_sim(env, lam, 1, lambda: 1.0/mu, duration)
-    mean_sim, _ = calculate_empirical_stats(sim_mg1)
+    mean_sim = cached_sim_mean(f"md1(mu={mu})", lam, 1, lambda: 1.0/mu, duration)
     # For Constant service, var = 0
     mean_theory = mg1_theory(lam, mu, 0)["w"]
     print(f"  Simulation Mean: {mean_sim:.4f}")
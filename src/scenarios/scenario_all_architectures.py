@@ -9,6 +9,7 @@ from src.simulation.channels_dams.channelsdams import ChannelsAndDams
 from src.models.basics import Utilisateur
 from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
 from src.visualization.cost_plots import plot_cost_comparison
+from src.utils.cache import default_cache
 import random
 
 
@@ -26,6 +27,7 @@ def run_architecture_test(architecture_class, config, num_users=30):
     
     try:
         moulinette = architecture_class(**config)
+        moulinette.verbose = False
         users = create_users(num_users)
         
         for user in users:
@@ -50,30 +52,22 @@ def run_architecture_test(architecture_class, config, num_users=30):
         sys.stdout = old_stdout
 
 
-def extract_metrics_from_moulinette(moulinette):
-    metrics_obj = moulinette.metrics.calculate_metrics()
-    
-    return {
-        "test_queue": {
-            "blocking_rate": metrics_obj["test_queue"]["blocking_rate"],
-        },
-        "result_queue": {
-            "blocking_rate": metrics_obj["result_queue"]["blocking_rate"],
-        },
-        "sojourn_times": {
-            "test_queue": {"avg": metrics_obj["sojourn_times"]["test_queue"]["avg"] / 60},
-            "result_queue": {"avg": metrics_obj["sojourn_times"]["result_queue"]["avg"] / 60}
-        }
-    }
+def run_cached_architecture(architecture_class, config, num_users=30, seed=42):
+    """Run (or fetch from the result cache) one architecture"""
+    def run():
+        random.seed(seed)
+        np.random.seed(seed)
+        return run_architecture_test(architecture_class, config, num_users).result()
+
+    return default_cache().run(
+        architecture_class, {**config, "num_users": num_users}, seed, run
+    )
 
 
 def compare_all_architectures():
     results_dir = "output/cost_analysis_all"
     os.makedirs(results_dir, exist_ok=True)
     
-    random.seed(42)
-    np.random.seed(42)
-    
     cost_config = create_cost_config_aws_small()
     cost_config.simulation_duration_hours = 1.0
     analyzer = CostAnalyzer(cost_config)
@@ -117,16 +111,13 @@ def compare_all_architectures():
     labels = []
     
     for arch in architectures:
-        moulinette = run_architecture_test(arch["class"], arch["config"], num_users)
-        metrics = extract_metrics_from_moulinette(moulinette)
-        
-        total_requests = moulinette.metrics.total_requests
+        result = run_cached_architecture(arch["class"], arch["config"], num_users)
         
         cost_result = analyzer.calculate_total_cost(
             num_test_servers=arch["K"],
-            metrics=metrics,
-            total_requests=total_requests,
-            backup_enabled=isinstance(moulinette, WaterfallMoulinetteFiniteBackup)
+            metrics=result.cost_metrics(time_scale=1 / 60),
+            total_requests=result.total_requests,
+            backup_enabled=issubclass(arch["class"], WaterfallMoulinetteFiniteBackup)
         )
         
         cost_results.append(cost_result)
@@ -8,6 +8,7 @@ from src.simulation.waterfall.backup import WaterfallMoulinetteFiniteBackup
 from src.simulation.channels_dams.channelsdams import ChannelsAndDams
 from src.models.basics import Utilisateur
 from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
+from src.utils.cache import default_cache
 from src.visualization.cost_plots import plot_scaling_analysis
 import matplotlib.pyplot as plt
 
@@ -22,6 +23,7 @@ def create_users(n, promo_ratio=0.7):
 
 def run_test(architecture_class, config, num_users=30):
     moulinette = architecture_class(**config)
+    moulinette.verbose = False
     users = create_users(num_users)
     
     for user in users:
@@ -43,48 +45,34 @@ def run_test(architecture_class, config, num_users=30):
     return moulinette
 
 
+def run_cached(architecture_class, config, num_users=30, seed=42):
+    """Run (or fetch from the result cache) one cell of the sweep"""
+    def run():
+        random.seed(seed)
+        np.random.seed(seed)
+        return run_test(architecture_class, config, num_users).result()
+
+    return default_cache().run(
+        architecture_class, {**config, "num_users": num_users}, seed, run
+    )
+
+
 def analyze_architecture_scaling(arch_name, arch_class, base_config, k_values, analyzer, num_users=30):
-    cost_results = []
-    
-    for k in k_values:
-        config = base_config.copy()
-        config["K"] = k
-        
-        moulinette = run_test(arch_class, config, num_users)
-        metrics_obj = moulinette.metrics.calculate_metrics()
-        
-        metrics = {
-            "test_queue": {
-                "blocking_rate": metrics_obj["test_queue"]["blocking_rate"],
-            },
-            "result_queue": {
-                "blocking_rate": metrics_obj["result_queue"]["blocking_rate"],
-            },
-            "sojourn_times": {
-                "test_queue": {"avg": metrics_obj["sojourn_times"]["test_queue"]["avg"] / 60},
-                "result_queue": {"avg": metrics_obj["sojourn_times"]["result_queue"]["avg"] / 60}
-            }
-        }
-        
-        cost_result = analyzer.calculate_total_cost(
-            num_test_servers=k,
-            metrics=metrics,
-            total_requests=moulinette.metrics.total_requests,
-            backup_enabled=isinstance(moulinette, WaterfallMoulinetteFiniteBackup)
-        )
-        
-        cost_results.append(cost_result)
-    
-    return cost_results
+    results = [run_cached(arch_class, {**base_config, "K": k}, num_users) for k in k_values]
+    
+    # one row of cost components per K
+    return analyzer.calculate_total_cost_from_results(
+        k_values,
+        results,
+        time_scale=1 / 60,
+        backup_enabled=issubclass(arch_class, WaterfallMoulinetteFiniteBackup)
+    )
 
 
 def analyze_all_architectures_scaling():
     results_dir = "output/cost_analysis_scaling"
     os.makedirs(results_dir, exist_ok=True)
     
-    random.seed(42)
-    np.random.seed(42)
-    
     cost_config = create_cost_config_aws_small()
     cost_config.simulation_duration_hours = 1.0
     analyzer = CostAnalyzer(cost_config)
@@ -0,0 +1,75 @@
+import random
+from dataclasses import asdict
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.autoscaling import AutoscalerPolicy
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+from src.utils.cache import default_cache
+from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
+
+CONFIG = {"process_time": 4, "result_time": 1, "ks": 50, "kf": 20, "tag_limit": 5, "nb_exos": 5}
+DEADLINE = {"deadline": 600, "horizon": 400, "min_factor": 0.2}
+
+
+def run_rush(k, policy=None, num_users=80, seed=42):
+    """
+    W.Finite under a deadline rush, with a static farm of K servers or an
+    elastic farm driven by ``policy``.
+    """
+    def run():
+        random.seed(seed)
+        np.random.seed(seed)
+        moulinette = WaterfallMoulinetteFinite(K=k, **CONFIG)
+        moulinette.verbose = False
+        moulinette.set_deadline(**DEADLINE)
+        for i in range(num_users):
+            promo = "ING" if random.random() < 0.7 else "PREPA"
+            moulinette.add_user(Utilisateur(name=f"USER{i}", promo=promo))
+        if policy is not None:
+            moulinette.enable_autoscaling(policy)
+        moulinette.env.process(moulinette.collect_metrics())
+        for user in moulinette.users:
+            moulinette.env.process(moulinette.handle_commit(user))
+        moulinette.env.run()
+        return moulinette.result()
+
+    config = {**CONFIG, **DEADLINE, "K": k, "num_users": num_users}
+    if policy is not None:
+        config["autoscaling"] = asdict(policy)
+    return default_cache().run(WaterfallMoulinetteFinite, config, seed, run)
+
+
+def analyze_autoscaling():
+    print("--- Running Scenario: Autoscaled test farm ---")
+
+    analyzer = CostAnalyzer(create_cost_config_aws_small())
+    policy = AutoscalerPolicy(
+        min_servers=1, max_servers=12, target_utilization=0.9, scale_down_queue=2,
+        provisioning_delay=5, cooldown=10,
+    )
+    runs = {f"static K={k}": run_rush(k) for k in (4, 6, 8, 12)}
+    runs["elastic 1..12"] = run_rush(1, policy)
+
+    print(f"{'Farm':<15} {'mean K':>7} {'hours':>7} {'p95':>7} {'refused':>8} {'infra':>7} {'total':>7}")
+    for name, result in runs.items():
+        # 1 time unit = 1 minute
+        hours = result.duration / 60
+        server_hours = result.server_time.get("test", 0) / 60
+        cost = analyzer.calculate_total_cost(
+            num_test_servers=0,
+            metrics=result.cost_metrics(),
+            total_requests=result.total_requests,
+            simulation_duration_hours=hours,
+            test_server_hours=server_hours,
+        )
+        print(
+            f"{name:<15} {result.mean_servers('test'):>7.2f} {server_hours:>7.2f} "
+            f"{result.stage('total').p95:>7.2f} {result.rejection_rate:>8.2%} "
+            f"{cost['total_infrastructure']:>7.3f} {cost['total_cost']:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    analyze_autoscaling()
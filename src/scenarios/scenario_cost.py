@@ -5,7 +5,8 @@ import numpy as np
 import random
 from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
 from src.models.basics import Utilisateur
-from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
+from src.utils.cost_analysis import COST_PRESETS, CostAnalyzer, create_cost_config_aws_small, sensitivity_analysis
+from src.utils.cache import default_cache
 from src.visualization.cost_plots import plot_cost_comparison, plot_scaling_analysis
 
 
@@ -17,16 +18,12 @@ def create_users(n, promo_ratio=0.7):
     return users
 
 
+FINITE_CONFIG = {"process_time": 2, "result_time": 1, "ks": 20, "kf": 10, "tag_limit": 5, "nb_exos": 5}
+
+
 def run_test_for_k(k, num_users=30):
-    moulinette = WaterfallMoulinetteFinite(
-        K=k, 
-        process_time=2, 
-        result_time=1, 
-        ks=20, 
-        kf=10, 
-        tag_limit=5, 
-        nb_exos=5
-    )
+    moulinette = WaterfallMoulinetteFinite(K=k, **FINITE_CONFIG)
+    moulinette.verbose = False
     users = create_users(num_users)
     
     for user in users:
@@ -42,54 +39,40 @@ def run_test_for_k(k, num_users=30):
     return moulinette
 
 
+def run_cached_for_k(k, num_users=30, seed=42):
+    """Run (or fetch from the result cache) the W.Finite cell for K=k"""
+    def run():
+        random.seed(seed)
+        np.random.seed(seed)
+        return run_test_for_k(k, num_users).result()
+
+    config = {**FINITE_CONFIG, "K": k, "num_users": num_users}
+    return default_cache().run(WaterfallMoulinetteFinite, config, seed, run)
+
+
 def analyze_server_costs():
     results_dir = "output/cost_analysis"
     os.makedirs(results_dir, exist_ok=True)
     
-    random.seed(42)
-    np.random.seed(42)
-    
     cost_config = create_cost_config_aws_small()
     cost_config.simulation_duration_hours = 1.0
     analyzer = CostAnalyzer(cost_config)
     
     server_configs = [1, 2, 4, 6, 8, 10]
-    cost_results = []
     
     old_stdout = sys.stdout
     sys.stdout = open(os.devnull, 'w')
     
     try:
-        for num_servers in server_configs:
-            moulinette = run_test_for_k(num_servers)
-            
-            metrics_obj = moulinette.metrics.calculate_metrics()
-            
-            metrics = {
-                "test_queue": {
-                    "blocking_rate": metrics_obj["test_queue"]["blocking_rate"],
-                },
-                "result_queue": {
-                    "blocking_rate": metrics_obj["result_queue"]["blocking_rate"],
-                },
-                "sojourn_times": {
-                    "test_queue": {"avg": metrics_obj["sojourn_times"]["test_queue"]["avg"] / 60},
-                    "result_queue": {"avg": metrics_obj["sojourn_times"]["result_queue"]["avg"] / 60}
-                }
-            }
-            
-            cost_result = analyzer.calculate_total_cost(
-                num_test_servers=num_servers,
-                metrics=metrics,
-                total_requests=moulinette.metrics.total_requests,
-                backup_enabled=False
-            )
-            
-            cost_results.append(cost_result)
+        results = [run_cached_for_k(num_servers) for num_servers in server_configs]
     finally:
         sys.stdout.close()
         sys.stdout = old_stdout
     
+    cost_results = analyzer.calculate_total_cost_from_results(
+        server_configs, results, time_scale=1 / 60, backup_enabled=False
+    )
+    
     labels = [f"K={k}" for k in server_configs]
     
     plot_cost_comparison(cost_results, labels, 
@@ -98,8 +81,55 @@ def analyze_server_costs():
     plot_scaling_analysis(server_configs, cost_results,
                          save_filename=f"{results_dir}/scaling.png")
     
-    best_idx = np.argmin([c['cost_per_successful_request'] for c in cost_results])
+    best_idx = np.argmin(cost_results['cost_per_successful_request'])
     print(f"Optimal K: {server_configs[best_idx]}")
+    
+    roi = analyzer.calculate_roi_batch(cost_results)
+    print(f"ROI at optimal K: {roi['roi_percentage'][best_idx]:.1f}%")
+    
+    analyze_cost_sensitivity(server_configs, results)
+
+
+def analyze_cost_sensitivity(server_configs, results, nb_scenarios=10000, seed=42):
+    """
+    Optimal K under each pricing preset, with the measured rates perturbed
+    over many scenarios (+/- 50% on blocking rates and waits, +/- 20% on the volume).
+    The wait penalty is integrated over the sojourn sketches, like analyze_server_costs.
+    """
+    print("\n[Sensitivity across pricing presets]")
+    rng = np.random.default_rng(seed)
+    k = np.array(server_configs, dtype=float)
+    base = {
+        "test_blocking_rate": np.array([r.rejection_rate for r in results]),
+        "result_blocking_rate": np.array([r.result_rejection_rate for r in results]),
+        "test_avg_wait": np.array([r.stage("test_queue").avg / 60 for r in results]),
+        "result_avg_wait": np.array([r.stage("result_queue").avg / 60 for r in results]),
+        "total_requests": np.array([r.total_requests for r in results], dtype=float),
+    }
+    # (nb_scenarios, len(server_configs)) batch: same perturbation for every K of a scenario
+    factor = rng.uniform(0.5, 1.5, size=(nb_scenarios, 1))
+    volume = rng.uniform(0.8, 1.2, size=(nb_scenarios, 1))
+    batch = {
+        "num_test_servers": k,
+        "test_blocking_rate": np.clip(base["test_blocking_rate"] * factor, 0, 1),
+        "result_blocking_rate": np.clip(base["result_blocking_rate"] * factor, 0, 1),
+        "test_avg_wait": base["test_avg_wait"] * factor,
+        "result_avg_wait": base["result_avg_wait"] * factor,
+        "total_requests": np.round(base["total_requests"] * volume),
+    }
+    for preset, factory in COST_PRESETS.items():
+        # wait penalty integrated over the sojourn sketches, with the sojourns scaled by the perturbation
+        threshold = factory().acceptable_wait_time
+        def excess(stage):
+            return np.stack([r.sketches[stage].expected_excess(threshold, factor[:, 0] / 60) for r in results], axis=1)
+
+        batch["test_excess_wait"] = excess("test_queue")
+        batch["result_excess_wait"] = excess("result_queue")
+        costs = sensitivity_analysis({preset: factory}, simulation_duration_hours=1.0, **batch)[preset]
+        best = np.argmin(costs["cost_per_successful_request"], axis=1)
+        counts = np.bincount(best, minlength=len(server_configs))
+        share = ", ".join(f"K={server_configs[i]}: {c / nb_scenarios:.0%}" for i, c in enumerate(counts) if c)
+        print(f"- {preset}: optimal K share -> {share}")
 
 
 if __name__ == "__main__":
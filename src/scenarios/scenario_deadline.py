@@ -0,0 +1,69 @@
+import random
+import simpy
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.arrivals import deadline_spike
+from src.simulation.engine import run_waterfall_sim
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+from src.utils.metrics import print_windowed_summary
+
+
+def size_for_peak(profile, exec_rate, front_rate, k_values, target_p95, duration, window, ks=50, kf=50):
+    """
+    Smallest K whose worst window (not the average) meets the p95 sojourn target.
+    """
+    for k in k_values:
+        random.seed(42)
+        env = simpy.Environment()
+        sim = run_waterfall_sim(env, profile, k, exec_rate, front_rate, ks=ks, kf=kf, duration=duration)
+        rows = sim.windowed(window)
+        worst = max(row["p95_sojourn"] for row in rows)
+        average = np.percentile(sim.stay_times, 95) if sim.stay_times else 0
+        print(f"K={k}: p95 overall={average:.2f}, p95 worst window={worst:.2f}")
+        if worst <= target_p95:
+            return k
+    return None
+
+
+def analyze_deadline():
+    print("--- Running Scenario: Deadline peak ---")
+
+    duration = 3000
+    deadline = 2400
+    window = 200
+    exec_rate = 0.4
+    # fast front stage: the peak (4/s) must not saturate the single sender
+    front_rate = 8.0
+
+    # same service, arrivals rising 10x before the deadline
+    profile = deadline_spike(base_rate=0.4, peak_rate=4.0, deadline=deadline, ramp=150, after_rate=0.1)
+    print(f"Mean rate: {profile.mean_rate(0, duration):.3f}, peak rate: {profile.rate(deadline - 1e-9):.3f}")
+
+    random.seed(42)
+    env = simpy.Environment()
+    sim = run_waterfall_sim(env, profile, 4, exec_rate, front_rate, ks=20, kf=20, duration=duration)
+    print("\n[Waterfall K=4 under a deadline spike]")
+    print_windowed_summary(sim.windowed(window))
+
+    print("\n[Sizing K for the peak window (target p95 <= 10)]")
+    k = size_for_peak(profile, exec_rate, front_rate, [4, 6, 8, 10, 12, 16], 10, duration, window)
+    print(f"K for the peak: {k}")
+
+    # Moulinette users speeding up as the deadline approaches
+    print("\n[W.Finite, students rushing before the deadline]")
+    random.seed(42)
+    moulinette = WaterfallMoulinetteFinite(K=2, process_time=2, result_time=1, ks=10, kf=5, nb_exos=5)
+    moulinette.verbose = False
+    moulinette.set_deadline(deadline=600, horizon=400, min_factor=0.2)
+    for i in range(60):
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo="ING" if random.random() < 0.7 else "PREPA"))
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+    moulinette.env.run()
+    print_windowed_summary(moulinette.metrics.windowed_metrics(100))
+
+
+if __name__ == "__main__":
+    analyze_deadline()
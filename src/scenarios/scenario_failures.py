@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.failures import FailureModel, outage_report, print_outage_report
+from src.simulation.waterfall.backup import WaterfallMoulinetteFiniteBackup
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+
+CONFIG = {"process_time": 4, "result_time": 1, "ks": 30, "kf": 5, "tag_limit": 5, "nb_exos": 5}
+TEST_FAILURES = FailureModel(mtbf=300, mttr=30, mode="restart")
+FRONT_FAILURES = FailureModel(mtbf=400, mttr=40, mode="resume")
+
+
+def run_failures(architecture, k, front_servers, failures=True, num_users=100, seed=42):
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = architecture(K=k, front_servers=front_servers, **CONFIG)
+    moulinette.verbose = False
+    if failures:
+        moulinette.enable_failures(TEST_FAILURES, "test_server")
+        moulinette.enable_failures(FRONT_FAILURES, "result_server")
+    for i in range(num_users):
+        promo = "ING" if random.random() < 0.7 else "PREPA"
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo=promo))
+    if hasattr(moulinette, "free_backup"):
+        moulinette.env.process(moulinette.free_backup())
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+    moulinette.env.run()
+    return moulinette
+
+
+def analyze_failures():
+    print("--- Running Scenario: Server outages ---")
+    print(f"Server availability: test {TEST_FAILURES.availability:.1%}, front {FRONT_FAILURES.availability:.1%}")
+
+    for architecture in (WaterfallMoulinetteFinite, WaterfallMoulinetteFiniteBackup):
+        print(f"\n[{architecture.__name__}]")
+        print(f"{'K':>3} {'front':>5} {'failures':>8} {'thru':>6} {'p95':>7} {'blank':>7} {'backed up':>9}")
+        for k, front_servers in ((4, 1), (4, 2), (5, 2)):
+            for failures in (False, True):
+                result = run_failures(architecture, k, front_servers, failures).result()
+                print(
+                    f"{k:>3} {front_servers:>5} {str(failures):>8} {result.throughput:>6.3f} "
+                    f"{result.stage('total').p95:>7.2f} {result.blank_page_rate:>7.2%} {result.backed_up:>9}"
+                )
+
+        print("\nOutages (K=4, 1 front server):")
+        print_outage_report(outage_report(run_failures(architecture, 4, 1)))
+
+
+if __name__ == "__main__":
+    analyze_failures()
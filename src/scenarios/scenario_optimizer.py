@@ -0,0 +1,42 @@
+import time
+
+from src.simulation.optimizer import CostOptimizer, DesignSpace, SLO
+from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
+
+BASE_CONFIG = {"process_time": 4, "result_time": 1, "tag_limit": 5, "nb_exos": 5}
+
+
+def analyze_optimizer():
+    print("--- Running Scenario: Cost-optimal configuration search ---")
+
+    space = DesignSpace(
+        K=(2, 4, 6, 8, 10, 12, 16),
+        ks=(5, 10, 20, 50),
+        kf=(1, 2, 5, 10),
+        front_servers=(1, 2),
+        backup=(False, True),
+        tb=(None, 5, 15),
+    )
+    slo = SLO(max_rejection_rate=0.05, max_blank_page_rate=0.01, max_p95_sojourn=30)
+    optimizer = CostOptimizer(
+        space, BASE_CONFIG, slo, CostAnalyzer(create_cost_config_aws_small()), num_users=60
+    )
+
+    start = time.perf_counter()
+    ranking = optimizer.optimize(keep=27, eta=3, max_seeds=9)
+    elapsed = time.perf_counter() - start
+
+    print(f"Design space: {space.size()} designs")
+    for rung in optimizer.history:
+        print(f"- rung {rung['rung']}: {rung['designs']} designs x {rung['seeds']} seeds")
+    print(f"Simulations run: {optimizer.simulations} in {elapsed:.1f}s "
+          f"(full grid at 9 seeds: {space.size() * 9})")
+
+    for evaluation in ranking:
+        status = "OK" if evaluation.feasible else "violates " + ", ".join(evaluation.violations)
+        print(f"{evaluation.design}: total cost={evaluation.total_cost:.2f} "
+              f"cost/success={evaluation.cost_per_successful_request:.4f} [{status}]")
+
+
+if __name__ == "__main__":
+    analyze_optimizer()
@@ -0,0 +1,34 @@
+from src.models.queuing_theory import mmk_finite_theory
+from src.simulation.rare_events import WaterfallChain, estimate_rare_event
+
+
+def analyze_rare_events():
+    print("--- Running Scenario: Rare refusals and blank pages ---")
+
+    # (arrival rate, exec rate, front rate, K, ks, kf) of run_waterfall_sim
+    configs = [
+        (2.0, 1.0, 4.0, 3, 8, 6),
+        (0.8, 0.5, 1.5, 3, 20, 12),
+        (1.5, 1.0, 3.0, 4, 15, 10),
+    ]
+    for lam, mu1, mu2, k, ks, kf in configs:
+        chain = WaterfallChain(lam, mu1, mu2, k, ks, kf)
+        exact = chain.exact()
+        theory = mmk_finite_theory(lam, mu1, k, k + ks)["p_block"]
+        print(f"\n[lambda={lam}, mu_exec={mu1}, mu_front={mu2}, K={k}, ks={ks}, kf={kf}]")
+        print(f"  M/M/k/C refusal (theory): {theory:.3e}")
+
+        for target in ("block", "blank"):
+            crude = estimate_rare_event(chain, target, method="crude", seed=1)
+            split = estimate_rare_event(chain, target, seed=1)
+            low, high = split.interval()
+            # crude work for the same relative error: ~3 jumps per arrival, Var ~ 1 / (p n)
+            crude_jumps = 3 / (exact["p_" + target] * split.relative_error ** 2)
+            print(f"  {target:<5} exact={exact['p_' + target]:.3e} "
+                  f"crude={crude.probability:.3e} (re={crude.relative_error:.2f}) "
+                  f"splitting={split.probability:.3e} [{low:.2e}, {high:.2e}] (re={split.relative_error:.2f}) "
+                  f"crude/splitting work={crude_jumps / split.jumps:.1f}")
+
+
+if __name__ == "__main__":
+    analyze_rare_events()
@@ -0,0 +1,42 @@
+from typing import Dict
+
+from src.simulation.replay import TraceReplay, read_push_log
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+from src.utils.metrics import RunResult, print_summary
+
+
+def evaluate_replay(
+    log_path: str,
+    architecture_class=WaterfallMoulinetteFinite,
+    configs: Dict[str, dict] = None,
+    time_scale: float = 1 / 30,
+) -> Dict[str, RunResult]:
+    """
+    Replay a real push-tag log on several configurations of one architecture.
+
+    :param log_path: .csv or .parquet log (timestamp, student, promo, exo, outcome).
+    :param architecture_class: Moulinette class to evaluate.
+    :param configs: name -> constructor kwargs.
+    :param time_scale: simulation time units per log second.
+    """
+    if configs is None:
+        configs = {
+            f"K={k}": {"K": k, "process_time": 2, "result_time": 1, "ks": 20, "kf": 10}
+            for k in (2, 4, 8)
+        }
+
+    print(f"--- Replaying {log_path} on {architecture_class.__name__} ---")
+    results = {}
+    for name, config in configs.items():
+        moulinette = architecture_class(**config)
+        moulinette.verbose = False
+        replay = TraceReplay(moulinette, read_push_log(log_path), time_scale=time_scale)
+        results[name] = replay.run()
+        print_summary(name, results[name])
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    evaluate_replay(sys.argv[1])
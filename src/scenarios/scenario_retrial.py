@@ -0,0 +1,115 @@
+import random
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.models.queuing_theory import mmk_retrial_theory
+from src.simulation.arrivals import PiecewiseRate, arrival_process
+from src.simulation.pipeline import ExponentialBackoff, UniformRetry
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+
+CONFIG = {"K": 4, "process_time": 4, "result_time": 1, "ks": 6, "kf": 20, "tag_limit": 5, "nb_exos": 5}
+# students think in minutes of 2 time units
+MINUTE_UNIT = 2
+
+POLICIES = {
+    "uniform 4-10": UniformRetry(),
+    "uniform, give up 3": UniformRetry(max_attempts=3),
+    "backoff, no jitter": ExponentialBackoff(base=2, jitter="none"),
+    "backoff, full jitter": ExponentialBackoff(base=2, jitter="full"),
+    "backoff, equal, give up 5": ExponentialBackoff(base=2, jitter="equal", max_attempts=5),
+}
+
+
+def run_retrial(policy, num_users=150, seed=42):
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = WaterfallMoulinetteFinite(**CONFIG)
+    moulinette.verbose = False
+    moulinette.set_retry_policy(policy)
+    for i in range(num_users):
+        promo = "ING" if random.random() < 0.7 else "PREPA"
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo=promo))
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+    moulinette.env.run()
+    return moulinette.result()
+
+
+def run_open_retrial(policy, rate, horizon=4000, seed=42):
+    """
+    Poisson stream of single pushes (each student only has to pass one last
+    exercise, with certainty), the setting of the M/M/k/ks retrial approximation.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = WaterfallMoulinetteFinite(**CONFIG)
+    moulinette.verbose = False
+    moulinette.set_retry_policy(policy)
+
+    def spawn():
+        user = Utilisateur(name=f"OPEN{len(moulinette.users)}", promo="ING")
+        user.current_exo = moulinette.nb_exos
+        user.last_chance = 1.0
+        moulinette.add_user(user)
+        moulinette.env.process(moulinette.handle_commit(user))
+
+    def source():
+        yield moulinette.env.process(
+            arrival_process(moulinette.env, PiecewiseRate([0, horizon], [rate, 0]), spawn)
+        )
+        moulinette.open_sources -= 1
+
+    moulinette.open_sources += 1
+    moulinette.env.process(source())
+    moulinette.env.process(moulinette.collect_metrics())
+    moulinette.env.run()
+    return moulinette.result()
+
+
+def retrial_theory(policy, fresh_rate):
+    """M/M/k/ks retrial approximation for a rate of fresh pushes"""
+    k = min(CONFIG["K"], CONFIG["ks"])
+    return mmk_retrial_theory(
+        fresh_rate, 1 / CONFIG["process_time"], k, CONFIG["ks"],
+        retry_delay=lambda attempt: policy.mean_delay(attempt) * MINUTE_UNIT,
+        max_attempts=policy.max_attempts,
+    )
+
+
+def analyze_retrial():
+    print("--- Running Scenario: Retry behaviour after a refused push ---")
+    print("\n[Closed population]")
+    print(
+        f"{'Policy':<26} {'orbit':>6} {'max':>4} {'tries':>6} {'abandon':>8} "
+        f"{'fresh':>6} {'offered':>7} {'admitted':>8} {'p95':>7}"
+    )
+    for name, policy in POLICIES.items():
+        result = run_retrial(policy)
+        r = result.retrial
+        print(
+            f"{name:<26} {r['orbit_avg']:>6.2f} {r['orbit_max']:>4.0f} {r['attempts_avg']:>6.2f} "
+            f"{r['abandon_rate']:>8.2%} {r['fresh_rate']:>6.3f} {r['offered_rate']:>7.3f} "
+            f"{r['effective_rate']:>8.3f} {result.stage('total').p95:>7.2f}"
+        )
+
+    print("\n[Poisson pushes: simulation | M/M/k/ks retrial approximation]")
+    print(
+        f"{'Policy':<26} {'rate':>5} {'orbit':>6} {'tries':>6} {'offered':>7} {'abandon':>8} | "
+        f"{'orbit':>6} {'tries':>6} {'offered':>7} {'abandon':>8}"
+    )
+    for name in ("uniform 4-10", "backoff, full jitter", "backoff, equal, give up 5"):
+        policy = POLICIES[name]
+        for rate in (0.6, 0.8, 0.9):
+            r = run_open_retrial(policy, rate).retrial
+            theory = retrial_theory(policy, rate)
+            print(
+                f"{name:<26} {rate:>5.2f} {r['orbit_avg']:>6.2f} {r['attempts_avg']:>6.2f} "
+                f"{r['offered_rate']:>7.3f} {r['abandon_rate']:>8.2%} | {theory['orbit']:>6.2f} "
+                f"{theory['attempts']:>6.2f} {theory['offered']:>7.3f} {theory['abandon']:>8.2%}"
+            )
+
+
+if __name__ == "__main__":
+    analyze_retrial()
@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.channels_dams.channelsdams import ChannelsAndDams
+from src.simulation.server_pool import FastestFree, RandomFree, ServerClass, SlowServerThreshold
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+from src.utils.cache import default_cache
+from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
+
+CONFIG = {"process_time": 4, "result_time": 1, "ks": 40, "kf": 20, "tag_limit": 5, "nb_exos": 5}
+OLD = ServerClass("old", 6, speed=0.5, cost_per_hour=0.03)
+NEW = ServerClass("new", 4, speed=1.0, cost_per_hour=0.05)
+
+POOLS = {
+    "old + new": [OLD, NEW],
+    "new only": [NEW],
+    "new x6": [ServerClass("new", 6, speed=1.0, cost_per_hour=0.05)],
+    "old only": [OLD],
+}
+POLICIES = {
+    "fastest": FastestFree(),
+    "random": RandomFree(),
+    "threshold": SlowServerThreshold(slow_speed=1.0, queue=3),
+}
+
+
+def run_pool(classes, dispatch, architecture=WaterfallMoulinetteFinite, num_users=120, seed=42):
+    def run():
+        random.seed(seed)
+        np.random.seed(seed)
+        moulinette = architecture(K=sum(c.count for c in classes), **CONFIG)
+        moulinette.verbose = False
+        moulinette.enable_server_pool(classes, dispatch)
+        for i in range(num_users):
+            promo = "ING" if random.random() < 0.7 else "PREPA"
+            moulinette.add_user(Utilisateur(name=f"USER{i}", promo=promo))
+        if isinstance(moulinette, ChannelsAndDams):
+            moulinette.env.process(moulinette.regulate_ing())
+        if hasattr(moulinette, "free_backup"):
+            moulinette.env.process(moulinette.free_backup())
+        moulinette.env.process(moulinette.collect_metrics())
+        for user in moulinette.users:
+            moulinette.env.process(moulinette.handle_commit(user))
+        moulinette.env.run()
+        return moulinette.result()
+
+    config = {**CONFIG, "pool": classes, "dispatch": dispatch, "num_users": num_users}
+    return default_cache().run(architecture, config, seed, run)
+
+
+def analyze_server_pool():
+    print("--- Running Scenario: Heterogeneous test farm ---")
+    analyzer = CostAnalyzer(create_cost_config_aws_small())
+
+    for architecture in (WaterfallMoulinetteFinite, ChannelsAndDams):
+        print(f"\n[{architecture.__name__}]")
+        print(f"{'Pool':<10} {'policy':<10} {'thru':>6} {'p95':>7} {'refused':>8} {'util/class':<22} {'€/h':>6} {'jobs/€':>8}")
+        for pool_name, classes in POOLS.items():
+            for policy_name, dispatch in POLICIES.items():
+                if len(classes) == 1 and policy_name != "fastest":
+                    continue
+                result = run_pool(classes, dispatch, architecture)
+                # 1 time unit = 1 minute
+                hours = result.duration / 60
+                cost = analyzer.calculate_infrastructure_costs(
+                    0, simulation_duration_hours=hours, server_classes=classes,
+                )
+                utilization = " ".join(
+                    f"{c.name}={result.utilization[f'test:{c.name}']:.2f}" for c in classes
+                )
+                print(
+                    f"{pool_name:<10} {policy_name:<10} {result.throughput:>6.3f} "
+                    f"{result.stage('test_queue').p95:>7.2f} {result.rejection_rate:>8.2%} "
+                    f"{utilization:<22} {cost['test_servers_cost'] / hours:>6.3f} "
+                    f"{result.completed / cost['test_servers_cost']:>8.0f}"
+                )
+
+
+if __name__ == "__main__":
+    analyze_server_pool()
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.distributions import (
+    Deterministic,
+    Empirical,
+    Exponential,
+    Gamma,
+    HyperExponential,
+    LogNormal,
+    Pareto,
+)
+from src.simulation.waterfall.infinite import WaterfallMoulinetteInfinite
+
+K = 9
+MEAN_SERVICE = 4
+NUM_USERS = 150
+NB_EXOS = 3
+
+
+def service_laws(mean=MEAN_SERVICE, seed=0):
+    """Same mean test time, growing variability"""
+    observed = np.random.default_rng(seed).lognormal(0, 1, 500)
+    return {
+        "deterministic": Deterministic(mean),
+        "gamma cv=0.5": Gamma(mean, cv=0.5),
+        "exponential": Exponential(mean),
+        "empirical": Empirical(observed * mean / observed.mean()),
+        "lognormal cv=2": LogNormal(mean, cv=2),
+        "hyperexp cv=2": HyperExponential.fit(mean, cv=2),
+        "pareto a=2.5": Pareto(mean, alpha=2.5),
+    }
+
+
+def run_variability(law, num_users=NUM_USERS, seed=42):
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = WaterfallMoulinetteInfinite(K=K, process_time=law, result_time=1, nb_exos=NB_EXOS)
+    moulinette.verbose = False
+    for i in range(num_users):
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo="ING" if random.random() < 0.7 else "PREPA"))
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+    moulinette.env.run()
+    return moulinette.result()
+
+
+def analyze_service_variability():
+    print("--- Running Scenario: Test time variability at equal mean ---")
+    print(f"K={K}, mean test time={MEAN_SERVICE}, {NUM_USERS} users")
+    print(f"{'law':<15} {'cs2':>6} {'avg':>7} {'p95':>7} {'p99':>7}")
+    for name, law in service_laws().items():
+        summary = run_variability(law).stage("test_queue")
+        print(f"{name:<15} {law.scv:>6.2f} {summary.avg:>7.2f} {summary.p95:>7.2f} {summary.p99:>7.2f}")
+
+if __name__ == "__main__":
+    analyze_service_variability()
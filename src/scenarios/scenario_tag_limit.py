@@ -0,0 +1,63 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.waterfall.infinite import WaterfallMoulinetteInfinite
+
+CONFIG = {"K": 50, "process_time": 2, "result_time": 1, "nb_exos": 3}
+
+
+def run_counting_events(moulinette):
+    """Run the simulation to the end, returning the number of processed events"""
+    env = moulinette.env
+    events = 0
+    while env.peek() < math.inf:
+        env.step()
+        events += 1
+    return events
+
+
+def benchmark_tag_limit(tag_limit, tag_window, num_users, seed=42):
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = WaterfallMoulinetteInfinite(tag_limit=tag_limit, tag_window=tag_window, **CONFIG)
+    moulinette.verbose = False
+    for i in range(num_users):
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo="ING" if random.random() < 0.7 else "PREPA"))
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+
+    start = time.perf_counter()
+    events = run_counting_events(moulinette)
+    wall = time.perf_counter() - start
+
+    limiter = moulinette.tag_limiter
+    pushes = moulinette.metrics.offered_requests
+    return {
+        "events": events,
+        "pushes": pushes,
+        "throttled": limiter.throttled,
+        # a re-check every minute_unit (2) would have cost one event per period
+        "polls_avoided": max(round(limiter.throttled_time / 2) - limiter.throttled, 0),
+        "wall": wall,
+    }
+
+
+def analyze_tag_limit(num_users=2000):
+    print("--- Running Scenario: Tag limit event counts ---")
+    print(f"{'limit':>5} {'window':>6} {'events':>9} {'ev/push':>8} {'throttled':>9} {'polls saved':>11} {'wall (s)':>8}")
+    for tag_limit in (1, 2, 3):
+        for tag_window in (120, 240, 480):
+            row = benchmark_tag_limit(tag_limit, tag_window, num_users)
+            print(
+                f"{tag_limit:>5} {tag_window:>6} {row['events']:>9} {row['events'] / row['pushes']:>8.2f} "
+                f"{row['throttled']:>9} {row['polls_avoided']:>11} {row['wall']:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    analyze_tag_limit()
@@ -0,0 +1,69 @@
+import random
+from dataclasses import replace
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.simulation.optimizer import estimate_arrival_rate
+from src.simulation.tandem import StageSpec, TandemMoulinette, bottleneck, bottleneck_report
+
+STAGES = [
+    StageSpec("build", servers=2, service_time=1.5, buffer=20),
+    StageSpec("test", servers=3, service_time=4, buffer=20, distribution="exponential"),
+    StageSpec("grade", servers=1, service_time=0.8, buffer=5),
+]
+NUM_USERS = 150
+NB_EXOS = 3
+
+
+def run_tandem(stages, num_users=NUM_USERS, seed=42):
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = TandemMoulinette(stages, result_time=0.5, nb_exos=NB_EXOS)
+    moulinette.verbose = False
+    for i in range(num_users):
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo="ING" if random.random() < 0.7 else "PREPA"))
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+    moulinette.env.run()
+    return moulinette.result()
+
+
+def analyze_tandem():
+    print("--- Running Scenario: build -> test -> grade tandem ---")
+    process_time = sum(spec.mean for spec in STAGES)
+    arrival_rate = estimate_arrival_rate(NUM_USERS, process_time, 0.5)
+    print(f"Push rate (closed population estimate): {arrival_rate:.3f} / time unit")
+    print(f"Bottleneck (lowest capacity): {bottleneck(STAGES).name}")
+
+    result = run_tandem(STAGES)
+    print(f"\n{'Stage':<7} {'servers':>7} {'capacity':>8} {'load':>6} {'util':>6} {'avg':>7} {'p95':>7}")
+    for spec, row in zip(STAGES, bottleneck_report(STAGES, result, arrival_rate)):
+        flag = " <- bottleneck" if row["bottleneck"] else ""
+        print(
+            f"{row['name']:<7} {spec.servers:>7} {row['capacity']:>8.3f} {row['load']:>6.2f} "
+            f"{row['utilization']:>6.2f} {row['avg_sojourn']:>7.2f} {row['p95_sojourn']:>7.2f}{flag}"
+        )
+    print(f"Throughput: {result.throughput:.3f}, total sojourn p95: {result.stage('total').p95:.2f}, "
+          f"refused: {result.rejection_rate:.2%}")
+
+    print("\n[Throughput as stages are chained]")
+    for n in range(1, len(STAGES) + 1):
+        r = run_tandem(STAGES[:n])
+        names = " -> ".join(spec.name for spec in STAGES[:n])
+        print(f"{names:<22} throughput={r.throughput:.3f} p95={r.stage('total').p95:.2f}")
+
+    print("\n[One more server on each stage]")
+    for i, spec in enumerate(STAGES):
+        stages = list(STAGES)
+        stages[i] = replace(spec, servers=spec.servers + 1)
+        r = run_tandem(stages)
+        print(
+            f"{spec.name:<7} {spec.servers}->{spec.servers + 1} throughput={r.throughput:.3f} "
+            f"({r.throughput - result.throughput:+.3f}) p95={r.stage('total').p95:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    analyze_tandem()
@@ -0,0 +1,184 @@
+import bisect
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional
+
+
+class RateProfile(ABC):
+    """
+    Time-varying arrival rate lambda(t) of a non-homogeneous Poisson process.
+    """
+
+    @abstractmethod
+    def rate(self, t: float) -> float:
+        ...
+
+    @abstractmethod
+    def next_arrival(self, t: float, rng: random.Random = random) -> float:
+        """Time of the first arrival after t"""
+
+    def mean_rate(self, start: float, end: float, steps: int = 1000) -> float:
+        dt = (end - start) / steps
+        return sum(self.rate(start + (i + 0.5) * dt) for i in range(steps)) / steps
+
+
+class ConstantRate(RateProfile):
+    """Homogeneous Poisson process"""
+
+    def __init__(self, rate: float):
+        self._rate = rate
+
+    def rate(self, t: float) -> float:
+        return self._rate
+
+    def next_arrival(self, t: float, rng: random.Random = random) -> float:
+        return t + rng.expovariate(self._rate)
+
+
+class PiecewiseRate(RateProfile):
+    """
+    Piecewise-constant rate: rates[i] on [breakpoints[i], breakpoints[i+1]).
+
+    Arrivals are generated exactly by inverting the integrated rate segment by
+    segment (no rejection). The last rate holds after the last breakpoint, or
+    the profile repeats if ``period`` is given.
+
+    :param breakpoints: increasing segment start times (first one is usually 0).
+    :param rates: rate of each segment (>= 0).
+    :param period: optional period of the profile (e.g. one day).
+    """
+
+    def __init__(self, breakpoints: List[float], rates: List[float], period: Optional[float] = None):
+        if len(breakpoints) != len(rates):
+            raise ValueError("breakpoints and rates must have the same length")
+        self.breakpoints = list(breakpoints)
+        self.rates = list(rates)
+        self.period = period
+
+    def _segment(self, t: float):
+        """(rate, end of segment) at time t"""
+        offset = 0.0
+        if self.period is not None:
+            offset = math.floor(t / self.period) * self.period
+            t -= offset
+        i = max(bisect.bisect_right(self.breakpoints, t) - 1, 0)
+        if i + 1 < len(self.breakpoints):
+            end = self.breakpoints[i + 1]
+        elif self.period is not None:
+            end = self.period + self.breakpoints[0]
+        else:
+            end = math.inf
+        return self.rates[i], offset + end
+
+    def rate(self, t: float) -> float:
+        return self._segment(t)[0]
+
+    def next_arrival(self, t: float, rng: random.Random = random) -> float:
+        # exponential "budget" of integrated rate spent across segments
+        budget = rng.expovariate(1.0)
+        while True:
+            rate, end = self._segment(t)
+            if rate > 0 and t + budget / rate < end:
+                return t + budget / rate
+            if end == math.inf:
+                return math.inf
+            budget -= rate * (end - t)
+            t = end
+
+
+class FunctionRate(RateProfile):
+    """
+    Arbitrary continuous rate, generated by thinning (Lewis-Shedler).
+
+    :param fn: rate function lambda(t).
+    :param max_rate: upper bound of fn (global, or a function of t giving a
+        bound valid on [t, t + bound_horizon)).
+    :param bound_horizon: validity length of a local bound.
+    """
+
+    def __init__(self, fn: Callable[[float], float], max_rate, bound_horizon: float = math.inf):
+        self.fn = fn
+        self.max_rate = max_rate
+        self.bound_horizon = bound_horizon
+
+    def rate(self, t: float) -> float:
+        return self.fn(t)
+
+    def _bound(self, t: float) -> float:
+        return self.max_rate(t) if callable(self.max_rate) else self.max_rate
+
+    def next_arrival(self, t: float, rng: random.Random = random) -> float:
+        window_end = t + self.bound_horizon
+        bound = self._bound(t)
+        while True:
+            if bound <= 0:
+                t = window_end
+            else:
+                candidate = t + rng.expovariate(bound)
+                if candidate >= window_end:
+                    t = window_end
+                else:
+                    t = candidate
+                    if rng.random() * bound <= self.fn(t):
+                        return t
+                    continue
+            if t == math.inf:
+                return math.inf
+            window_end = t + self.bound_horizon
+            bound = self._bound(t)
+
+
+def deadline_spike(
+    base_rate: float,
+    peak_rate: float,
+    deadline: float,
+    ramp: float,
+    after_rate: Optional[float] = None,
+) -> FunctionRate:
+    """
+    Rate rising exponentially from base_rate to peak_rate at the deadline.
+
+    :param ramp: time constant of the rush before the deadline.
+    :param after_rate: rate after the deadline (defaults to base_rate).
+    """
+    after_rate = base_rate if after_rate is None else after_rate
+
+    def fn(t: float) -> float:
+        if t >= deadline:
+            return after_rate
+        return base_rate + (peak_rate - base_rate) * math.exp(-(deadline - t) / ramp)
+
+    # the rate is increasing until the deadline: the value at the end of the
+    # window is a tight local bound
+    def bound(t: float) -> float:
+        if t >= deadline:
+            return after_rate
+        return max(fn(min(t + ramp, deadline - 1e-9)), after_rate)
+
+    return FunctionRate(fn, bound, bound_horizon=ramp)
+
+
+def as_profile(rate) -> RateProfile:
+    return rate if isinstance(rate, RateProfile) else ConstantRate(rate)
+
+
+def arrival_process(env, rate, spawn: Callable[[], None]):
+    """
+    SimPy process calling spawn() at each arrival of a (possibly
+    non-homogeneous) Poisson process.
+
+    :param rate: float or RateProfile.
+    """
+    if not isinstance(rate, RateProfile):
+        # constant rate: keep the historical random stream
+        while True:
+            yield env.timeout(random.expovariate(rate))
+            spawn()
+
+    while True:
+        t = rate.next_arrival(env.now)
+        if t == math.inf:
+            return
+        yield env.timeout(t - env.now)
+        spawn()
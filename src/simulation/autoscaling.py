@@ -0,0 +1,129 @@
+import math
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import simpy
+
+
+class ElasticResource(simpy.Resource):
+    """
+    simpy.Resource whose capacity can be changed during the run.
+
+    Growing the pool immediately admits waiting requests. Shrinking it lets
+    the jobs in service finish but admits nobody until the number of users is
+    back under the new capacity. The integral of the provisioned capacity
+    over time is tracked for billing.
+    """
+
+    def __init__(self, env: simpy.Environment, capacity: int = 1):
+        super().__init__(env, capacity=capacity)
+        self.server_time = 0.0
+        self._last_change = env.now
+        self.capacity_history: List[Tuple[float, int]] = [(env.now, capacity)]
+
+    def _account(self):
+        now = self._env.now
+        self.server_time += self._capacity * (now - self._last_change)
+        self._last_change = now
+
+    def resize(self, capacity: int):
+        self._account()
+        grown = capacity - self._capacity
+        self._capacity = capacity
+        self.capacity_history.append((self._env.now, capacity))
+        # each _trigger_put admits at most one waiting request
+        for _ in range(max(grown, 0)):
+            self._trigger_put(None)
+
+    def total_server_time(self) -> float:
+        """Integral of the provisioned capacity from the start of the run until now"""
+        self._account()
+        return self.server_time
+
+
+@dataclass
+class AutoscalerPolicy:
+    """
+    Queue-driven scaling policy of the test farm.
+
+    :param min_servers: lower bound of the pool.
+    :param max_servers: upper bound of the pool.
+    :param target_utilization: the pool is sized so that (busy + waiting) / capacity stays near this value.
+    :param scale_up_queue: waiting jobs per server above which the pool grows at least by one step.
+    :param scale_down_queue: the pool only shrinks when at most this many jobs are waiting.
+    :param provisioning_delay: time between the scale-up decision and the server being available.
+    :param cooldown: minimum time between a scaling action and a scale-down.
+    :param interval: evaluation period of the policy.
+    :param step: servers removed per scale-down.
+    """
+
+    min_servers: int = 1
+    max_servers: int = 10
+    target_utilization: float = 0.7
+    scale_up_queue: float = 2.0
+    scale_down_queue: int = 0
+    provisioning_delay: float = 10
+    cooldown: float = 30
+    interval: float = 1
+    step: int = 1
+
+
+class Autoscaler:
+    """
+    Resize the test farm of a Moulinette according to an AutoscalerPolicy.
+
+    :param moulinette: Moulinette whose test_server is an ElasticResource.
+    :param policy: scaling policy.
+    """
+
+    def __init__(self, moulinette, policy: AutoscalerPolicy):
+        self.moulinette = moulinette
+        self.policy = policy
+        self.pending = 0
+        self.last_action = -math.inf
+        self.scale_ups = 0
+        self.scale_downs = 0
+
+    @property
+    def pool(self) -> ElasticResource:
+        return self.moulinette.test_server
+
+    def desired_servers(self) -> int:
+        pool = self.pool
+        p = self.policy
+        load = pool.count + len(pool.queue)
+        desired = math.ceil(load / p.target_utilization) if load else p.min_servers
+        if len(pool.queue) > p.scale_up_queue * pool.capacity:
+            desired = max(desired, pool.capacity + 1)
+        return min(max(desired, p.min_servers), p.max_servers)
+
+    def _provision(self, n: int):
+        self.pending += n
+        yield self.moulinette.env.timeout(self.policy.provisioning_delay)
+        self.pending -= n
+        self.pool.resize(min(self.pool.capacity + n, self.policy.max_servers))
+
+    def run(self):
+        """SimPy process evaluating the policy every ``interval``"""
+        env = self.moulinette.env
+        p = self.policy
+        while not self.moulinette._simulation_finished():
+            pool = self.pool
+            desired = self.desired_servers()
+            planned = pool.capacity + self.pending
+
+            if desired > planned:
+                env.process(self._provision(desired - planned))
+                self.last_action = env.now
+                self.scale_ups += 1
+            elif (
+                desired < pool.capacity
+                and self.pending == 0
+                and len(pool.queue) <= p.scale_down_queue
+                and env.now - self.last_action >= p.cooldown
+            ):
+                pool.resize(max(pool.capacity - p.step, desired))
+                self.last_action = env.now
+                self.scale_downs += 1
+
+            yield env.timeout(p.interval)
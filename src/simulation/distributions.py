@@ -0,0 +1,245 @@
+import hashlib
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# size of the blocks of variates drawn at once with NumPy
+BLOCK_SIZE = 4096
+
+
+@dataclass
+class Distribution(ABC):
+    """
+    Service time distribution.
+
+    ``draw`` serves variates one at a time from blocks pre-drawn with the
+    global NumPy generator (seeded by np.random.seed), so the per-job cost is
+    an array read instead of a Python-level random call.
+    """
+
+    _block: np.ndarray = field(default=None, init=False, repr=False, compare=False)
+    _pos: int = field(default=0, init=False, repr=False, compare=False)
+
+    @property
+    @abstractmethod
+    def mean(self) -> float:
+        ...
+
+    @property
+    @abstractmethod
+    def scv(self) -> float:
+        """squared coefficient of variation (variance / mean^2)"""
+
+    @abstractmethod
+    def sample(self, n: int) -> np.ndarray:
+        ...
+
+    def fresh(self) -> "Distribution":
+        """Same law without the pre-drawn block (a run then only depends on the seed)"""
+        return replace(self)
+
+    def draw(self) -> float:
+        if self._block is None or self._pos >= len(self._block):
+            self._block = self.sample(BLOCK_SIZE)
+            self._pos = 0
+        value = self._block[self._pos]
+        self._pos += 1
+        return float(value)
+
+
+@dataclass
+class Deterministic(Distribution):
+    value: float = 1.0
+
+    @property
+    def mean(self) -> float:
+        return self.value
+
+    @property
+    def scv(self) -> float:
+        return 0.0
+
+    def sample(self, n: int) -> np.ndarray:
+        return np.full(n, float(self.value))
+
+    def draw(self) -> float:
+        return self.value
+
+
+@dataclass
+class Exponential(Distribution):
+    mean_value: float = 1.0
+
+    @property
+    def mean(self) -> float:
+        return self.mean_value
+
+    @property
+    def scv(self) -> float:
+        return 1.0
+
+    def sample(self, n: int) -> np.ndarray:
+        return np.random.exponential(self.mean_value, n)
+
+
+@dataclass
+class LogNormal(Distribution):
+    """Lognormal of the given mean and coefficient of variation"""
+
+    mean_value: float = 1.0
+    cv: float = 1.0
+
+    @property
+    def mean(self) -> float:
+        return self.mean_value
+
+    @property
+    def scv(self) -> float:
+        return self.cv ** 2
+
+    def sample(self, n: int) -> np.ndarray:
+        sigma2 = math.log(1 + self.cv ** 2)
+        mu = math.log(self.mean_value) - sigma2 / 2
+        return np.random.lognormal(mu, math.sqrt(sigma2), n)
+
+
+@dataclass
+class Gamma(Distribution):
+    """Gamma of the given mean and coefficient of variation (cv < 1: less variable than exponential)"""
+
+    mean_value: float = 1.0
+    cv: float = 1.0
+
+    @property
+    def mean(self) -> float:
+        return self.mean_value
+
+    @property
+    def scv(self) -> float:
+        return self.cv ** 2
+
+    def sample(self, n: int) -> np.ndarray:
+        shape = 1 / self.cv ** 2
+        return np.random.gamma(shape, self.mean_value / shape, n)
+
+
+@dataclass
+class HyperExponential(Distribution):
+    """Mixture of exponentials: phase i (mean ``means[i]``) with probability ``probs[i]``"""
+
+    means: Sequence[float] = (1.0,)
+    probs: Sequence[float] = (1.0,)
+
+    def __post_init__(self):
+        if len(self.means) != len(self.probs) or not math.isclose(sum(self.probs), 1.0):
+            raise ValueError("means and probs must have the same length and probs must sum to 1")
+
+    @classmethod
+    def fit(cls, mean: float, cv: float) -> "HyperExponential":
+        """Two-phase fit with balanced means (cv >= 1)"""
+        if cv < 1:
+            raise ValueError("A hyperexponential has cv >= 1")
+        scv = cv ** 2
+        p = 0.5 * (1 + math.sqrt((scv - 1) / (scv + 1)))
+        return cls(means=(mean / (2 * p), mean / (2 * (1 - p))), probs=(p, 1 - p))
+
+    @property
+    def mean(self) -> float:
+        return float(np.dot(self.probs, self.means))
+
+    @property
+    def scv(self) -> float:
+        second = 2 * float(np.dot(self.probs, np.square(self.means)))
+        return second / self.mean ** 2 - 1
+
+    def sample(self, n: int) -> np.ndarray:
+        phases = np.random.choice(len(self.means), size=n, p=self.probs)
+        return np.random.exponential(1.0, n) * np.asarray(self.means)[phases]
+
+
+@dataclass
+class Pareto(Distribution):
+    """Pareto (type I) of the given mean and tail index ``alpha`` (> 1)"""
+
+    mean_value: float = 1.0
+    alpha: float = 2.5
+
+    def __post_init__(self):
+        if self.alpha <= 1:
+            raise ValueError("The mean of a Pareto distribution requires alpha > 1")
+
+    @property
+    def scale(self) -> float:
+        return self.mean_value * (self.alpha - 1) / self.alpha
+
+    @property
+    def mean(self) -> float:
+        return self.mean_value
+
+    @property
+    def scv(self) -> float:
+        if self.alpha <= 2:
+            return math.inf
+        return 1 / (self.alpha * (self.alpha - 2))
+
+    def sample(self, n: int) -> np.ndarray:
+        return self.scale * (1 + np.random.pareto(self.alpha, n))
+
+
+@dataclass(repr=False)
+class Empirical(Distribution):
+    """Resampling (with replacement) of observed service times"""
+
+    data: Sequence[float] = (1.0,)
+
+    def __post_init__(self):
+        self.data = np.asarray(self.data, dtype=float)
+        if len(self.data) == 0:
+            raise ValueError("Empirical distribution needs at least one observation")
+
+    def __repr__(self):
+        # identifies the data without printing it (result cache key)
+        digest = hashlib.sha1(self.data.tobytes()).hexdigest()[:12]
+        return f"Empirical(n={len(self.data)}, sha1={digest})"
+
+    @property
+    def mean(self) -> float:
+        return float(self.data.mean())
+
+    @property
+    def scv(self) -> float:
+        return float(self.data.var() / self.data.mean() ** 2)
+
+    def sample(self, n: int) -> np.ndarray:
+        return self.data[np.random.randint(0, len(self.data), n)]
+
+
+def as_distribution(value) -> Distribution:
+    """A number is a deterministic service time"""
+    if isinstance(value, Distribution):
+        return value.fresh()
+    return Deterministic(value)
+
+
+@dataclass
+class ServiceMultiplier:
+    """
+    Factor applied to the test service time of a commit, per promo and per exercise.
+
+    :param promo: factor per promo (missing: 1).
+    :param exo: factor per exercise number (missing: 1).
+    """
+
+    promo: Optional[Dict[str, float]] = None
+    exo: Optional[Dict[int, float]] = None
+
+    def __call__(self, commit) -> float:
+        factor = 1.0
+        if self.promo:
+            factor *= self.promo.get(commit.user.promo, 1.0)
+        if self.exo:
+            factor *= self.exo.get(commit.exo, 1.0)
+        return factor
@@ -1,7 +1,11 @@
+import itertools
 import simpy
 import random
 import numpy as np
 
+from src.simulation.arrivals import arrival_process
+from src.utils.metrics import RunResult, SojournSummary, SojournSketch, windowed_summary
+
 class MoulinetteSimulation:
     def __init__(self, env, num_exec_servers, exec_time_dist, front_time_dist, ks=float('inf'), kf=float('inf'), backup_prob=0.0):
         self.env = env
@@ -21,6 +25,8 @@ class MoulinetteSimulation:
         self.exec_rejected = 0
         self.front_rejected = 0
         self.stay_times = []
+        self.completed_arrival_times = [] # arrival time of each stay_times entry
+        self.rejected_times = []
         self.results_captured = 0 # for backup
         self.empty_returns = 0
 
@@ -31,6 +37,7 @@ class MoulinetteSimulation:
         # Execution Queue Check
         if len(self.exec_queue.queue) >= self.ks:
             self.exec_rejected += 1
+            self.rejected_times.append(arrival_time)
             return
         
         with self.exec_queue.request() as request:
@@ -72,20 +79,41 @@ class MoulinetteSimulation:
             yield self.env.timeout(duration)
             
         self.stay_times.append(self.env.now - arrival_time)
+        self.completed_arrival_times.append(arrival_time)
+
+    def windowed(self, window: float) -> list:
+        """Per-time-window breakdown (by arrival time) of the run"""
+        return windowed_summary(
+            self.completed_arrival_times, self.stay_times, self.rejected_times,
+            window, end=self.env.now
+        )
+
+    def result(self) -> RunResult:
+        completed = len(self.stay_times)
+        return RunResult(
+            engine=type(self).__name__,
+            total_requests=self.total_requests,
+            completed=completed,
+            test_rejected=self.exec_rejected,
+            result_rejected=self.empty_returns,
+            duration=float(self.env.now),
+            throughput=completed / self.env.now if self.env.now > 0 else 0,
+            sojourn={"total": SojournSummary.from_samples(self.stay_times)},
+            sketches={"total": SojournSketch.from_samples(self.stay_times)},
+        )
 
 def run_waterfall_sim(env, arrival_rate, num_exec, exec_rate, front_rate, ks=float('inf'), kf=float('inf'), backup_prob=0.0, duration=1000):
+    """
+    :param arrival_rate: constant rate or RateProfile (non-homogeneous Poisson arrivals).
+    """
     sim = MoulinetteSimulation(env, num_exec, 
                                lambda: random.expovariate(exec_rate), 
                                lambda: random.expovariate(front_rate),
                                ks=ks, kf=kf, backup_prob=backup_prob)
     
-    def generator(env):
-        student_id = 0
-        while True:
-            yield env.timeout(random.expovariate(arrival_rate))
-            env.process(sim.student_request(student_id))
-            student_id += 1
-            
-    env.process(generator(env))
+    student_ids = itertools.count()
+    env.process(arrival_process(
+        env, arrival_rate, lambda: env.process(sim.student_request(next(student_ids)))
+    ))
     env.run(until=duration)
     return sim
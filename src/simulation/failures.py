@@ -0,0 +1,146 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.simulation.distributions import Distribution, Exponential
+
+
+@dataclass
+class FailureModel:
+    """
+    Failure / repair process of each server of a pool.
+
+    :param mtbf: time between failures (a number is the mean of an exponential law).
+    :param mttr: repair time (a number is the mean of an exponential law).
+    :param mode: "restart" (an interrupted job starts its service again) or
+        "resume" (it only does the remaining work).
+    """
+
+    mtbf: float | Distribution
+    mttr: float | Distribution
+    mode: str = "restart"
+
+    def __post_init__(self):
+        if self.mode not in ("restart", "resume"):
+            raise ValueError(f"Unknown failure mode: {self.mode}")
+        if not isinstance(self.mtbf, Distribution):
+            self.mtbf = Exponential(self.mtbf)
+        if not isinstance(self.mttr, Distribution):
+            self.mttr = Exponential(self.mttr)
+
+    def fresh(self) -> "FailureModel":
+        """Same model without pre-drawn variates (cf. Distribution.fresh)"""
+        return replace(self, mtbf=self.mtbf.fresh(), mttr=self.mttr.fresh())
+
+    @property
+    def availability(self) -> float:
+        """long-run fraction of time a server is up"""
+        return self.mtbf.mean / (self.mtbf.mean + self.mttr.mean)
+
+    def time_to_failure(self) -> float:
+        return self.mtbf.draw()
+
+    def time_to_repair(self) -> float:
+        return self.mttr.draw()
+
+
+def _merge(intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Union of time intervals, sorted"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _inside(times, intervals) -> np.ndarray:
+    times = np.asarray(times, dtype=float)
+    mask = np.zeros(times.shape, dtype=bool)
+    for start, end in intervals:
+        mask |= (times >= start) & (times < end)
+    return mask
+
+
+def outage_report(moulinette) -> Dict[str, dict]:
+    """
+    Effect of the outages of each server pool, comparing the periods with at least one
+    server down to the rest of the run: throughput of completed jobs, blank pages
+    and results backed up per time unit, backup growth, interrupted jobs.
+
+    :param moulinette: Moulinette after the run (failures enabled with enable_failures).
+    :return: pool (test_server, result_server) -> metrics.
+    """
+    m = moulinette.metrics
+    if not m.timestamps:
+        return {}
+    start, end = m.timestamps[0], m.timestamps[-1]
+    duration = end - start
+
+    completions = list(m.result_queue_exit_times.values())
+    # results refused by the result queue: blank page unless backed up
+    blocked = np.asarray(m.result_queue_blocked_times, dtype=float)
+    backups = np.asarray(m.backup_times, dtype=float)
+    timestamps = np.asarray(m.timestamps, dtype=float)
+    backup_length = np.asarray(m.backup_length, dtype=float)
+
+    report = {}
+    for pool in sorted({outage[0] for outage in m.outages}):
+        outages = [(s, min(e, end)) for name, _, s, e in m.outages if name == pool and s < end]
+        degraded = _merge(outages)
+        down_time = sum(e - s for s, e in degraded)
+        up_time = duration - down_time
+
+        def rates(times):
+            inside = int(_inside(times, degraded).sum())
+            return (
+                inside / down_time if down_time > 0 else 0.0,
+                (len(times) - inside) / up_time if up_time > 0 else 0.0,
+            )
+
+        throughput_down, throughput_up = rates(completions)
+        blank_down = int(_inside(blocked, degraded).sum() - _inside(backups, degraded).sum())
+        blank_up = (len(blocked) - len(backups)) - blank_down
+        backup_down, backup_up = rates(backups)
+
+        # backup growth during each degraded period (collect_metrics samples)
+        growth = []
+        for s, e in degraded:
+            window = backup_length[(timestamps >= s) & (timestamps <= e)]
+            if window.size:
+                growth.append(float(window.max() - window[0]))
+
+        servers = len({outage[1] for outage in m.outages if outage[0] == pool})
+        report[pool] = {
+            "outages": len(outages),
+            "servers_failed": servers,
+            "downtime": float(sum(e - s for s, e in outages)),
+            "degraded_time": float(down_time),
+            "degraded_fraction": down_time / duration if duration > 0 else 0.0,
+            "interrupted": m.interrupted.get(pool, 0),
+            "throughput_degraded": throughput_down,
+            "throughput_normal": throughput_up,
+            "throughput_loss": 1 - throughput_down / throughput_up if throughput_up > 0 else 0.0,
+            "blank_pages_degraded": blank_down / down_time if down_time > 0 else 0.0,
+            "blank_pages_normal": blank_up / up_time if up_time > 0 else 0.0,
+            "backups_degraded": backup_down,
+            "backups_normal": backup_up,
+            "max_backup_growth": max(growth, default=0.0),
+        }
+    return report
+
+
+def print_outage_report(report: Dict[str, dict]):
+    for pool, row in report.items():
+        print(
+            f"- {pool}: {row['outages']} outages on {row['servers_failed']} servers, "
+            f"degraded {row['degraded_fraction']:.1%} of the run, {row['interrupted']} jobs interrupted"
+        )
+        print(
+            f"  throughput {row['throughput_degraded']:.3f} vs {row['throughput_normal']:.3f} "
+            f"(loss {row['throughput_loss']:.1%}), blank pages/unit {row['blank_pages_degraded']:.3f} "
+            f"vs {row['blank_pages_normal']:.3f}, backups/unit {row['backups_degraded']:.3f} "
+            f"vs {row['backups_normal']:.3f}, max backup growth {row['max_backup_growth']:.0f}"
+        )
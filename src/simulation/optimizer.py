@@ -0,0 +1,313 @@
+import itertools
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.models.basics import Utilisateur
+from src.models.queuing_theory import mmk_finite_theory, mmk_theory
+from src.simulation.channels_dams.channelsdams import ChannelsAndDams
+from src.simulation.waterfall.backup import WaterfallMoulinetteFiniteBackup
+from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+from src.utils.cache import ResultCache, default_cache
+from src.utils.cost_analysis import CostAnalyzer
+from src.utils.metrics import RunResult
+
+
+@dataclass
+class DesignSpace:
+    """
+    Values explored for each design parameter.
+
+    ``backup`` selects W.Finite (False) or W.Finite + backup (True); a ``tb``
+    other than None selects ChannelsAndDams with that dam period (it always
+    has a backup).
+    """
+
+    K: Sequence[int] = (1, 2, 4, 6, 8, 10, 12)
+    ks: Sequence[int] = (5, 10, 20, 50)
+    kf: Sequence[int] = (1, 5, 10, 20)
+    front_servers: Sequence[int] = (1, 2)
+    backup: Sequence[bool] = (False, True)
+    tb: Sequence[Optional[int]] = (None,)
+
+    def candidates(self) -> Iterator[dict]:
+        for K, ks, kf, front, backup, tb in itertools.product(
+            self.K, self.ks, self.kf, self.front_servers, self.backup, self.tb
+        ):
+            if tb is not None and not backup:
+                continue
+            yield {"K": K, "ks": ks, "kf": kf, "front_servers": front, "backup": backup, "tb": tb}
+
+    def size(self) -> int:
+        return sum(1 for _ in self.candidates())
+
+
+@dataclass
+class SLO:
+    """
+    Service level objectives a configuration must meet.
+
+    :param max_rejection_rate: share of push tags refused by the test queue.
+    :param max_blank_page_rate: share of results lost (refused and not backed up).
+    :param max_p95_sojourn: p95 of the total sojourn (simulation time units).
+    """
+
+    max_rejection_rate: float = 0.05
+    max_blank_page_rate: float = 0.01
+    max_p95_sojourn: float = math.inf
+
+    def violations(self, result: RunResult) -> List[str]:
+        violated = []
+        if result.rejection_rate > self.max_rejection_rate:
+            violated.append("rejection_rate")
+        if result.blank_page_rate > self.max_blank_page_rate:
+            violated.append("blank_page_rate")
+        if result.stage("total").p95 > self.max_p95_sojourn:
+            violated.append("p95_sojourn")
+        return violated
+
+
+@dataclass
+class Evaluation:
+    """Simulated cost of one design, averaged over ``len(seeds)`` replications"""
+
+    design: dict
+    seeds: List[int] = field(default_factory=list)
+    total_cost: float = math.inf
+    cost_per_successful_request: float = math.inf
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def feasible(self) -> bool:
+        return not self.violations
+
+    def rank(self):
+        return (not self.feasible, self.total_cost)
+
+
+def architecture_for(design: dict):
+    if design.get("tb") is not None:
+        return ChannelsAndDams
+    return WaterfallMoulinetteFiniteBackup if design["backup"] else WaterfallMoulinetteFinite
+
+
+def design_config(design: dict, base_config: dict) -> dict:
+    """Constructor arguments of the architecture of a design"""
+    config = {**base_config, "K": design["K"], "ks": design["ks"], "kf": design["kf"],
+              "front_servers": design["front_servers"]}
+    if design.get("tb") is not None:
+        config["tb"] = design["tb"]
+        config["block_option"] = True
+    return config
+
+
+def run_design(architecture_class, config: dict, num_users: int, seed: int, promo_ratio: float = 0.7) -> RunResult:
+    """One silent simulation of a closed Moulinette population"""
+    random.seed(seed)
+    np.random.seed(seed)
+    moulinette = architecture_class(**config)
+    moulinette.verbose = False
+    for i in range(num_users):
+        promo = "ING" if random.random() < promo_ratio else "PREPA"
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo=promo))
+
+    if hasattr(moulinette, "regulate_ing"):
+        moulinette.env.process(moulinette.regulate_ing())
+    if hasattr(moulinette, "free_backup"):
+        moulinette.env.process(moulinette.free_backup())
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+
+    moulinette.env.run()
+    return moulinette.result()
+
+
+def estimate_arrival_rate(
+    num_users: int,
+    process_time: float,
+    result_time: float,
+    pass_chance: float = 0.65,
+    minute_unit: int = 2,
+) -> float:
+    """
+    Push rate of a closed population (users / mean cycle time).
+
+    A cycle is the think time of handle_commit (45 min after a pass, 15 min
+    after a failure) plus the service of the push.
+    """
+    think = (pass_chance * 45 + (1 - pass_chance) * 15) * minute_unit
+    return num_users / (think + process_time + result_time)
+
+
+def analytic_metrics(design: dict, base_config: dict, arrival_rate: float) -> dict:
+    """
+    M/M/K/ks test stage followed by an M/M/f/kf front stage (M/M/f with a backup).
+
+    :return: blocking rates and mean sojourns, in the shape of RunResult.cost_metrics
+        plus the blank page rate.
+    """
+    ks = max(design["ks"], 1)
+    kf = max(design["kf"], 1)
+    test = mmk_finite_theory(arrival_rate, 1 / base_config["process_time"], min(design["K"], ks), ks)
+    lam_front = arrival_rate * (1 - test["p_block"])
+    mu_front = 1 / base_config["result_time"]
+    front = mmk_finite_theory(lam_front, mu_front, min(design["front_servers"], kf), kf)
+    p_front = front["p_block"] * (1 - test["p_block"])
+    if design["backup"]:
+        # the backup makes the result queue infinite: M/M/f (infinite wait if unstable)
+        front = mmk_theory(lam_front, mu_front, design["front_servers"])
+    return {
+        "test_queue": {"blocking_rate": test["p_block"]},
+        # results saved in the backup are not lost
+        "result_queue": {"blocking_rate": 0 if design["backup"] else p_front},
+        "sojourn_times": {
+            "test_queue": {"avg": test["w"]},
+            "result_queue": {"avg": front["w"]},
+        },
+        "blank_page_rate": 0 if design["backup"] else p_front,
+    }
+
+
+class CostOptimizer:
+    """
+    Search the cheapest design meeting an SLO.
+
+    1. ``prefilter``: the analytic model discards designs that are clearly out
+       of the SLO and keeps the ``keep`` cheapest ones by analytic cost.
+    2. ``race``: successive halving on simulations. Every survivor runs on a
+       few seeds, the best 1/eta go to the next rung with eta times more
+       seeds. Replications go through the result cache, so seeds of earlier
+       rungs are never simulated twice.
+
+    :param space: design space.
+    :param base_config: fixed constructor arguments (process_time, result_time, tag_limit, nb_exos).
+    :param slo: service level objectives.
+    :param analyzer: cost model.
+    :param num_users: population size of each simulation.
+    :param time_scale: conversion of the simulated sojourns to the cost model unit.
+    :param cache: result cache (default_cache() by default).
+    """
+
+    def __init__(
+        self,
+        space: DesignSpace,
+        base_config: dict,
+        slo: SLO,
+        analyzer: CostAnalyzer,
+        num_users: int = 30,
+        time_scale: float = 1 / 60,
+        cache: Optional[ResultCache] = None,
+    ):
+        self.space = space
+        self.base_config = base_config
+        self.slo = slo
+        self.analyzer = analyzer
+        self.num_users = num_users
+        self.time_scale = time_scale
+        self.cache = cache or default_cache()
+        self.simulations = 0
+        self.history: List[Dict] = []
+
+    def _cost(self, design: dict, metrics: dict, total_requests: int) -> dict:
+        return self.analyzer.calculate_total_cost(
+            num_test_servers=design["K"],
+            metrics=metrics,
+            total_requests=total_requests,
+            backup_enabled=design["backup"],
+            num_result_servers=design["front_servers"],
+        )
+
+    def prefilter(self, arrival_rate: Optional[float] = None, slack: float = 2.0, keep: int = 27) -> List[dict]:
+        """
+        Analytic screening of the whole design space.
+
+        :param arrival_rate: push rate (estimate_arrival_rate by default).
+        :param slack: tolerance factor on the SLO (the analytic model is approximate).
+        :param keep: maximum number of designs sent to the simulation race.
+        """
+        if arrival_rate is None:
+            arrival_rate = estimate_arrival_rate(
+                self.num_users, self.base_config["process_time"], self.base_config["result_time"]
+            )
+        # each exercise takes 1 / pass_chance pushes on average
+        total_requests = round(self.num_users * self.base_config.get("nb_exos", 10) / 0.65)
+
+        scored = []
+        for design in self.space.candidates():
+            m = analytic_metrics(design, self.base_config, arrival_rate)
+            sojourn = m["sojourn_times"]["test_queue"]["avg"] + m["sojourn_times"]["result_queue"]["avg"]
+            if (math.isinf(sojourn)
+                    or m["test_queue"]["blocking_rate"] > self.slo.max_rejection_rate * slack
+                    or m["blank_page_rate"] > self.slo.max_blank_page_rate * slack
+                    or sojourn > self.slo.max_p95_sojourn * slack):
+                continue
+            scaled = {**m, "sojourn_times": {
+                stage: {"avg": v["avg"] * self.time_scale} for stage, v in m["sojourn_times"].items()
+            }}
+            scored.append((self._cost(design, scaled, total_requests)["total_cost"], design))
+
+        scored.sort(key=lambda x: x[0])
+        return [design for _, design in scored[:keep]]
+
+    def evaluate(self, design: dict, seeds: Sequence[int]) -> Evaluation:
+        """Mean simulated cost of a design over the given seeds"""
+        architecture = architecture_for(design)
+        config = design_config(design, self.base_config)
+        costs, per_success, violations = [], [], set()
+
+        def simulate(seed):
+            self.simulations += 1
+            return run_design(architecture, config, self.num_users, seed)
+
+        for seed in seeds:
+            result = self.cache.run(
+                architecture, {**config, "num_users": self.num_users}, seed, lambda: simulate(seed)
+            )
+
+            metrics = result.cost_metrics(time_scale=self.time_scale)
+            # results saved in the backup are not lost
+            metrics["result_queue"]["blocking_rate"] = result.blank_page_rate
+            cost = self._cost(design, metrics, result.total_requests)
+            costs.append(cost["total_cost"])
+            per_success.append(cost["cost_per_successful_request"])
+            violations.update(self.slo.violations(result))
+
+        return Evaluation(
+            design=design,
+            seeds=list(seeds),
+            total_cost=float(np.mean(costs)),
+            cost_per_successful_request=float(np.mean(per_success)),
+            violations=sorted(violations),
+        )
+
+    def race(self, designs: List[dict], min_seeds: int = 1, eta: int = 3, max_seeds: int = 9) -> List[Evaluation]:
+        """
+        Successive halving: keep the best 1/eta of the designs at each rung.
+
+        :return: evaluations of the last rung, best first.
+        """
+        survivors = list(designs)
+        seeds = min_seeds
+        rung = 0
+        while True:
+            evaluations = sorted(
+                (self.evaluate(design, range(seeds)) for design in survivors),
+                key=Evaluation.rank,
+            )
+            self.history.append({"rung": rung, "designs": len(survivors), "seeds": seeds})
+            if len(evaluations) <= 1 or seeds >= max_seeds:
+                return evaluations
+            survivors = [e.design for e in evaluations[: max(1, math.ceil(len(evaluations) / eta))]]
+            seeds = min(seeds * eta, max_seeds)
+            rung += 1
+
+    def optimize(self, keep: int = 27, eta: int = 3, max_seeds: int = 9, **prefilter_kwargs) -> List[Evaluation]:
+        """Prefilter then race. Returns the final ranking (best first)."""
+        designs = self.prefilter(keep=keep, **prefilter_kwargs)
+        if not designs:
+            return []
+        return self.race(designs, eta=eta, max_seeds=max_seeds)
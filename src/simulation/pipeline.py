@@ -0,0 +1,392 @@
+import random
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import simpy
+
+# Les étapes ne gardent que des noms d'attributs de la moulinette (serveurs,
+# files, tailles) : une architecture est une configuration déclarative, et les
+# ressources remplacées en cours de route (enable_autoscaling, load_snapshot)
+# sont vues par toutes les étapes.
+
+
+class AdmissionGate:
+    """
+    Barrage d'admission : un utilisateur refusé par ``moulinette.is_admitted``
+    réessaie après 1 à 3 unités de temps.
+    """
+
+    def delay(self, moulinette, user) -> float:
+        if moulinette.is_admitted(user):
+            return 0
+        moulinette.log("%s : blocked by ING regulation.", user)
+        return random.randint(1, 3)
+
+
+class RateLimiter:
+    """
+    Limite de tags (``moulinette.tag_limiter``) : un utilisateur limité dort
+    jusqu'à l'expiration de son plus ancien tag.
+    """
+
+    def delay(self, moulinette, user) -> float:
+        return moulinette.tag_limiter.delay(user.name, moulinette.env.now)
+
+
+class Refuse:
+    """
+    Puits d'une étape pleine : le commit est refusé.
+
+    :param status: Statut renvoyé par serve_commit.
+    :param trace_flag: Colonne de la trace marquant le refus (blocked_test ou blocked_result).
+    """
+
+    def __init__(self, status: str, trace_flag: str):
+        self.status = status
+        self.trace_flag = trace_flag
+
+    def reject(self, moulinette, stage: "ServiceStage", commit, job: int) -> str:
+        moulinette.metrics.record_stage_blocked(stage.name, moulinette.env.now)
+        moulinette.log("%s : refused at %s (FULL).", commit, stage.label)
+        moulinette._trace_commit(commit, job, **{self.trace_flag: True})
+        return self.status
+
+
+class BackupSink:
+    """
+    Puits d'une étape d'envoi pleine : le résultat est sauvegardé dans
+    ``moulinette.backup_storage``, vidé ensuite par ``free_backup``.
+    """
+
+    def reject(self, moulinette, stage: "ServiceStage", commit, job: int) -> str:
+        moulinette.metrics.record_stage_blocked(stage.name, moulinette.env.now)
+        moulinette.log("%s : refused at %s (FULL). The result is backed up.", commit, stage.label)
+        moulinette.backup_storage.put((commit, job))
+        moulinette.metrics.record_backup(moulinette.env.now)
+        moulinette._trace_commit(commit, job, blocked_result=True, backup=True)
+        return "backed_up"
+
+
+def serve_on_server(moulinette, stage, commit, request):
+    """
+    Service d'un commit sur le serveur obtenu par ``request``, durée divisée par
+    la vitesse du serveur (cf. ServerPool). Si le serveur tombe en panne
+    (cf. FailureModel), le job repasse en tête de file et recommence (restart) ou
+    termine (resume) son service sur le prochain serveur libre.
+
+    :return: La requête du serveur qui a terminé le service.
+    """
+    m = moulinette
+    work = getattr(m, stage.service)(commit)
+    while True:
+        speed = getattr(request, "speed", 1)
+        start = m.env.now
+        request.in_service = True
+        try:
+            yield m.env.timeout(work / speed)
+        except simpy.Interrupt as failure:
+            m.metrics.record_interrupted(stage.server, m.env.now)
+            m.log("%s : interrupted by a failure at the %s.", commit, stage.label)
+            if failure.cause is not None and failure.cause.mode == "resume":
+                work -= (m.env.now - start) * speed
+            pool = request.resource
+            pool.release(request)
+            request = pool.request_first()
+            yield request
+            continue
+        request.in_service = False
+        return request
+
+
+class ServiceStage:
+    """
+    File FIFO (éventuellement bornée) devant un pool de serveurs.
+
+    :param name: Nom de l'étape dans les métriques (test_queue, result_queue, ...).
+    :param server: Attribut de la moulinette contenant le pool de serveurs (simpy.Resource).
+    :param service: Méthode de la moulinette donnant la durée de service d'un commit.
+    :param queue: Attribut contenant la FIFO bornée (simpy.FilterStore), None si infinie.
+    :param capacity: Attribut contenant la taille de la FIFO (serveurs compris).
+    :param when_full: Puits des commits arrivant sur une FIFO pleine (Refuse ou BackupSink).
+    :param label: Nom de l'étape dans le journal.
+    :param activity: Nom du service dans le journal.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        server: str,
+        service: str,
+        queue: Optional[str] = None,
+        capacity: Optional[str] = None,
+        when_full=None,
+        label: str = "",
+        activity: str = "",
+    ):
+        self.name = name
+        self.server = server
+        self.service = service
+        self.queue = queue
+        self.capacity = capacity
+        self.when_full = when_full
+        self.label = label or name.replace("_", " ")
+        self.activity = activity or f"{name} processing"
+
+    def is_full(self, moulinette) -> bool:
+        if self.queue is None:
+            return False
+        return len(getattr(moulinette, self.queue).items) >= getattr(moulinette, self.capacity)
+
+    def serve(self, moulinette, commit, job: int):
+        """
+        Fait passer un commit dans l'étape.
+
+        :return: None si le commit continue vers l'étape suivante, sinon le statut du refus.
+        """
+        m = moulinette
+        if self.is_full(m):
+            return self.when_full.reject(m, self, commit, job)
+
+        m.metrics.record_stage_entry(self.name, job, m.env.now, commit.user.promo)
+        m.log("%s : enters the %s.", commit, self.label)
+
+        queue = getattr(m, self.queue) if self.queue is not None else None
+        if queue is not None:
+            yield queue.put(commit.user)
+        with getattr(m, self.server).request() as request:
+            yield request
+            m.log("%s : starts %s.", commit, self.activity)
+            served = yield from serve_on_server(m, self, commit, request)
+            m.log("%s : finishes %s.", commit, self.activity)
+            if queue is not None:
+                yield queue.get(lambda x: x == commit.user)
+        if served is not request:
+            # serveur de remplacement obtenu après une panne
+            served.resource.release(served)
+
+        m.metrics.record_stage_exit(self.name, job, m.env.now)
+        return None
+
+
+class StageChain:
+    """
+    Étapes de service en tandem vues comme une seule étape (ex: build -> test -> grade
+    vu comme l'étape de test). Seule la première étape refuse les commits quand
+    elle est pleine ; entre deux étapes, un job terminé garde son serveur tant
+    que la FIFO de l'étape suivante est pleine (blocage après service).
+
+    :param name: Nom de l'ensemble de la chaîne dans les métriques.
+    :param stages: Étapes de la chaîne (ServiceStage), dans l'ordre.
+    :param when_full: Puits des commits arrivant sur une première étape pleine.
+    :param label: Nom de la chaîne dans le journal.
+    """
+
+    def __init__(self, name: str, stages: Tuple[ServiceStage, ...], when_full=None, label: str = ""):
+        self.name = name
+        self.stages = tuple(stages)
+        self.when_full = when_full
+        self.label = label or name.replace("_", " ")
+
+    def is_full(self, moulinette) -> bool:
+        return self.stages[0].is_full(moulinette)
+
+    def serve(self, moulinette, commit, job: int):
+        m = moulinette
+        if self.is_full(m):
+            return self.when_full.reject(m, self, commit, job)
+
+        user = commit.user
+        m.metrics.record_stage_entry(self.name, job, m.env.now, user.promo)
+        first = self.stages[0]
+        if first.queue is not None:
+            yield getattr(m, first.queue).put(user)
+
+        for i, stage in enumerate(self.stages):
+            m.metrics.record_stage_entry(stage.name, job, m.env.now, user.promo)
+            m.log("%s : enters the %s.", commit, stage.label)
+            with getattr(m, stage.server).request() as request:
+                yield request
+                m.log("%s : starts %s.", commit, stage.activity)
+                served = yield from serve_on_server(m, stage, commit, request)
+                m.log("%s : finishes %s.", commit, stage.activity)
+                following = self.stages[i + 1] if i + 1 < len(self.stages) else None
+                if following is not None and following.queue is not None:
+                    yield getattr(m, following.queue).put(user)
+                if stage.queue is not None:
+                    yield getattr(m, stage.queue).get(lambda x: x == user)
+            if served is not request:
+                served.resource.release(served)
+            m.metrics.record_stage_exit(stage.name, job, m.env.now)
+
+        m.metrics.record_stage_exit(self.name, job, m.env.now)
+        return None
+
+
+@dataclass
+class UniformRetry:
+    """
+    Nouvel essai après un refus au bout de ``low`` à ``high`` minutes (uniforme
+    entière). Après ``max_attempts`` essais refusés (None : jamais), l'étudiant
+    abandonne ce push.
+    """
+
+    low: int = 4
+    high: int = 10
+    max_attempts: Optional[int] = None
+
+    def delay(self, attempt: int) -> Optional[float]:
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+        return random.randint(self.low, self.high)
+
+    def mean_delay(self, attempt: int) -> float:
+        return (self.low + self.high) / 2
+
+
+@dataclass
+class ExponentialBackoff:
+    """
+    Attente avant le nouvel essai qui double (``factor``) à chaque refus, bornée
+    par ``cap`` minutes, avec une gigue :
+
+    - "none" : attente exacte ;
+    - "full" : uniforme entre 0 et l'attente ;
+    - "equal" : moitié fixe, moitié uniforme.
+
+    Après ``max_attempts`` essais refusés, l'étudiant abandonne ce push.
+    """
+
+    base: float = 2
+    factor: float = 2
+    cap: float = 60
+    jitter: str = "full"
+    max_attempts: Optional[int] = None
+
+    def __post_init__(self):
+        if self.jitter not in ("none", "full", "equal"):
+            raise ValueError(f"Unknown jitter: {self.jitter}")
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.cap, self.base * self.factor ** (attempt - 1))
+
+    def delay(self, attempt: int) -> Optional[float]:
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return None
+        backoff = self._backoff(attempt)
+        if self.jitter == "full":
+            return random.uniform(0, backoff)
+        if self.jitter == "equal":
+            return backoff / 2 + random.uniform(0, backoff / 2)
+        return backoff
+
+    def mean_delay(self, attempt: int) -> float:
+        backoff = self._backoff(attempt)
+        if self.jitter == "full":
+            return backoff / 2
+        if self.jitter == "equal":
+            return backoff * 3 / 4
+        return backoff
+
+
+class UserBehaviour:
+    """
+    Comportement d'un étudiant : réflexion avant le premier push, chance de
+    passer un exercice (augmentée après chaque échec), réflexion après un
+    succès, un échec ou un refus.
+
+    :param initial_think: Réflexion sur le premier exercice avant le premier push.
+    :param minute_unit: Unités de simulation par minute.
+    :param retry: Politique de nouvel essai après un refus (UniformRetry ou ExponentialBackoff).
+    """
+
+    def __init__(self, initial_think: bool = True, minute_unit: int = 2, retry=None):
+        self.initial_think = initial_think
+        self.minute_unit = minute_unit
+        self.retry = retry or UniformRetry()
+
+    def first_think(self, moulinette) -> float:
+        if not self.initial_think:
+            return 0
+        return moulinette.think_time(45, 15) * self.minute_unit
+
+    def retry_delay(self, moulinette, attempt: int = 1) -> Optional[float]:
+        """
+        Attente avant de repousser un commit refusé.
+
+        :param attempt: Essais déjà refusés pour ce push.
+        :return: None si l'étudiant abandonne ce push.
+        """
+        delay = self.retry.delay(attempt)
+        return None if delay is None else delay * self.minute_unit
+
+    def give_up_delay(self, moulinette) -> float:
+        """Réflexion après l'abandon d'un push (comme après un échec)"""
+        return moulinette.think_time(15, 5) * self.minute_unit
+
+    def outcome(self, moulinette, commit, job: int) -> Optional[float]:
+        """
+        Résultat d'un commit servi.
+
+        :return: Réflexion avant le prochain push, None si l'utilisateur a fini.
+        """
+        m = moulinette
+        user = commit.user
+        exo = commit.exo
+        if random.random() <= commit.chance_to_pass:
+            m.log("%s : commit passed for exo %s !", commit, exo)
+            m._trace_commit(commit, job, passed=1)
+            user.current_exo += 1
+            m.tag_limiter.reset(user.name)
+            user.last_chance = None
+
+            if user.current_exo > m.nb_exos:
+                return None
+            return m.think_time(45, 15) * self.minute_unit
+
+        m.log(
+            "%s : commit failed for exo %s... Increasing chance to pass for next commit.",
+            commit,
+            exo,
+        )
+        m._trace_commit(commit, job, passed=0)
+        more_chance_to_pass = max(min(random.gauss(mu=0.1, sigma=0.015), 0.2), 0.05)
+        user.last_chance = min(commit.chance_to_pass + more_chance_to_pass, 1)
+
+        m.tag_limiter.record(user.name, commit.date)
+        return m.think_time(15, 5) * self.minute_unit
+
+
+@dataclass
+class Pipeline:
+    """
+    Traitement complet d'un commit : portes franchies avant le push, étapes
+    de service en série, comportement de l'utilisateur.
+    """
+
+    stages: Tuple[ServiceStage, ...]
+    gates: Tuple = (RateLimiter(),)
+    behaviour: UserBehaviour = field(default_factory=UserBehaviour)
+
+    def gate_delay(self, moulinette, user) -> float:
+        """Attente imposée par la première porte fermée (0 si le push est autorisé)"""
+        for gate in self.gates:
+            delay = gate.delay(moulinette, user)
+            if delay > 0:
+                return delay
+        return 0
+
+
+def test_stage(**kwargs) -> ServiceStage:
+    """Étape de test (K serveurs test_server, durée test_service_time)"""
+    return ServiceStage(
+        "test_queue", server="test_server", service="test_service_time",
+        label="test queue", activity="testing", **kwargs,
+    )
+
+
+def result_stage(**kwargs) -> ServiceStage:
+    """Étape d'envoi des résultats au front (serveurs result_server, durée result_service_time)"""
+    return ServiceStage(
+        "result_queue", server="result_server", service="result_service_time",
+        label="result queue", activity="result processing", **kwargs,
+    )
@@ -2,6 +2,9 @@ import simpy
 import random
 import numpy as np
 
+from src.simulation.arrivals import arrival_process
+from src.utils.metrics import RunResult, SojournSummary, SojournSketch, windowed_summary
+
 class MultiPopulationSimulation:
     def __init__(self, env, num_exec_servers, exec_queue_size=float('inf')):
         self.env = env
@@ -9,8 +12,8 @@ class MultiPopulationSimulation:
         self.exec_queue_size = exec_queue_size
         
         self.stats = {
-            'ING': {'arrivals': 0, 'stay_times': [], 'rejected': 0},
-            'PREPA': {'arrivals': 0, 'stay_times': [], 'rejected': 0}
+            'ING': {'arrivals': 0, 'stay_times': [], 'arrival_times': [], 'rejected_times': [], 'rejected': 0},
+            'PREPA': {'arrivals': 0, 'stay_times': [], 'arrival_times': [], 'rejected_times': [], 'rejected': 0}
         }
         self.total_requests = 0
         self.ing_blocked = False
@@ -20,11 +23,13 @@ class MultiPopulationSimulation:
         self.stats[pop_type]['arrivals'] += 1
         if pop_type == 'ING' and self.ing_blocked:
             self.stats['ING']['rejected'] += 1
+            self.stats['ING']['rejected_times'].append(self.env.now)
             return
         arrival_time = self.env.now
         
         if len(self.exec_queue.queue) >= self.exec_queue_size:
             self.stats[pop_type]['rejected'] += 1
+            self.stats[pop_type]['rejected_times'].append(arrival_time)
             return
 
         with self.exec_queue.request() as req:
@@ -32,6 +37,35 @@ class MultiPopulationSimulation:
             yield self.env.timeout(exec_time_dist())
             
         self.stats[pop_type]['stay_times'].append(self.env.now - arrival_time)
+        self.stats[pop_type]['arrival_times'].append(arrival_time)
+
+    def windowed(self, window: float, pop_type: str = None) -> list:
+        """Per-time-window breakdown (by arrival time), for one population or all"""
+        pops = [pop_type] if pop_type else list(self.stats)
+        return windowed_summary(
+            [t for p in pops for t in self.stats[p]['arrival_times']],
+            [t for p in pops for t in self.stats[p]['stay_times']],
+            [t for p in pops for t in self.stats[p]['rejected_times']],
+            window, end=self.env.now
+        )
+
+    def result(self) -> RunResult:
+        all_stay_times = [t for stats in self.stats.values() for t in stats['stay_times']]
+        completed = len(all_stay_times)
+        return RunResult(
+            engine=type(self).__name__,
+            total_requests=self.total_requests,
+            completed=completed,
+            test_rejected=sum(stats['rejected'] for stats in self.stats.values()),
+            duration=float(self.env.now),
+            throughput=completed / self.env.now if self.env.now > 0 else 0,
+            sojourn={"total": SojournSummary.from_samples(all_stay_times)},
+            sketches={"total": SojournSketch.from_samples(all_stay_times)},
+            populations={
+                pop: SojournSummary.from_samples(stats['stay_times'])
+                for pop, stats in self.stats.items()
+            },
+        )
 
     def dam_controller(self, initial_tb):
         tb = initial_tb
@@ -56,18 +90,11 @@ def run_population_sim(env, ing_arrival_rate, prepa_arrival_rate,
     
     sim = MultiPopulationSimulation(env, num_exec)
     
-    def ing_generator(env):
-        while True:
-            yield env.timeout(random.expovariate(ing_arrival_rate))
-            env.process(sim.request('ING', lambda: random.expovariate(ing_exec_rate)))
-
-    def prepa_generator(env):
-        while True:
-            yield env.timeout(random.expovariate(prepa_arrival_rate))
-            env.process(sim.request('PREPA', lambda: random.expovariate(prepa_exec_rate)))
-
-    env.process(ing_generator(env))
-    env.process(prepa_generator(env))
+    # arrival rates: constant or RateProfile (non-homogeneous Poisson)
+    env.process(arrival_process(env, ing_arrival_rate, lambda: env.process(
+        sim.request('ING', lambda: random.expovariate(ing_exec_rate)))))
+    env.process(arrival_process(env, prepa_arrival_rate, lambda: env.process(
+        sim.request('PREPA', lambda: random.expovariate(prepa_exec_rate)))))
     
     if initial_tb is not None:
         env.process(sim.dam_controller(initial_tb))
@@ -2,6 +2,9 @@ import simpy
 import random
 import numpy as np
 
+from src.simulation.arrivals import arrival_process
+from src.utils.metrics import RunResult, SojournSummary, SojournSketch, windowed_summary
+
 class PrioritySimulation:
     def __init__(self, env, num_exec_servers):
         self.env = env
@@ -9,8 +12,8 @@ class PrioritySimulation:
         self.exec_queue = simpy.PriorityResource(env, capacity=num_exec_servers)
         
         self.stats = {
-            'ING': {'arrivals': 0, 'stay_times': [], 'priority': 2},
-            'PREPA': {'arrivals': 0, 'stay_times': [], 'priority': 1} # Higher priority
+            'ING': {'arrivals': 0, 'stay_times': [], 'arrival_times': [], 'rejected_times': [], 'priority': 2},
+            'PREPA': {'arrivals': 0, 'stay_times': [], 'arrival_times': [], 'rejected_times': [], 'priority': 1} # Higher priority
         }
         self.total_requests = 0
 
@@ -26,6 +29,34 @@ class PrioritySimulation:
             yield self.env.timeout(exec_time_dist())
             
         self.stats[pop_type]['stay_times'].append(self.env.now - arrival_time)
+        self.stats[pop_type]['arrival_times'].append(arrival_time)
+
+    def windowed(self, window: float, pop_type: str = None) -> list:
+        """Per-time-window breakdown (by arrival time), for one population or all"""
+        pops = [pop_type] if pop_type else list(self.stats)
+        return windowed_summary(
+            [t for p in pops for t in self.stats[p]['arrival_times']],
+            [t for p in pops for t in self.stats[p]['stay_times']],
+            [t for p in pops for t in self.stats[p]['rejected_times']],
+            window, end=self.env.now
+        )
+
+    def result(self) -> RunResult:
+        all_stay_times = [t for stats in self.stats.values() for t in stats['stay_times']]
+        completed = len(all_stay_times)
+        return RunResult(
+            engine=type(self).__name__,
+            total_requests=self.total_requests,
+            completed=completed,
+            duration=float(self.env.now),
+            throughput=completed / self.env.now if self.env.now > 0 else 0,
+            sojourn={"total": SojournSummary.from_samples(all_stay_times)},
+            sketches={"total": SojournSketch.from_samples(all_stay_times)},
+            populations={
+                pop: SojournSummary.from_samples(stats['stay_times'])
+                for pop, stats in self.stats.items()
+            },
+        )
 
 def run_priority_sim(env, ing_arrival_rate, prepa_arrival_rate, 
                       ing_exec_rate, prepa_exec_rate, 
@@ -33,18 +64,11 @@ def run_priority_sim(env, ing_arrival_rate, prepa_arrival_rate,
     
     sim = PrioritySimulation(env, num_exec)
     
-    def ing_generator(env):
-        while True:
-            yield env.timeout(random.expovariate(ing_arrival_rate))
-            env.process(sim.request('ING', lambda: random.expovariate(ing_exec_rate)))
-
-    def prepa_generator(env):
-        while True:
-            yield env.timeout(random.expovariate(prepa_arrival_rate))
-            env.process(sim.request('PREPA', lambda: random.expovariate(prepa_exec_rate)))
-
-    env.process(ing_generator(env))
-    env.process(prepa_generator(env))
+    # arrival rates: constant or RateProfile (non-homogeneous Poisson)
+    env.process(arrival_process(env, ing_arrival_rate, lambda: env.process(
+        sim.request('ING', lambda: random.expovariate(ing_exec_rate)))))
+    env.process(arrival_process(env, prepa_arrival_rate, lambda: env.process(
+        sim.request('PREPA', lambda: random.expovariate(prepa_exec_rate)))))
     
     env.run(until=duration)
     return sim
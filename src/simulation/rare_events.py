@@ -0,0 +1,260 @@
+import math
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+# events of the jump process
+ARRIVAL, TEST_DONE, FRONT_DONE = 0, 1, 2
+
+
+@dataclass
+class RareEventEstimate:
+    """Ratio estimate of a per-arrival probability with its standard error"""
+
+    probability: float
+    std_error: float
+    cycles: int
+    # -> number of jumps simulated (cost of the estimate)
+    jumps: int
+
+    @property
+    def relative_error(self) -> float:
+        return self.std_error / self.probability if self.probability > 0 else math.inf
+
+    def interval(self, z: float = 1.96) -> Tuple[float, float]:
+        return max(self.probability - z * self.std_error, 0.0), self.probability + z * self.std_error
+
+    def work_normalized_variance(self) -> float:
+        """relative variance x jumps: lower is better, comparable across methods"""
+        return self.relative_error ** 2 * self.jumps
+
+
+class WaterfallChain:
+    """
+    Markov chain (n1 jobs in the test stage, n2 in the front stage) of the
+    waterfall model of run_waterfall_sim: Poisson arrivals, exponential
+    services, ``num_exec`` test servers with ``ks`` waiting places, then
+    ``front_servers`` senders with ``kf`` waiting places.
+
+    An arrival finding the test stage full is refused; a result finding the
+    front stage full is lost (blank page).
+    """
+
+    def __init__(
+        self,
+        arrival_rate: float,
+        exec_rate: float,
+        front_rate: float,
+        num_exec: int,
+        ks: int,
+        kf: int,
+        front_servers: int = 1,
+    ):
+        self.lam = arrival_rate
+        self.mu1 = exec_rate
+        self.mu2 = front_rate
+        self.k1 = num_exec
+        self.k2 = front_servers
+        self.c1 = num_exec + ks
+        self.c2 = front_servers + kf
+
+    @classmethod
+    def from_moulinette(cls, moulinette, arrival_rate: float) -> "WaterfallChain":
+        """
+        Markovian approximation of a finite Moulinette (WaterfallMoulinetteFinite
+        and subclasses): exponential services of the same means, Poisson pushes.
+        Its ks / kf count the jobs in service too.
+        """
+        k1 = min(moulinette.test_server.capacity, moulinette.ks)
+        k2 = min(moulinette.result_server.capacity, moulinette.kf)
+        return cls(
+            arrival_rate,
+            1 / moulinette.process_time,
+            1 / moulinette.result_time,
+            num_exec=k1,
+            ks=moulinette.ks - k1,
+            kf=moulinette.kf - k2,
+            front_servers=k2,
+        )
+
+    def rates(self, n1: int, n2: int) -> Tuple[float, float, float]:
+        """(arrival, test completion, front completion) rates in state (n1, n2)"""
+        return self.lam, min(n1, self.k1) * self.mu1, min(n2, self.k2) * self.mu2
+
+    def step(self, n1: int, n2: int, event: int) -> Tuple[int, int, int, int]:
+        """
+        Next state after an event.
+
+        :return: (n1, n2, refused, lost)
+        """
+        if event == ARRIVAL:
+            if n1 >= self.c1:
+                return n1, n2, 1, 0
+            return n1 + 1, n2, 0, 0
+        if event == TEST_DONE:
+            if n2 >= self.c2:
+                return n1 - 1, n2, 0, 1
+            return n1 - 1, n2 + 1, 0, 0
+        return n1, n2 - 1, 0, 0
+
+    def exact(self) -> dict:
+        """
+        Refusal and blank page probabilities per arrival, from the stationary
+        distribution of the chain (dense solve, for validation).
+        """
+        size = (self.c1 + 1) * (self.c2 + 1)
+        q = np.zeros((size, size))
+
+        def index(n1, n2):
+            return n1 * (self.c2 + 1) + n2
+
+        for n1 in range(self.c1 + 1):
+            for n2 in range(self.c2 + 1):
+                i = index(n1, n2)
+                for event, rate in enumerate(self.rates(n1, n2)):
+                    if rate == 0:
+                        continue
+                    m1, m2, refused, _ = self.step(n1, n2, event)
+                    if refused:
+                        continue
+                    q[i, index(m1, m2)] += rate
+                    q[i, i] -= rate
+
+        # pi Q = 0, sum(pi) = 1
+        a = np.vstack([q.T, np.ones(size)])
+        b = np.zeros(size + 1)
+        b[-1] = 1
+        pi = np.linalg.lstsq(a, b, rcond=None)[0].reshape(self.c1 + 1, self.c2 + 1)
+
+        p_block = pi[self.c1, :].sum()
+        lost_rate = sum(pi[n1, self.c2] * min(n1, self.k1) * self.mu1 for n1 in range(self.c1 + 1))
+        return {"p_block": float(p_block), "p_blank": float(lost_rate / self.lam)}
+
+
+def _level(chain: WaterfallChain, target: str, n1: int, n2: int) -> int:
+    """Importance function: occupancy of the stage that must overflow"""
+    return n1 if target == "block" else n2
+
+
+def _run(chain: WaterfallChain, target: str, rng: random.Random, n1: int, n2: int, stop_level: Optional[int]):
+    """
+    Simulate the chain from (n1, n2) until the importance function reaches
+    ``stop_level`` or the cycle ends (empty system).
+
+    :return: (n1, n2, reached, target events, arrivals, jumps)
+    """
+    hits = 0
+    arrivals = 0
+    jumps = 0
+    while n1 or n2:
+        if stop_level is not None and _level(chain, target, n1, n2) >= stop_level:
+            return n1, n2, True, hits, arrivals, jumps
+        lam, test, front = chain.rates(n1, n2)
+        u = rng.random() * (lam + test + front)
+        event = ARRIVAL if u < lam else TEST_DONE if u < lam + test else FRONT_DONE
+        n1, n2, refused, lost = chain.step(n1, n2, event)
+        arrivals += event == ARRIVAL
+        hits += refused if target == "block" else lost
+        jumps += 1
+    return n1, n2, False, hits, arrivals, jumps
+
+
+def _splitting_numerator(chain: WaterfallChain, target: str, effort: int, rng: random.Random):
+    """
+    One fixed-effort splitting estimate of E[target events per cycle].
+
+    :return: (estimate, jumps)
+    """
+    top = chain.c1 if target == "block" else chain.c2
+    entrances = [(1, 0)]
+    estimate = 1.0
+    jumps = 0
+    for level in range(_level(chain, target, 1, 0) + 1, top + 1):
+        reached = []
+        for _ in range(effort):
+            n1, n2 = entrances[rng.randrange(len(entrances))]
+            n1, n2, ok, _, _, n = _run(chain, target, rng, n1, n2, level)
+            jumps += n
+            if ok:
+                reached.append((n1, n2))
+        if not reached:
+            return 0.0, jumps
+        estimate *= len(reached) / effort
+        entrances = reached
+
+    # rest of the cycle from the full state, under the real dynamics
+    remaining = 0
+    for _ in range(effort):
+        n1, n2 = entrances[rng.randrange(len(entrances))]
+        _, _, _, hits, _, n = _run(chain, target, rng, n1, n2, None)
+        remaining += hits
+        jumps += n
+    return estimate * remaining / effort, jumps
+
+
+def estimate_rare_event(
+    chain: WaterfallChain,
+    target: str = "block",
+    effort: int = 500,
+    replications: int = 8,
+    method: str = "splitting",
+    seed: Optional[int] = None,
+) -> RareEventEstimate:
+    """
+    Regenerative estimate of a small per-arrival probability.
+
+    probability = E[target events per cycle] / E[arrivals per cycle], cycles
+    starting with an arrival in the empty system. The denominator (not rare)
+    comes from crude cycles.
+
+    With ``method="splitting"`` (fixed-effort multilevel splitting, a RESTART
+    variant) the numerator is P(the overflowing stage fills up during a cycle)
+    x E[target events in the rest of the cycle | full]. The probability of
+    filling up is the product of the probabilities of climbing each level
+    from the entrance states of the level below, each estimated from
+    ``effort`` trajectories, which keeps the relative error bounded where
+    crude cycles almost never see the event. The standard error comes from
+    ``replications`` independent splitting runs (the entrance states of one
+    run are correlated).
+
+    :param target: "block" (test stage refusal) or "blank" (result lost at the front).
+    :param effort: trajectories per level and per replication.
+    :param replications: independent runs (crude cycles: effort x replications).
+    :param method: "splitting" or "crude" (plain regenerative Monte Carlo, for comparison).
+    """
+    if target not in ("block", "blank"):
+        raise ValueError(f"Unknown target: {target}")
+    if method not in ("splitting", "crude"):
+        raise ValueError(f"Unknown method: {method}")
+    rng = random.Random(seed)
+    cycles = effort * replications
+    jumps = 0
+
+    arrivals = np.empty(cycles)
+    crude_hits = np.empty(cycles)
+    for i in range(cycles):
+        _, _, _, crude_hits[i], arrivals[i], n = _run(chain, target, rng, 1, 0, None)
+        arrivals[i] += 1  # the arrival opening the cycle
+        jumps += n
+    den = arrivals.mean()
+    den_rel_var = arrivals.var(ddof=1) / (den ** 2 * cycles)
+
+    if method == "crude":
+        samples = crude_hits
+    else:
+        samples = np.empty(replications)
+        for r in range(replications):
+            samples[r], n = _splitting_numerator(chain, target, effort, rng)
+            jumps += n
+
+    num = samples.mean()
+    num_rel_var = samples.var(ddof=1) / (num ** 2 * len(samples)) if num > 0 else 0.0
+    p = num / den
+    return RareEventEstimate(
+        probability=float(p),
+        std_error=float(p * math.sqrt(num_rel_var + den_rel_var)),
+        cycles=cycles,
+        jumps=jumps,
+    )
@@ -0,0 +1,76 @@
+from typing import Dict, Hashable
+
+
+class TagWindow:
+    """
+    Ring buffer of the dates of the last ``size`` counted tags of one user.
+
+    Once full, a new tag overwrites the oldest one, so recording is O(1)
+    whatever the limit.
+    """
+
+    __slots__ = ("times", "head", "count")
+
+    def __init__(self, size: int):
+        self.times = [0.0] * size
+        self.head = 0
+        self.count = 0
+
+    def oldest(self) -> float:
+        return self.times[self.head]
+
+    def push(self, time: float):
+        size = len(self.times)
+        if self.count < size:
+            self.times[(self.head + self.count) % size] = time
+            self.count += 1
+        else:
+            self.times[self.head] = time
+            self.head = (self.head + 1) % size
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+
+class TagLimiter:
+    """
+    Sliding-window limit of ``tag_limit`` counted tags per ``window`` and per user.
+
+    Instead of polling, a throttled user asks for ``delay`` and sleeps once,
+    exactly until its oldest tag leaves the window.
+
+    :param tag_limit: counted tags allowed in the window.
+    :param window: length of the sliding window (simulation time units).
+    """
+
+    def __init__(self, tag_limit: int, window: float):
+        self.tag_limit = tag_limit
+        self.window = window
+        self.windows: Dict[Hashable, TagWindow] = {}
+        # -> throttled push attempts and total time spent throttled
+        self.throttled = 0
+        self.throttled_time = 0.0
+
+    def add(self, key: Hashable):
+        self.windows[key] = TagWindow(self.tag_limit)
+
+    def delay(self, key: Hashable, now: float) -> float:
+        """Time to wait before ``key`` may push (0 if allowed now)"""
+        window = self.windows[key]
+        if window.count < self.tag_limit:
+            return 0.0
+        delay = window.oldest() + self.window - now
+        if delay <= 0:
+            return 0.0
+        self.throttled += 1
+        self.throttled_time += delay
+        return delay
+
+    def record(self, key: Hashable, now: float):
+        """Count a tag of ``key`` at ``now``"""
+        self.windows[key].push(now)
+
+    def reset(self, key: Hashable):
+        """Forget the counted tags of ``key`` (exercise passed)"""
+        self.windows[key].clear()
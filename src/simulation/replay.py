@@ -0,0 +1,173 @@
+import csv
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from src.models.basics import Commit, Moulinette, Utilisateur
+
+PASS_VALUES = {"1", "true", "pass", "passed", "ok", "success"}
+FAIL_VALUES = {"0", "false", "fail", "failed", "ko", "failure"}
+
+
+@dataclass
+class PushEvent:
+    """One push tag read from a moulinette log"""
+
+    timestamp: float
+    student: str
+    promo: str
+    exo: int
+    outcome: Optional[bool] = None
+
+
+def _parse_timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _parse_outcome(value) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in PASS_VALUES:
+        return True
+    if value in FAIL_VALUES:
+        return False
+    return None
+
+
+def _to_event(row: dict) -> PushEvent:
+    return PushEvent(
+        timestamp=_parse_timestamp(row["timestamp"]),
+        student=str(row["student"]),
+        promo=str(row.get("promo") or "ING"),
+        exo=int(row.get("exo") or 1),
+        outcome=_parse_outcome(row.get("outcome")),
+    )
+
+
+def read_push_log(path: str, batch_size: int = 65536) -> Iterator[PushEvent]:
+    """
+    Lazily stream a push-tag log sorted by timestamp.
+
+    CSV files are read row by row, Parquet files batch by batch (requires
+    pyarrow), so the log is never fully loaded in memory. Expected columns:
+    timestamp (seconds or ISO date), student, promo, exo, outcome.
+
+    :param path: .csv or .parquet log file.
+    :param batch_size: rows per Parquet batch.
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet logs requires pyarrow (pip install pyarrow)") from e
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            for row in batch.to_pylist():
+                yield _to_event(row)
+    else:
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                yield _to_event(row)
+
+
+class TraceReplay:
+    """
+    Replay a log of real push tags on the service side of a Moulinette.
+
+    The user behaviour (think times, pass chance, tag limit) is replaced by
+    the log: each event is submitted at its timestamp through
+    ``moulinette.serve_commit`` and its recorded outcome is kept.
+
+    :param moulinette: Moulinette instance (any architecture).
+    :param events: iterable of PushEvent sorted by timestamp (e.g. read_push_log).
+    :param time_scale: simulation time units per log second (1 unit = 30s by default).
+    """
+
+    def __init__(
+        self,
+        moulinette: Moulinette,
+        events: Iterable[PushEvent],
+        time_scale: float = 1 / 30,
+    ):
+        self.moulinette = moulinette
+        self.events = events
+        self.time_scale = time_scale
+        self.users: Dict[str, Utilisateur] = {}
+        self.replayed = 0
+        self.statuses: Dict[str, int] = {}
+
+    def _user(self, event: PushEvent) -> Utilisateur:
+        user = self.users.get(event.student)
+        if user is None:
+            user = Utilisateur(name=event.student, promo=event.promo)
+            self.users[event.student] = user
+            self.moulinette.user_index[user.name] = len(self.moulinette.user_index)
+        return user
+
+    def _replay_commit(self, event: PushEvent):
+        m = self.moulinette
+        user = self._user(event)
+        try:
+            # admission dam (ChannelsAndDams), if any: the push waits for it to open
+            while not m.is_admitted(user):
+                yield m.env.timeout(1)
+
+            chance = None if event.outcome is None else float(event.outcome)
+            commit = Commit(user, m.env.now, event.exo, chance)
+            user_id = commit.id
+
+            status = yield from m.serve_commit(commit, user_id)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == "served":
+                passed = -1 if event.outcome is None else int(event.outcome)
+                m._trace_commit(commit, user_id, passed=passed)
+        finally:
+            # the commit in flight counts as an open source until it leaves
+            m.open_sources -= 1
+
+    def source(self):
+        """SimPy process submitting the log events at their (scaled) timestamps"""
+        m = self.moulinette
+        m.open_sources += 1
+        start = None
+        try:
+            for event in self.events:
+                if start is None:
+                    start = event.timestamp
+                at = (event.timestamp - start) * self.time_scale
+                if at > m.env.now:
+                    yield m.env.timeout(at - m.env.now)
+                m.open_sources += 1
+                m.env.process(self._replay_commit(event))
+                self.replayed += 1
+        finally:
+            m.open_sources -= 1
+
+    def run(self, until: Optional[float] = None):
+        """
+        Replay the whole log and drain the queues.
+
+        :param until: optional limit of the simulation time.
+        :return: RunResult of the replay.
+        """
+        m = self.moulinette
+        if m.checkpoint_path is not None:
+            raise ValueError("A replay cannot be checkpointed")
+        m.env.process(self.source())
+        m.env.process(m.collect_metrics())
+        if hasattr(m, "regulate_ing"):
+            m.env.process(m.regulate_ing())
+        if hasattr(m, "free_backup"):
+            m.env.process(m.free_backup())
+        m.env.run(until=until)
+        if m.trace is not None:
+            m.trace.close()
+        return m.result()
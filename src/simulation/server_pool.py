@@ -0,0 +1,174 @@
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import simpy
+
+
+@dataclass
+class ServerClass:
+    """
+    Group of identical test servers of a heterogeneous pool.
+
+    :param name: class name (billing and metrics).
+    :param count: servers of the class.
+    :param speed: speed factor, a job takes service_time / speed on these servers.
+    :param cost_per_hour: price of one server (None: test_server_cost_per_hour of the cost config).
+    """
+
+    name: str
+    count: int
+    speed: float = 1.0
+    cost_per_hour: Optional[float] = None
+
+
+@dataclass
+class FastestFree:
+    """Dispatch to the fastest free server"""
+
+    def choose(self, pool: "ServerPool", free: List[int]) -> Optional[int]:
+        return max(free, key=lambda server: pool.speeds[server])
+
+
+@dataclass
+class RandomFree:
+    """Dispatch to a free server picked uniformly"""
+
+    def choose(self, pool: "ServerPool", free: List[int]) -> Optional[int]:
+        return random.choice(free)
+
+
+@dataclass
+class SlowServerThreshold:
+    """
+    Fastest free server, but a server slower than ``slow_speed`` is only used
+    when at least ``queue`` jobs are waiting: below the threshold, the job
+    waits for a fast server instead of taking a slow one. It only waits if a
+    fast server is up and busy, i.e. will free up; otherwise (slow servers
+    only, fast servers all down) the slow server is used.
+
+    :param slow_speed: servers under this speed factor are slow.
+    :param queue: waiting jobs (the dispatched one included) needed to use a slow server.
+    """
+
+    slow_speed: float = 1.0
+    queue: int = 2
+
+    def choose(self, pool: "ServerPool", free: List[int]) -> Optional[int]:
+        server = max(free, key=lambda server: pool.speeds[server])
+        if pool.speeds[server] < self.slow_speed and len(pool.put_queue) < self.queue:
+            fast_busy = any(
+                pool.busy[other] and not pool.down[other] and speed >= self.slow_speed
+                for other, speed in enumerate(pool.speeds)
+            )
+            if fast_busy:
+                return None
+        return server
+
+
+class ServerPool(simpy.Resource):
+    """
+    Pool of servers with different speeds, used like simpy.Resource.
+
+    A granted request carries the server it was dispatched to (``request.server``)
+    and its speed factor (``request.speed``), by which the service stages divide
+    the service time. The busy time and the jobs of each server are tracked for
+    the per-class utilization. A failed server (``fail``) interrupts the job it
+    is serving and takes no job until ``repair``.
+
+    :param env: SimPy environment.
+    :param classes: server classes of the pool.
+    :param dispatch: dispatch policy (FastestFree by default).
+    """
+
+    def __init__(self, env: simpy.Environment, classes: Sequence[ServerClass], dispatch=None):
+        self.classes = list(classes)
+        self.dispatch = dispatch or FastestFree()
+        self.speeds: List[float] = []
+        self.server_class: List[int] = []
+        for index, server_class in enumerate(self.classes):
+            if server_class.count < 0 or server_class.speed <= 0:
+                raise ValueError(f"Invalid server class: {server_class}")
+            self.speeds += [server_class.speed] * server_class.count
+            self.server_class += [index] * server_class.count
+        if not self.speeds:
+            raise ValueError("A server pool needs at least one server")
+        super().__init__(env, capacity=len(self.speeds))
+        self.busy = [False] * len(self.speeds)
+        self.down = [False] * len(self.speeds)
+        self.holders = [None] * len(self.speeds)
+        self.busy_time = [0.0] * len(self.speeds)
+        self.jobs = [0] * len(self.speeds)
+
+    def fresh(self, env: simpy.Environment) -> "ServerPool":
+        """Empty pool of the same configuration in another environment"""
+        return ServerPool(env, self.classes, self.dispatch)
+
+    def _do_put(self, event) -> bool:
+        free = [server for server, busy in enumerate(self.busy) if not busy and not self.down[server]]
+        server = self.dispatch.choose(self, free) if free else None
+        if server is None:
+            # the queue stays FIFO: nobody overtakes the refused head
+            return False
+        self.busy[server] = True
+        self.holders[server] = event
+        self.jobs[server] += 1
+        event.server = server
+        event.speed = self.speeds[server]
+        self.users.append(event)
+        event.usage_since = self._env.now
+        event.succeed()
+        return True
+
+    def _do_get(self, event) -> None:
+        request = event.request
+        server = getattr(request, "server", None)
+        if server is not None and request in self.users:
+            self.busy[server] = False
+            self.holders[server] = None
+            self.busy_time[server] += self._env.now - request.usage_since
+        super()._do_get(event)
+
+    def request_first(self):
+        """Request placed at the head of the queue (job displaced by a failure)"""
+        request = self.request()
+        if not request.triggered:
+            self.put_queue.remove(request)
+            self.put_queue.insert(0, request)
+        return request
+
+    def fail(self, server: int, cause=None):
+        """
+        Put a server down. The job it is serving (if any) is interrupted with
+        ``cause``; a job blocked after its service keeps the server until it leaves.
+        """
+        self.down[server] = True
+        holder = self.holders[server]
+        if holder is not None and getattr(holder, "in_service", False):
+            holder.in_service = False
+            holder.proc.interrupt(cause)
+        # a job held back for a fast server (SlowServerThreshold) may no longer wait for this one
+        self._trigger_put(None)
+
+    def repair(self, server: int):
+        """Put a failed server back in service"""
+        self.down[server] = False
+        self._trigger_put(None)
+
+    @property
+    def servers_down(self) -> int:
+        return sum(self.down)
+
+    def class_busy_time(self) -> Dict[str, float]:
+        """Busy server x time of each class (jobs in service not counted)"""
+        busy = {server_class.name: 0.0 for server_class in self.classes}
+        for server, time in enumerate(self.busy_time):
+            busy[self.classes[self.server_class[server]].name] += time
+        return busy
+
+    def class_jobs(self) -> Dict[str, int]:
+        """Jobs dispatched to each class"""
+        jobs = {server_class.name: 0 for server_class in self.classes}
+        for server, count in enumerate(self.jobs):
+            jobs[self.classes[self.server_class[server]].name] += count
+        return jobs
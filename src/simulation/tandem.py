@@ -0,0 +1,194 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import simpy
+
+from src.models.basics import Moulinette
+from src.simulation.distributions import Deterministic, Distribution, Exponential
+from src.simulation.pipeline import Pipeline, Refuse, ServiceStage, StageChain, UserBehaviour, result_stage
+from src.utils.metrics import RunResult
+
+
+@dataclass
+class StageSpec:
+    """
+    One step of the test chain (compile, test run, grading...).
+
+    :param name: stage name, used in the metrics (RunResult.sojourn[name]).
+    :param servers: servers of the stage.
+    :param service_time: mean service time, or a Distribution of the service times.
+    :param buffer: places of the stage, jobs in service included (None: infinite).
+    :param distribution: "deterministic" or "exponential" service times (ignored for a Distribution).
+    """
+
+    name: str
+    servers: int
+    service_time: float | Distribution
+    buffer: Optional[int] = None
+    distribution: str = "deterministic"
+    law: Distribution = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if isinstance(self.service_time, Distribution):
+            self.law = self.service_time
+        elif self.distribution == "exponential":
+            self.law = Exponential(self.service_time)
+        elif self.distribution == "deterministic":
+            self.law = Deterministic(self.service_time)
+        else:
+            raise ValueError(f"Unknown distribution: {self.distribution}")
+
+    @property
+    def mean(self) -> float:
+        return self.law.mean
+
+    @property
+    def capacity(self) -> float:
+        """maximum throughput of the stage (jobs per time unit)"""
+        return self.servers / self.mean
+
+    def draw(self) -> float:
+        return self.law.draw()
+
+
+class TandemMoulinette(Moulinette):
+    """
+    Moulinette dont le test est une chaîne de N étapes en tandem (ex: build -> test -> grade),
+    chacune avec ses serveurs, sa FIFO et ses durées de service, suivie de l'envoi
+    du résultat au front.
+
+    La première étape pleine refuse le push ; entre deux étapes, un job terminé
+    garde son serveur tant que l'étape suivante est pleine. Les métriques de
+    test_queue couvrent toute la chaîne, chaque étape a en plus les siennes.
+
+    :param stages: Étapes de la chaîne, dans l'ordre.
+    :param result_time: Temps de process d'un utilisateur dans la file de résultat (nombre ou Distribution).
+    :param kf: Taille de la FIFO d'envoi des résultats (None : infinie).
+    :param front_servers: Nombre de serveurs d'envoi des résultats.
+    :param initial_think: Réflexion sur le premier exercice avant le premier push.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[StageSpec],
+        result_time: int | Distribution = 1,
+        kf: Optional[int] = None,
+        tag_limit: int = 5,
+        nb_exos: int = 10,
+        front_servers: int = 1,
+        tag_window: float = 120,
+        initial_think: bool = True,
+    ):
+        if not stages:
+            raise ValueError("A tandem needs at least one stage")
+        super().__init__(
+            K=stages[0].servers,
+            process_time=sum(spec.mean for spec in stages),
+            result_time=result_time,
+            tag_limit=tag_limit,
+            nb_exos=nb_exos,
+            front_servers=front_servers,
+            tag_window=tag_window,
+        )
+        self.specs = list(stages)
+        self.kf = kf
+        self.stage_utilization: Dict[str, List[float]] = {spec.name: [] for spec in stages}
+
+        chain = []
+        for spec in stages:
+            prefix = f"stage_{spec.name}"
+            setattr(self, f"{prefix}_server", simpy.Resource(self.env, capacity=spec.servers))
+            # own copy of the law: no pre-drawn block left over by an earlier run of the same spec
+            law = spec.law.fresh()
+            setattr(self, f"{prefix}_service_time", lambda commit, law=law: law.draw())
+            queue = capacity = None
+            if spec.buffer is not None:
+                queue, capacity = f"{prefix}_queue", f"{prefix}_buffer"
+                setattr(self, queue, simpy.FilterStore(self.env, capacity=spec.buffer))
+                setattr(self, capacity, spec.buffer)
+            chain.append(ServiceStage(
+                spec.name, server=f"{prefix}_server", service=f"{prefix}_service_time",
+                queue=queue, capacity=capacity, label=f"{spec.name} queue", activity=spec.name,
+            ))
+        # the first stage is the test farm seen by collect_metrics
+        self.test_server = getattr(self, f"stage_{stages[0].name}_server")
+
+        if kf is None:
+            front = result_stage()
+        else:
+            self.result_queue = simpy.FilterStore(self.env, capacity=kf)
+            front = result_stage(queue="result_queue", capacity="kf",
+                                 when_full=Refuse("refused_result", "blocked_result"))
+        self.pipeline = Pipeline(
+            stages=(
+                StageChain("test_queue", chain, when_full=Refuse("refused_test", "blocked_test"),
+                           label="test queue"),
+                front,
+            ),
+            behaviour=UserBehaviour(initial_think=initial_think),
+        )
+
+    def _stage_servers(self):
+        for spec in self.specs:
+            yield spec, getattr(self, f"stage_{spec.name}_server")
+
+    def _simulation_finished(self) -> bool:
+        return super()._simulation_finished() and all(
+            server.count == 0 and len(server.queue) == 0 for _, server in self._stage_servers()
+        )
+
+    def _collect_stage_metrics(self):
+        while not self._simulation_finished():
+            for spec, server in self._stage_servers():
+                # busy servers, blocked-after-service ones included
+                self.stage_utilization[spec.name].append(server.count / server.capacity)
+            yield self.env.timeout(1)
+
+    def collect_metrics(self):
+        self.env.process(self._collect_stage_metrics())
+        yield from super().collect_metrics()
+
+    def result(self) -> RunResult:
+        result = super().result()
+        for name, samples in self.stage_utilization.items():
+            result.utilization[name] = float(np.mean(samples)) if samples else 0.0
+        return result
+
+
+def stage_loads(stages: Sequence[StageSpec], arrival_rate: float) -> List[dict]:
+    """
+    Offered load of each stage for a push rate (every push crosses every stage).
+
+    :return: one row per stage: name, capacity (jobs per time unit), load (rho).
+    """
+    return [
+        {"name": spec.name, "capacity": spec.capacity, "load": arrival_rate / spec.capacity}
+        for spec in stages
+    ]
+
+
+def bottleneck(stages: Sequence[StageSpec]) -> StageSpec:
+    """Stage saturating first when the push rate grows (lowest capacity)"""
+    return min(stages, key=lambda spec: spec.capacity)
+
+
+def bottleneck_report(stages: Sequence[StageSpec], result: RunResult, arrival_rate: float) -> List[dict]:
+    """
+    Analytic loads next to the simulated utilization and sojourn of each stage.
+
+    :param stages: stages of the simulated TandemMoulinette.
+    :param result: RunResult of the simulation.
+    :param arrival_rate: push rate used for the analytic loads.
+    """
+    rows = stage_loads(stages, arrival_rate)
+    first = bottleneck(stages).name
+    for row in rows:
+        summary = result.stage(row["name"])
+        row.update({
+            "utilization": result.utilization.get(row["name"], 0.0),
+            "avg_sojourn": summary.avg,
+            "p95_sojourn": summary.p95,
+            "bottleneck": row["name"] == first,
+        })
+    return rows
@@ -0,0 +1,429 @@
+import argparse
+import fnmatch
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import simpy
+from simpy.events import NORMAL
+
+SEED = 42
+HISTORY = "output/benchmarks/history.json"
+BASELINE = "output/benchmarks/baseline.json"
+
+# configurations of main.py
+MOULINETTE_CONFIGS = {
+    "WaterfallMoulinetteInfinite": {"K": 3, "process_time": 2, "result_time": 1, "tag_limit": 5, "nb_exos": 5},
+    "WaterfallMoulinetteFinite": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 10, "nb_exos": 5},
+    "WaterfallMoulinetteFiniteBackup": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 5, "nb_exos": 5},
+    "ChannelsAndDams": {
+        "K": 3, "process_time": 2, "result_time": 1, "ks": 15, "kf": 8, "tb": 10, "block_option": True, "nb_exos": 5,
+    },
+}
+USER_COUNTS = (30, 300, 3000)
+
+
+@dataclass
+class Workload:
+    """
+    Canonical benchmark workload.
+
+    :param name: workload id (results, history, baseline).
+    :param setup: builds the workload outside the measure (users, traces...) and
+        returns the measured callable, which returns the SimPy environments it ran.
+    :param large: skipped by the quick suite.
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], List[simpy.Environment]]]
+    large: bool = False
+
+
+def _seed(seed: int = SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def moulinette_class(name: str):
+    from src.simulation.channels_dams.channelsdams import ChannelsAndDams
+    from src.simulation.waterfall.backup import WaterfallMoulinetteFiniteBackup
+    from src.simulation.waterfall.finite import WaterfallMoulinetteFinite
+    from src.simulation.waterfall.infinite import WaterfallMoulinetteInfinite
+
+    return {
+        cls.__name__: cls
+        for cls in (WaterfallMoulinetteInfinite, WaterfallMoulinetteFinite, WaterfallMoulinetteFiniteBackup, ChannelsAndDams)
+    }[name]
+
+
+def build_moulinette(architecture: str, num_users: int, config: dict | None = None, seed: int = SEED):
+    """
+    Moulinette ready to run, set up like main.launch_test.
+
+    :param config: arguments of the architecture (default: its main.py configuration).
+    """
+    from src.models.basics import Utilisateur
+
+    _seed(seed)
+    moulinette = moulinette_class(architecture)(**(config or MOULINETTE_CONFIGS[architecture]))
+    moulinette.verbose = False
+    for i in range(num_users):
+        promo = "ING" if random.random() < 0.7 else "PREPA"
+        moulinette.add_user(Utilisateur(name=f"USER{i}", promo=promo))
+    if hasattr(moulinette, "regulate_ing"):
+        moulinette.env.process(moulinette.regulate_ing())
+    if hasattr(moulinette, "free_backup"):
+        moulinette.env.process(moulinette.free_backup())
+    moulinette.env.process(moulinette.collect_metrics())
+    for user in moulinette.users:
+        moulinette.env.process(moulinette.handle_commit(user))
+    return moulinette
+
+
+def _moulinette_workload(architecture: str, num_users: int):
+    def setup():
+        moulinette = build_moulinette(architecture, num_users)
+
+        def run():
+            moulinette.env.run()
+            return [moulinette.env]
+
+        return run
+
+    return setup
+
+
+def _engine_workload(engine_name: str, *args, **kwargs):
+    def setup():
+        from src.simulation import engine, populations, priority
+
+        engines = {
+            "run_waterfall_sim": engine.run_waterfall_sim,
+            "run_population_sim": populations.run_population_sim,
+            "run_priority_sim": priority.run_priority_sim,
+        }
+        _seed()
+        env = simpy.Environment()
+
+        def run():
+            engines[engine_name](env, *args, **kwargs)
+            return [env]
+
+        return run
+
+    return setup
+
+
+def _large_trace():
+    """Metrics of a 3000-user run (the cheapest architecture to simulate at this size)"""
+    moulinette = build_moulinette("WaterfallMoulinetteInfinite", 3000)
+    moulinette.env.run()
+    return moulinette.metrics
+
+
+def _calculate_metrics():
+    metrics = _large_trace()
+
+    def run():
+        metrics.calculate_metrics()
+        return []
+
+    return run
+
+
+def _plot_metrics():
+    import matplotlib
+
+    matplotlib.use("Agg")
+    metrics = _large_trace()
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory, redirect_stdout(io.StringIO()):
+            metrics.plot_metrics(save_filename=os.path.join(directory, "metrics.png"))
+        return []
+
+    return run
+
+
+def _cost_sweep():
+    """analyze_server_costs without the result cache and the plots"""
+    from src.scenarios.scenario_cost import analyze_cost_sensitivity, run_test_for_k
+    from src.utils.cost_analysis import CostAnalyzer, create_cost_config_aws_small
+
+    def run():
+        _seed()
+        server_configs = [1, 2, 4, 6, 8, 10]
+        moulinettes = [run_test_for_k(k) for k in server_configs]
+        results = [moulinette.result() for moulinette in moulinettes]
+        config = create_cost_config_aws_small()
+        config.simulation_duration_hours = 1.0
+        analyzer = CostAnalyzer(config)
+        cost_results = analyzer.calculate_total_cost_from_results(
+            server_configs, results, time_scale=1 / 60, backup_enabled=False
+        )
+        analyzer.calculate_roi_batch(cost_results)
+        with redirect_stdout(io.StringIO()):
+            analyze_cost_sensitivity(server_configs, results)
+        return [moulinette.env for moulinette in moulinettes]
+
+    return run
+
+
+def _cost_batch():
+    """Sensitivity batch alone (10000 scenarios x 6 K x every pricing preset)"""
+    from src.utils.cost_analysis import sensitivity_analysis
+
+    rng = np.random.default_rng(SEED)
+    shape = (10000, 6)
+    batch = {
+        "num_test_servers": np.array([1, 2, 4, 6, 8, 10], dtype=float),
+        "test_blocking_rate": rng.uniform(0, 0.3, shape),
+        "result_blocking_rate": rng.uniform(0, 0.1, shape),
+        "test_avg_wait": rng.uniform(0, 0.2, shape),
+        "result_avg_wait": rng.uniform(0, 0.1, shape),
+        "total_requests": rng.integers(100, 1000, shape).astype(float),
+    }
+
+    def run():
+        sensitivity_analysis(simulation_duration_hours=1.0, **batch)
+        return []
+
+    return run
+
+
+def _workloads() -> Dict[str, Workload]:
+    workloads = [
+        Workload("engine.run_waterfall_sim", _engine_workload("run_waterfall_sim", 1.2, 4, 0.4, 2.0, ks=20, kf=5, duration=20000)),
+        # load 0.73: the queues of both populations stay stable over the whole run
+        Workload("engine.run_population_sim", _engine_workload("run_population_sim", 2.0, 0.2, 6.0, 0.5, num_exec=1, initial_tb=10.0, duration=20000)),
+        Workload("engine.run_priority_sim", _engine_workload("run_priority_sim", 2.0, 0.2, 6.0, 0.5, num_exec=1, duration=20000)),
+    ]
+    for architecture in MOULINETTE_CONFIGS:
+        for num_users in USER_COUNTS:
+            workloads.append(Workload(
+                f"moulinette.{architecture}.U{num_users}",
+                _moulinette_workload(architecture, num_users),
+                large=num_users >= 3000,
+            ))
+    workloads += [
+        Workload("metrics.calculate_metrics", _calculate_metrics),
+        Workload("metrics.plot_metrics", _plot_metrics),
+        Workload("cost.sweep", _cost_sweep),
+        Workload("cost.sensitivity_batch", _cost_batch),
+    ]
+    return {workload.name: workload for workload in workloads}
+
+
+WORKLOADS = _workloads()
+
+
+@contextmanager
+def _counting_events():
+    """
+    Count the events scheduled by every SimPy environment while active (the
+    workloads may create their environments inside the measured run).
+    """
+    counter = [0]
+    schedule = simpy.Environment.schedule
+
+    def counted_schedule(env, event, priority=NORMAL, delay=0):
+        counter[0] += 1
+        schedule(env, event, priority, delay)
+
+    simpy.Environment.schedule = counted_schedule
+    try:
+        yield counter
+    finally:
+        simpy.Environment.schedule = schedule
+
+
+def measure(name: str, allocations: bool = True, min_time: float = 1.0, max_repeats: int = 10) -> dict:
+    """
+    Measure one workload in the current process: wall time (best of the runs
+    made until ``min_time`` seconds are spent, at most ``max_repeats``) and
+    events/sec, peak RSS of the process, then (allocations) peak and live
+    tracemalloc memory of one more, traced run. The events are counted on that
+    extra run (or on an untraced one without allocations), so that counting
+    does not slow the timed runs.
+    """
+    workload = WORKLOADS[name]
+    walls = []
+    while not walls or (sum(walls) < min_time and len(walls) < max_repeats):
+        run = workload.setup()
+        start = time.perf_counter()
+        envs = run()
+        walls.append(time.perf_counter() - start)
+    wall = min(walls)
+    # ru_maxrss: kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    row = {
+        "wall_time": wall,
+        "repeats": len(walls),
+        "sim_time": sum(float(env.now) for env in envs),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20,
+    }
+    run = workload.setup()
+    if allocations:
+        tracemalloc.start()
+    with _counting_events() as counter:
+        run()
+    if allocations:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        row["alloc_peak_mb"] = peak / 2**20
+        row["alloc_blocks"] = sum(stat.count for stat in snapshot.statistics("filename"))
+    row["events"] = counter[0]
+    row["events_per_sec"] = counter[0] / wall if counter[0] and wall > 0 else None
+    return row
+
+
+def calibrate(repeats: int = 5) -> float:
+    """Time of a fixed pure-Python loop (best of ``repeats``), the speed of the machine at the time of the run"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        total = 0
+        for i in range(1_000_000):
+            total += i % 7
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_suite(patterns=("*",), quick: bool = False, allocations: bool = True) -> Dict[str, dict]:
+    """
+    Run the workloads matching ``patterns`` (fnmatch), each one in a fresh
+    process so that its peak RSS is its own.
+
+    :param quick: skip the large workloads (3000 users).
+    """
+    names = [
+        name for name, workload in WORKLOADS.items()
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns) and not (quick and workload.large)
+    ]
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(measure, name, allocations).result()
+        row = results[name]
+        events_per_sec = f"{row['events_per_sec']:>10.0f}" if row["events_per_sec"] else f"{'-':>10}"
+        print(
+            f"{name:<48} {row['wall_time']:>8.3f}s {events_per_sec} ev/s "
+            f"{row['peak_rss_mb']:>7.1f} MB rss {row.get('alloc_peak_mb', float('nan')):>7.1f} MB alloc"
+        )
+    return results
+
+
+def record(results: Dict[str, dict], calibration: float) -> dict:
+    """History entry of a suite run (date, code version, machine)"""
+    from src.utils.cache import code_version
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "code_version": code_version(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "calibration": calibration,
+        "results": results,
+    }
+
+
+def append_history(entry: dict, path=HISTORY):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    history = json.loads(path.read_text()) if path.exists() else []
+    history.append(entry)
+    path.write_text(json.dumps(history, indent=2))
+
+
+def compare(entry: dict, baseline: dict, threshold: float = 0.15) -> List[str]:
+    """
+    Compare a suite run to a baseline entry. A workload regresses when its wall
+    time, peak RSS or peak allocations grow by more than ``threshold``. Times are
+    first rescaled by the calibration loop of each run, so that a machine busier
+    (or faster) than when the baseline was stored does not count.
+
+    :return: regressions, as messages.
+    """
+    results = entry["results"]
+    speed = baseline.get("calibration", 1.0) / entry.get("calibration", 1.0)
+    regressions = []
+    print(f"\nAgainst baseline of {baseline['date']} ({baseline['code_version']}), machine speed x{1 / speed:.2f}:")
+    print(f"{'workload':<48} {'wall':>7} {'ev/s':>7} {'rss':>7} {'alloc':>7}")
+    for name, row in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratios = {}
+        for key in ("wall_time", "events_per_sec", "peak_rss_mb", "alloc_peak_mb"):
+            if row.get(key) and base.get(key):
+                ratios[key] = row[key] / base[key]
+        if "wall_time" in ratios:
+            ratios["wall_time"] *= speed
+            if "events_per_sec" in ratios:
+                ratios["events_per_sec"] /= speed
+        print(f"{name:<48} " + " ".join(
+            f"{ratios[key]:>7.2f}" if key in ratios else f"{'-':>7}"
+            for key in ("wall_time", "events_per_sec", "peak_rss_mb", "alloc_peak_mb")
+        ))
+        for key in ("wall_time", "peak_rss_mb", "alloc_peak_mb"):
+            if ratios.get(key, 1.0) > 1 + threshold:
+                regressions.append(f"{name}: {key} x{ratios[key]:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of the simulators")
+    parser.add_argument("patterns", nargs="*", default=["*"], help="workloads to run (fnmatch, ex: 'moulinette.*')")
+    parser.add_argument("--quick", action="store_true", help="skip the 3000-user workloads")
+    parser.add_argument("--no-allocations", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--list", action="store_true", help="list the workloads")
+    parser.add_argument("--history", default=HISTORY)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="tolerated slowdown / memory growth")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, workload in WORKLOADS.items():
+            print(f"{name}{' (large)' if workload.large else ''}")
+        return
+
+    calibration = calibrate()
+    results = run_suite(args.patterns, quick=args.quick, allocations=not args.no_allocations)
+    entry = record(results, (calibration + calibrate()) / 2)
+    append_history(entry, args.history)
+
+    baseline = Path(args.baseline)
+    regressions = []
+    if baseline.exists():
+        regressions = compare(entry, json.loads(baseline.read_text()), args.threshold)
+    if args.save_baseline:
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(entry, indent=2))
+        print(f"\nBaseline saved to {baseline}")
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"- {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
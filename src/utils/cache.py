@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.utils.metrics import RunResult
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+
+_code_version = None
+
+
+def code_version() -> str:
+    """Hash of every source file under src/ (any code change invalidates the cache)"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(SRC_DIR.rglob("*.py")):
+            digest.update(str(path.relative_to(SRC_DIR)).encode())
+            digest.update(path.read_bytes())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def _simulator_name(simulator) -> str:
+    if isinstance(simulator, str):
+        return simulator
+    return f"{simulator.__module__}.{simulator.__qualname__}"
+
+
+class ResultCache:
+    """
+    Persistent content-addressed store of compact run results.
+
+    Entries are keyed by a hash of (simulator, config, seed, code version) and
+    stored as small JSON files. The oldest-used entries are evicted once the
+    store grows beyond ``max_bytes``.
+
+    :param directory: on-disk location of the store.
+    :param max_bytes: size budget of the store.
+    :param enabled: disabled caches never hit and never write.
+    """
+
+    def __init__(
+        self,
+        directory: str = "output/.cache",
+        max_bytes: int = 256 * 1024 * 1024,
+        enabled: bool = True,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def key(self, simulator, config: dict, seed: Optional[int]) -> str:
+        payload = json.dumps(
+            {
+                "simulator": _simulator_name(simulator),
+                "config": config,
+                "seed": seed,
+                "code": code_version(),
+            },
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str):
+        """Return the cached value (RunResult or dict), or None on a miss"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        # mark as recently used for eviction
+        os.utime(path)
+        self.hits += 1
+        if entry["kind"] == "RunResult":
+            return RunResult.from_dict(entry["data"])
+        return entry["data"]
+
+    def put(self, key: str, value):
+        if not self.enabled:
+            return
+        if isinstance(value, RunResult):
+            entry = {"kind": "RunResult", "data": value.to_dict()}
+        else:
+            entry = {"kind": "dict", "data": value}
+
+        path = self._path(key)
+        size = self.size() - (path.stat().st_size if path.exists() else 0)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # one temporary file per process: parallel cases may write the same cell
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+        self._size = size + path.stat().st_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def size(self) -> int:
+        """Size of the store in bytes (scanned once, then tracked on writes)"""
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self.directory.glob("*/*.json"))
+        return self._size
+
+    def evict(self):
+        """Remove least recently used entries until the store fits in max_bytes"""
+        entries = [(p.stat(), p) for p in self.directory.glob("*/*.json")]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+        self._size = total
+
+    def run(self, simulator, config: dict, seed: Optional[int], fn: Callable[[], object]):
+        """
+        Return the cached value for (simulator, config, seed) or compute it with fn.
+
+        :param fn: callable returning a RunResult or a JSON-serializable dict.
+        """
+        key = self.key(simulator, config, seed)
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            self.put(key, value)
+        return value
+
+
+_default_cache = None
+
+
+def default_cache() -> ResultCache:
+    """Shared cache used by main.py and the scenarios (ERO2_NO_CACHE=1 disables it)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache(enabled=os.environ.get("ERO2_NO_CACHE") != "1")
+    return _default_cache
@@ -0,0 +1,88 @@
+import json
+import os
+import pickle
+from pathlib import Path
+
+from src.utils.metrics import RunResult
+
+
+def write_snapshot(path, state: dict):
+    """
+    Pickle a simulation state atomically: a crash during the write leaves the
+    previous snapshot intact.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path) -> dict:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class SweepJournal:
+    """
+    Append-only journal of the completed cells of a parameter sweep.
+
+    Each finished cell is written as one JSON line and synced to disk before
+    the next cell starts, so a sweep restarted after a crash skips the cells
+    already done. A last line cut by the crash is ignored. The journal only
+    serves to resume: call ``clear`` once the sweep is complete.
+
+    :param path: journal file (created on the first record).
+    :param enabled: disabled journals are empty and never write.
+    """
+
+    def __init__(self, path, enabled: bool = True):
+        self.path = Path(path)
+        self.enabled = enabled
+        self.entries = {}
+        if enabled and self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry["key"]] = entry
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str):
+        """Recorded value (RunResult or dict) of a cell, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry["kind"] == "RunResult":
+            return RunResult.from_dict(entry["data"])
+        return entry["data"]
+
+    def record(self, key: str, value):
+        if not self.enabled:
+            return
+        if isinstance(value, RunResult):
+            entry = {"key": key, "kind": "RunResult", "data": value.to_dict()}
+        else:
+            entry = {"key": key, "kind": "dict", "data": value}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[key] = entry
+
+    def clear(self):
+        """Forget every cell (the sweep is complete, the next one starts from scratch)"""
+        self.entries = {}
+        if self.path.exists():
+            self.path.unlink()
@@ -1,6 +1,25 @@
 import numpy as np
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+# Cost components returned by calculate_total_cost, one field per key
+COST_DTYPE = np.dtype([
+    (name, "f8") for name in (
+        "test_servers_cost", "result_servers_cost", "total_infrastructure", "cost_per_hour",
+        "rejection_cost", "total_rejections", "test_rejections", "result_rejections",
+        "wait_cost", "lost_result_cost", "total_quality_cost",
+        "bandwidth_cost", "total_data_gb", "backup_cost", "total_operational",
+        "total_cost", "cost_per_request", "cost_per_successful_request",
+        "successful_requests", "success_rate",
+    )
+])
+
+ROI_DTYPE = np.dtype([
+    (name, "f8") for name in (
+        "total_revenue", "total_cost", "profit", "roi_percentage", "break_even_requests",
+    )
+])
 
 
 @dataclass
@@ -21,15 +40,42 @@ class CostAnalyzer:
     def __init__(self, config: ServerCostConfig):
         self.config = config
     
+    def class_rate(self, server_class) -> float:
+        """Hourly price of one server of a ServerClass (the config price when unset)"""
+        if server_class.cost_per_hour is None:
+            return self.config.test_server_cost_per_hour
+        return server_class.cost_per_hour
+
+    def calculate_pool_costs(
+        self,
+        server_classes: Sequence,
+        simulation_duration_hours: Optional[float] = None
+    ) -> Dict[str, float]:
+        """Test farm cost of each class of a heterogeneous pool (ServerClass list)"""
+        duration = simulation_duration_hours or self.config.simulation_duration_hours
+        return {
+            server_class.name: server_class.count * self.class_rate(server_class) * duration
+            for server_class in server_classes
+        }
+
     def calculate_infrastructure_costs(
         self,
         num_test_servers: int,
         num_result_servers: int = 1,
-        simulation_duration_hours: Optional[float] = None
+        simulation_duration_hours: Optional[float] = None,
+        test_server_hours: Optional[float] = None,
+        server_classes: Optional[Sequence] = None
     ) -> Dict[str, float]:
         duration = simulation_duration_hours or self.config.simulation_duration_hours
         
-        test_server_cost = num_test_servers * self.config.test_server_cost_per_hour * duration
+        if server_classes is not None:
+            # heterogeneous pool: each class at its own price
+            test_server_cost = sum(self.calculate_pool_costs(server_classes, duration).values())
+        else:
+            # autoscaled farm: bill the provisioned server-hours instead of a fixed pool
+            if test_server_hours is None:
+                test_server_hours = num_test_servers * duration
+            test_server_cost = test_server_hours * self.config.test_server_cost_per_hour
         result_server_cost = num_result_servers * self.config.result_server_cost_per_hour * duration
         total_infrastructure = test_server_cost + result_server_cost
         
@@ -40,6 +86,21 @@ class CostAnalyzer:
             "cost_per_hour": total_infrastructure / duration
         }
     
+    def excessive_wait(self, stage_metrics: Dict) -> float:
+        """
+        Mean wait beyond acceptable_wait_time per job of a stage.
+
+        With a sojourn distribution (SojournSketch under "distribution", in
+        simulation units converted by "scale") the excess is integrated over
+        every job; otherwise it falls back to the excess of the mean.
+        """
+        distribution = stage_metrics.get("distribution")
+        if distribution is not None:
+            return distribution.expected_excess(
+                self.config.acceptable_wait_time, stage_metrics.get("scale", 1.0)
+            )
+        return max(0, stage_metrics.get("avg", 0) - self.config.acceptable_wait_time)
+    
     def calculate_quality_costs(self, metrics: Dict, total_requests: int) -> Dict[str, float]:
         test_rejection_rate = metrics.get("test_queue", {}).get("blocking_rate", 0)
         result_rejection_rate = metrics.get("result_queue", {}).get("blocking_rate", 0)
@@ -50,11 +111,8 @@ class CostAnalyzer:
         
         rejection_cost = total_rejections * self.config.cost_per_rejection
         
-        test_avg_wait = metrics.get("sojourn_times", {}).get("test_queue", {}).get("avg", 0)
-        result_avg_wait = metrics.get("sojourn_times", {}).get("result_queue", {}).get("avg", 0)
-        
-        test_excessive_wait = max(0, test_avg_wait - self.config.acceptable_wait_time)
-        result_excessive_wait = max(0, result_avg_wait - self.config.acceptable_wait_time)
+        test_excessive_wait = self.excessive_wait(metrics.get("sojourn_times", {}).get("test_queue", {}))
+        result_excessive_wait = self.excessive_wait(metrics.get("sojourn_times", {}).get("result_queue", {}))
         
         successful_requests = total_requests - total_rejections
         wait_cost = (successful_requests * (test_excessive_wait + result_excessive_wait) * 
@@ -106,10 +164,17 @@ class CostAnalyzer:
         total_requests: int,
         backup_enabled: bool = False,
         avg_backup_size: Optional[int] = None,
-        simulation_duration_hours: Optional[float] = None
+        simulation_duration_hours: Optional[float] = None,
+        test_server_hours: Optional[float] = None,
+        num_result_servers: int = 1,
+        server_classes: Optional[Sequence] = None
     ) -> Dict[str, float]:
         infrastructure = self.calculate_infrastructure_costs(
-            num_test_servers, simulation_duration_hours=simulation_duration_hours
+            num_test_servers,
+            num_result_servers=num_result_servers,
+            simulation_duration_hours=simulation_duration_hours,
+            test_server_hours=test_server_hours,
+            server_classes=server_classes
         )
         quality = self.calculate_quality_costs(metrics, total_requests)
         operational = self.calculate_operational_costs(total_requests, backup_enabled, avg_backup_size)
@@ -151,6 +216,167 @@ class CostAnalyzer:
         }
 
 
+    def calculate_total_cost_batch(
+        self,
+        num_test_servers,
+        test_blocking_rate,
+        result_blocking_rate,
+        test_avg_wait,
+        result_avg_wait,
+        total_requests,
+        backup_enabled=False,
+        avg_backup_size=None,
+        simulation_duration_hours: Optional[float] = None,
+        test_server_hours=None,
+        num_result_servers=1,
+        test_excess_wait=None,
+        result_excess_wait=None,
+        server_classes: Optional[Sequence] = None
+    ) -> np.ndarray:
+        """
+        Vectorized calculate_total_cost over a batch of configurations.
+
+        Every argument is a scalar or an array (broadcast together); the result
+        is a structured array of COST_DTYPE with one row per configuration,
+        whose rows can be used like the dicts of calculate_total_cost.
+        ``test_excess_wait`` / ``result_excess_wait`` (mean wait beyond the
+        acceptable time, see excessive_wait) replace the excess of the mean.
+        ``server_classes`` bills a heterogeneous pool per class instead of
+        num_test_servers identical servers.
+        """
+        c = self.config
+        duration = simulation_duration_hours or c.simulation_duration_hours
+        (num_test_servers, test_blocking_rate, result_blocking_rate, test_avg_wait,
+         result_avg_wait, total_requests, backup_enabled, avg_backup_size,
+         num_result_servers) = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(num_test_servers, dtype=float)),
+            np.asarray(test_blocking_rate, dtype=float),
+            np.asarray(result_blocking_rate, dtype=float),
+            np.asarray(test_avg_wait, dtype=float),
+            np.asarray(result_avg_wait, dtype=float),
+            np.asarray(total_requests, dtype=float),
+            np.asarray(backup_enabled, dtype=bool),
+            np.asarray(0 if avg_backup_size is None else avg_backup_size, dtype=float),
+            np.asarray(num_result_servers, dtype=float),
+        )
+        out = np.zeros(total_requests.shape, dtype=COST_DTYPE)
+
+        # infrastructure
+        if server_classes is not None:
+            out["test_servers_cost"] = sum(self.calculate_pool_costs(server_classes, duration).values())
+        else:
+            if test_server_hours is None:
+                test_server_hours = num_test_servers * duration
+            test_server_hours = np.asarray(test_server_hours, dtype=float)
+            out["test_servers_cost"] = test_server_hours * c.test_server_cost_per_hour
+        out["result_servers_cost"] = num_result_servers * c.result_server_cost_per_hour * duration
+        out["total_infrastructure"] = out["test_servers_cost"] + out["result_servers_cost"]
+        out["cost_per_hour"] = out["total_infrastructure"] / duration
+
+        # quality
+        out["test_rejections"] = test_blocking_rate * total_requests
+        out["result_rejections"] = result_blocking_rate * total_requests
+        out["total_rejections"] = out["test_rejections"] + out["result_rejections"]
+        out["rejection_cost"] = out["total_rejections"] * c.cost_per_rejection
+        if test_excess_wait is None:
+            test_excess_wait = np.maximum(0, test_avg_wait - c.acceptable_wait_time)
+        if result_excess_wait is None:
+            result_excess_wait = np.maximum(0, result_avg_wait - c.acceptable_wait_time)
+        excessive_wait = np.asarray(test_excess_wait, dtype=float) + np.asarray(result_excess_wait, dtype=float)
+        out["successful_requests"] = total_requests - out["total_rejections"]
+        out["wait_cost"] = out["successful_requests"] * excessive_wait * c.cost_per_minute_excessive_wait
+        out["lost_result_cost"] = out["result_rejections"] * c.cost_per_lost_result
+        out["total_quality_cost"] = out["rejection_cost"] + out["wait_cost"] + out["lost_result_cost"]
+
+        # operational
+        out["total_data_gb"] = (total_requests * c.average_result_size_mb) / 1024
+        out["bandwidth_cost"] = out["total_data_gb"] * c.bandwidth_cost_per_gb
+        backup_size_gb = (avg_backup_size * c.average_result_size_mb) / 1024
+        out["backup_cost"] = np.where(
+            backup_enabled & (avg_backup_size > 0),
+            backup_size_gb * c.backup_storage_cost_per_gb_month * (c.simulation_duration_hours / (30 * 24)),
+            0.0,
+        )
+        out["total_operational"] = out["bandwidth_cost"] + out["backup_cost"]
+
+        # totals
+        out["total_cost"] = out["total_infrastructure"] + out["total_quality_cost"] + out["total_operational"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["cost_per_request"] = np.where(total_requests > 0, out["total_cost"] / total_requests, 0)
+            out["cost_per_successful_request"] = np.where(
+                out["successful_requests"] > 0, out["total_cost"] / out["successful_requests"], np.inf
+            )
+            out["success_rate"] = np.where(
+                total_requests > 0, out["successful_requests"] / total_requests, 0
+            )
+        return out
+
+    def calculate_total_cost_from_results(
+        self,
+        num_test_servers,
+        results: List,
+        time_scale: float = 1.0,
+        backup_enabled=False,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        calculate_total_cost_batch fed with a list of RunResult. The wait
+        penalty is integrated over the sojourn sketches of the results.
+
+        :param time_scale: conversion of the sojourn times to the cost model unit.
+        """
+        def excess(stage):
+            return [self.excessive_wait(r.cost_metrics(time_scale)["sojourn_times"][stage]) for r in results]
+
+        return self.calculate_total_cost_batch(
+            num_test_servers=num_test_servers,
+            test_blocking_rate=[r.rejection_rate for r in results],
+            result_blocking_rate=[r.result_rejection_rate for r in results],
+            test_avg_wait=[r.stage("test_queue").avg * time_scale for r in results],
+            result_avg_wait=[r.stage("result_queue").avg * time_scale for r in results],
+            total_requests=[r.total_requests for r in results],
+            backup_enabled=backup_enabled,
+            test_excess_wait=excess("test_queue"),
+            result_excess_wait=excess("result_queue"),
+            **kwargs
+        )
+
+    def calculate_roi_batch(self, costs: np.ndarray, revenue_per_request: float = 0.50) -> np.ndarray:
+        """Vectorized calculate_roi over a COST_DTYPE array"""
+        out = np.zeros(costs.shape, dtype=ROI_DTYPE)
+        total_cost = costs["total_cost"]
+        out["total_revenue"] = costs["successful_requests"] * revenue_per_request
+        out["total_cost"] = total_cost
+        out["profit"] = out["total_revenue"] - total_cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["roi_percentage"] = np.where(total_cost > 0, out["profit"] / total_cost * 100, 0)
+        out["break_even_requests"] = (total_cost / revenue_per_request
+                                      if revenue_per_request > 0 else np.inf)
+        return out
+
+
+def sensitivity_analysis(
+    presets: Optional[Dict[str, Callable[[], ServerCostConfig]]] = None,
+    simulation_duration_hours: Optional[float] = None,
+    **batch
+) -> Dict[str, np.ndarray]:
+    """
+    Cost of the same batch of configurations under several pricing presets.
+
+    :param presets: name -> config factory (COST_PRESETS by default).
+    :param batch: arguments of CostAnalyzer.calculate_total_cost_batch.
+    :return: name -> COST_DTYPE array.
+    """
+    presets = presets or COST_PRESETS
+    results = {}
+    for name, factory in presets.items():
+        config = factory()
+        if simulation_duration_hours is not None:
+            config.simulation_duration_hours = simulation_duration_hours
+        results[name] = CostAnalyzer(config).calculate_total_cost_batch(**batch)
+    return results
+
+
 def create_cost_config_aws_small() -> ServerCostConfig:
     return ServerCostConfig(
         test_server_cost_per_hour=0.04,
@@ -187,4 +413,11 @@ def create_cost_config_onpremise() -> ServerCostConfig:
         cost_per_minute_excessive_wait=0.02,
         acceptable_wait_time=5.0,
         cost_per_lost_result=0.15
-    )
\ No newline at end of file
+    )
+
+
+COST_PRESETS = {
+    "aws_small": create_cost_config_aws_small,
+    "aws_large": create_cost_config_aws_large,
+    "onpremise": create_cost_config_onpremise,
+}
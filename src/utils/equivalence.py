@@ -0,0 +1,322 @@
+import argparse
+import math
+import random
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import simpy
+from scipy import stats
+
+from src.models.queuing_theory import mg1_theory, mm1_theory, mmk_finite_theory, mmk_theory
+
+
+@dataclass
+class Observation:
+    """
+    What the harness compares of one replication.
+
+    :param sojourn: stage -> sojourn times of the completed jobs, in run order.
+    :param blocking: name -> blocking rate (refused / offered).
+    """
+
+    sojourn: Dict[str, np.ndarray]
+    blocking: Dict[str, float]
+
+
+def _observe(result, sojourn: Dict[str, list]) -> Observation:
+    return Observation(
+        sojourn={stage: np.asarray(samples, dtype=float) for stage, samples in sojourn.items()},
+        blocking={"test": result.rejection_rate, "result": result.result_rejection_rate},
+    )
+
+
+def run_engine(engine: str, config: dict, seed: int) -> Observation:
+    """
+    Reference runner of the run_*_sim engines (engine.py, populations.py, priority.py).
+
+    :param engine: "run_waterfall_sim", "run_population_sim" or "run_priority_sim".
+    :param config: keyword arguments of the engine (without env).
+    """
+    from src.simulation import engine as waterfall, populations, priority
+
+    engines = {
+        "run_waterfall_sim": waterfall.run_waterfall_sim,
+        "run_population_sim": populations.run_population_sim,
+        "run_priority_sim": priority.run_priority_sim,
+    }
+    random.seed(seed)
+    np.random.seed(seed)
+    sim = engines[engine](simpy.Environment(), **config)
+    if hasattr(sim, "stay_times"):
+        sojourn = {"total": sim.stay_times}
+    else:
+        sojourn = {pop: s["stay_times"] for pop, s in sim.stats.items()}
+        # arrival order, as for the other engines
+        arrivals = [t for s in sim.stats.values() for t in s["arrival_times"]]
+        stays = [t for s in sim.stats.values() for t in s["stay_times"]]
+        sojourn["total"] = [stays[i] for i in np.argsort(arrivals, kind="stable")]
+    return _observe(sim.result(), sojourn)
+
+
+def run_moulinette(architecture: str, config: dict, seed: int) -> Observation:
+    """
+    Reference runner of the Moulinette classes.
+
+    :param architecture: class name (WaterfallMoulinetteFinite, ChannelsAndDams...).
+    :param config: arguments of the class, plus ``num_users``.
+    """
+    from src.utils.benchmark import build_moulinette
+
+    config = dict(config)
+    num_users = config.pop("num_users", 30)
+    moulinette = build_moulinette(architecture, num_users, config, seed)
+    moulinette.env.run()
+    samples = moulinette.metrics._sojourn_samples()
+    return _observe(moulinette.result(), {stage: samples[stage] for stage in ("test_queue", "result_queue", "total")})
+
+
+def waterfall_theory(config: dict) -> dict:
+    """
+    Closed forms for run_waterfall_sim: M/M/k/(k+ks) test stage (M/M/k if ks is
+    infinite), then an M/M/1 front fed by its (Poisson, the M/M/k/K queue being
+    reversible) output. The total sojourn is only given for an infinite front queue.
+    """
+    lam, k, mu, front_mu = (config[key] for key in ("arrival_rate", "num_exec", "exec_rate", "front_rate"))
+    ks, kf = config.get("ks", math.inf), config.get("kf", math.inf)
+    if math.isinf(ks):
+        test, p_block = mmk_theory(lam, mu, k), 0.0
+    else:
+        test = mmk_finite_theory(lam, mu, k, k + int(ks))
+        p_block = test["p_block"]
+    theory = {"blocking": {"test": p_block}, "sojourn": {}}
+    if math.isinf(kf) and config.get("backup_prob", 0.0) == 0.0:
+        theory["sojourn"]["total"] = test["w"] + mm1_theory(lam * (1 - p_block), front_mu)["w"]
+    return theory
+
+
+def population_theory(config: dict) -> dict:
+    """
+    Closed form for run_population_sim without dam, one server: M/G/1 whose
+    service law is the mix of the two exponential populations.
+    """
+    if config.get("initial_tb") is not None or config.get("num_exec", 1) != 1:
+        return {}
+    lam_ing, lam_prepa = config["ing_arrival_rate"], config["prepa_arrival_rate"]
+    mu_ing, mu_prepa = config["ing_exec_rate"], config["prepa_exec_rate"]
+    lam = lam_ing + lam_prepa
+    mean = (lam_ing / mu_ing + lam_prepa / mu_prepa) / lam
+    second = (2 * lam_ing / mu_ing**2 + 2 * lam_prepa / mu_prepa**2) / lam
+    return {"sojourn": {"total": mg1_theory(lam, 1 / mean, second - mean**2)["w"]}, "blocking": {"test": 0.0}}
+
+
+@dataclass
+class Check:
+    config: str
+    name: str
+    passed: bool
+    detail: str
+    # an optional check is reported without counting in the verdict
+    required: bool = True
+
+
+@dataclass
+class EquivalenceReport:
+    checks: List[Check] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return all(check.passed for check in self.checks if check.required)
+
+    def failures(self) -> List[Check]:
+        return [check for check in self.checks if check.required and not check.passed]
+
+    def print(self):
+        for check in self.checks:
+            status = "ok" if check.passed else ("FAIL" if check.required else "warn")
+            print(f"[{status:>4}] {check.config:<20} {check.name:<32} {check.detail}")
+        print(f"\nVerdict: {'PASS' if self.passed else 'FAIL'} ({len(self.failures())} failed checks)")
+
+    def to_dict(self) -> dict:
+        return {
+            "passed": self.passed,
+            "checks": [vars(check) for check in self.checks],
+        }
+
+
+def _thin(samples: np.ndarray, warmup: float, max_samples: int) -> np.ndarray:
+    """Samples past the warm-up, evenly spaced (the consecutive sojourns of a run are correlated)"""
+    samples = samples[int(len(samples) * warmup):]
+    if len(samples) <= max_samples:
+        return samples
+    return samples[np.linspace(0, len(samples) - 1, max_samples).astype(int)]
+
+
+def _interval(values, confidence: float):
+    """Student confidence interval of the mean of independent replications"""
+    values = np.asarray(values, dtype=float)
+    mean = float(values.mean())
+    if len(values) < 2:
+        return mean, mean, mean
+    half = stats.t.ppf((1 + confidence) / 2, len(values) - 1) * values.std(ddof=1) / math.sqrt(len(values))
+    return mean, mean - half, mean + half
+
+
+def _replicate(runner, configs, seeds, workers) -> Dict[str, List[Observation]]:
+    tasks = [(name, seed) for name in configs for seed in seeds]
+    if workers == 1:
+        observations = [runner(configs[name], seed) for name, seed in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            observations = list(pool.map(runner, [configs[n] for n, _ in tasks], [s for _, s in tasks]))
+    replications = {name: [] for name in configs}
+    for (name, _), observation in zip(tasks, observations):
+        replications[name].append(observation)
+    return replications
+
+
+def compare_engines(
+    reference: Callable[[dict, int], Observation],
+    candidate: Callable[[dict, int], Observation],
+    configs: Dict[str, dict],
+    replications: int = 20,
+    alpha: float = 0.01,
+    theory: Optional[Callable[[dict], dict]] = None,
+    theory_rtol: float = 0.05,
+    warmup: float = 0.1,
+    max_samples: int = 200,
+    workers: Optional[int] = None,
+) -> EquivalenceReport:
+    """
+    Statistical equivalence of a candidate engine with a reference one.
+
+    Both run ``replications`` independent replications (different seeds) of
+    each config, spread over a process pool. For each config:
+
+    - sojourn distributions of each stage: two-sample Kolmogorov-Smirnov and
+      Anderson-Darling tests on the pooled thinned samples, at level ``alpha``
+      divided by the number of distribution tests (Bonferroni);
+    - mean sojourn and blocking rates: the (1 - alpha) confidence intervals of
+      the replication means must overlap;
+    - ``theory`` (config -> {"sojourn": {stage: mean}, "blocking": {name: rate}}):
+      the candidate must agree with the closed form, within its confidence
+      interval or ``theory_rtol``. The reference is checked too, for information
+      (a failure there means the closed form does not fit the config).
+
+    :param reference: runner (config, seed) -> Observation, ex: partial(run_engine, "run_waterfall_sim").
+    :param candidate: runner of the engine under test, same signature (picklable).
+    :param workers: processes of the pool (None: one per core, 1: no pool).
+    """
+    seeds = range(replications)
+    ref_runs = _replicate(reference, configs, seeds, workers)
+    cand_runs = _replicate(candidate, configs, [replications + seed for seed in seeds], workers)
+    confidence = 1 - alpha
+
+    stages = {
+        name: sorted(set(ref_runs[name][0].sojourn) & set(cand_runs[name][0].sojourn)) for name in configs
+    }
+    level = alpha / max(2 * sum(len(s) for s in stages.values()), 1)
+
+    report = EquivalenceReport()
+    for name, config in configs.items():
+        ref, cand = ref_runs[name], cand_runs[name]
+        for stage in stages[name]:
+            x = np.concatenate([_thin(o.sojourn[stage], warmup, max_samples) for o in ref])
+            y = np.concatenate([_thin(o.sojourn[stage], warmup, max_samples) for o in cand])
+            if len(x) < 2 or len(y) < 2:
+                continue
+            ks = stats.ks_2samp(x, y)
+            report.checks.append(Check(name, f"KS {stage}", ks.pvalue >= level, f"D={ks.statistic:.4f} p={ks.pvalue:.3g} (level {level:.2g})"))
+            with warnings.catch_warnings():
+                # anderson_ksamp caps its p-value to [0.001, 0.25] (and warns otherwise)
+                warnings.simplefilter("ignore")
+                ad = stats.anderson_ksamp([x, y])
+            report.checks.append(Check(name, f"AD {stage}", ad.pvalue >= level, f"A2={ad.statistic:.3f} p~{ad.pvalue:.3g}"))
+
+            ref_ci = _interval([o.sojourn[stage].mean() for o in ref if o.sojourn[stage].size], confidence)
+            cand_ci = _interval([o.sojourn[stage].mean() for o in cand if o.sojourn[stage].size], confidence)
+            report.checks.append(_overlap(name, f"mean sojourn {stage}", ref_ci, cand_ci))
+
+        for key in sorted(set(ref[0].blocking) & set(cand[0].blocking)):
+            ref_ci = _interval([o.blocking[key] for o in ref], confidence)
+            cand_ci = _interval([o.blocking[key] for o in cand], confidence)
+            report.checks.append(_overlap(name, f"blocking {key}", ref_ci, cand_ci))
+
+        expected = theory(config) if theory is not None else {}
+        for label, runs, required in (("candidate", cand, True), ("reference", ref, False)):
+            for kind, values in (("sojourn", expected.get("sojourn", {})), ("blocking", expected.get("blocking", {}))):
+                for key, value in values.items():
+                    if kind == "sojourn":
+                        ci = _interval([o.sojourn[key].mean() for o in runs if o.sojourn[key].size], confidence)
+                    else:
+                        ci = _interval([o.blocking[key] for o in runs], confidence)
+                    agrees = ci[1] <= value <= ci[2] or abs(ci[0] - value) <= theory_rtol * abs(value)
+                    report.checks.append(Check(
+                        name, f"theory {kind} {key} ({label})", agrees,
+                        f"{ci[0]:.4f} [{ci[1]:.4f}, {ci[2]:.4f}] vs {value:.4f}", required,
+                    ))
+    return report
+
+
+def _overlap(config: str, name: str, ref_ci, cand_ci) -> Check:
+    overlap = ref_ci[1] <= cand_ci[2] and cand_ci[1] <= ref_ci[2]
+    return Check(
+        config, name, overlap,
+        f"ref {ref_ci[0]:.4f} [{ref_ci[1]:.4f}, {ref_ci[2]:.4f}] cand {cand_ci[0]:.4f} [{cand_ci[1]:.4f}, {cand_ci[2]:.4f}]",
+    )
+
+
+# control configurations: reference against itself, the harness must conclude PASS
+SELF_CHECKS = {
+    "run_waterfall_sim": (
+        partial(run_engine, "run_waterfall_sim"),
+        {
+            "M/M/4": {"arrival_rate": 1.2, "num_exec": 4, "exec_rate": 0.4, "front_rate": 2.0, "duration": 5000},
+            "M/M/4/9": {"arrival_rate": 1.2, "num_exec": 4, "exec_rate": 0.4, "front_rate": 2.0, "ks": 5, "duration": 5000},
+        },
+        waterfall_theory,
+    ),
+    "run_population_sim": (
+        partial(run_engine, "run_population_sim"),
+        {"M/G/1": {"ing_arrival_rate": 2.0, "prepa_arrival_rate": 0.2, "ing_exec_rate": 6.0, "prepa_exec_rate": 0.5, "duration": 5000}},
+        population_theory,
+    ),
+    "run_priority_sim": (
+        partial(run_engine, "run_priority_sim"),
+        {"priority": {"ing_arrival_rate": 2.0, "prepa_arrival_rate": 0.2, "ing_exec_rate": 6.0, "prepa_exec_rate": 0.5, "duration": 5000}},
+        None,
+    ),
+    "WaterfallMoulinetteFinite": (
+        partial(run_moulinette, "WaterfallMoulinetteFinite"),
+        {"U60": {"K": 4, "process_time": 2, "result_time": 1, "ks": 20, "kf": 10, "nb_exos": 5, "num_users": 60}},
+        None,
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-check of the equivalence harness (reference against itself)")
+    parser.add_argument("engines", nargs="*", default=list(SELF_CHECKS), help=f"among {', '.join(SELF_CHECKS)}")
+    parser.add_argument("--replications", type=int, default=20)
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    verdicts = []
+    for engine in args.engines:
+        runner, configs, theory = SELF_CHECKS[engine]
+        print(f"\n=== {engine} ===")
+        report = compare_engines(
+            runner, runner, configs, replications=args.replications, alpha=args.alpha,
+            theory=theory, workers=args.workers,
+        )
+        report.print()
+        verdicts.append(report.passed)
+    raise SystemExit(0 if all(verdicts) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import simpy
+from simpy.events import NORMAL, Initialize, Process
+
+
+def _process_kind(event, active: Optional[Process]) -> str:
+    """
+    Process an event is charged to: the process it starts (Initialize), else
+    the process that scheduled it, else the process it resumes.
+    """
+    if isinstance(event, Initialize):
+        return event.callbacks[0].__self__.name
+    if active is not None:
+        return active.name
+    for callback in event.callbacks or ():
+        owner = getattr(callback, "__self__", None)
+        if isinstance(owner, Process):
+            return owner.name
+    return "env"
+
+
+class Instrumentation:
+    """
+    Opt-in event counters and phase timers of a SimPy run.
+
+    ``attach`` wraps the ``schedule`` and ``step`` methods of one environment
+    (the class and the other environments are untouched): each event is counted
+    when scheduled and when processed, under the name of the generator function
+    of its process (handle_commit, collect_metrics, free_backup, regulate_ing,
+    student_request, ...), and the depth of the event heap is sampled at each
+    step. ``phase`` times the phases of the run (simulate, calculate_metrics,
+    plot_metrics); ``summary`` gives everything as a JSON-serializable dict.
+
+    :param env: environment to instrument (or call ``attach`` later).
+    """
+
+    def __init__(self, env: simpy.Environment | None = None):
+        self.env: simpy.Environment | None = None
+        self.scheduled: Dict[str, int] = {}
+        self.processed: Dict[str, int] = {}
+        self.heap_max = 0
+        self.heap_total = 0
+        self.steps = 0
+        self.phases: Dict[str, float] = {}
+        self.sim_time = {}  # phase -> simulated time elapsed
+        if env is not None:
+            self.attach(env)
+
+    def attach(self, env: simpy.Environment) -> "Instrumentation":
+        if self.env is not None:
+            raise RuntimeError("Instrumentation is already attached to an environment")
+        self.env = env
+        schedule, step = env.schedule, env.step
+        queue = env._queue
+        scheduled, processed = self.scheduled, self.processed
+
+        def counted_schedule(event, priority=NORMAL, delay=0):
+            kind = _process_kind(event, env.active_process)
+            event._instrumentation_kind = kind
+            scheduled[kind] = scheduled.get(kind, 0) + 1
+            schedule(event, priority, delay)
+            if len(queue) > self.heap_max:
+                self.heap_max = len(queue)
+
+        def counted_step():
+            if queue:
+                event = queue[0][3]
+                kind = getattr(event, "_instrumentation_kind", None)
+                if kind is None:
+                    # event scheduled before attach
+                    kind = _process_kind(event, None)
+                processed[kind] = processed.get(kind, 0) + 1
+                self.heap_total += len(queue)
+                self.steps += 1
+            step()
+
+        env.schedule = counted_schedule
+        env.step = counted_step
+        return self
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a phase of the run (the durations of a repeated phase add up)"""
+        start, sim_start = time.perf_counter(), self.env.now if self.env else 0
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            if self.env is not None:
+                self.sim_time[name] = self.sim_time.get(name, 0.0) + self.env.now - sim_start
+
+    def summary(self, label: str | None = None) -> dict:
+        """
+        Machine-readable summary: wall time per phase, events scheduled and processed
+        per process kind, events/sec and simulated time per wall second of the
+        simulate phase, depth of the event heap.
+        """
+        wall = self.phases.get("simulate", 0.0)
+        simulated = self.sim_time.get("simulate", self.env.now if self.env else 0.0)
+        events = sum(self.processed.values())
+        kinds = sorted(set(self.scheduled) | set(self.processed))
+        return {
+            "label": label,
+            "sim_time": float(simulated),
+            "phases": {name: round(value, 6) for name, value in self.phases.items()},
+            "wall_time": round(sum(self.phases.values()), 6),
+            "events": {
+                "scheduled": sum(self.scheduled.values()),
+                "processed": events,
+                "per_process": {
+                    kind: {
+                        "scheduled": self.scheduled.get(kind, 0),
+                        "processed": self.processed.get(kind, 0),
+                    }
+                    for kind in kinds
+                },
+            },
+            "events_per_sec": events / wall if wall > 0 else 0.0,
+            "sim_time_per_wall_sec": simulated / wall if wall > 0 else 0.0,
+            "heap": {
+                "max": self.heap_max,
+                "avg": self.heap_total / self.steps if self.steps else 0.0,
+            },
+        }
+
+    def write(self, path, label: str | None = None) -> dict:
+        """Write the summary as JSON and return it"""
+        summary = self.summary(label)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def run_instrumented(engine: Callable, *args, output=None, **kwargs):
+    """
+    Run one of the ``run_*_sim`` engines in an instrumented environment.
+
+    :param engine: run_waterfall_sim, run_population_sim or run_priority_sim.
+    :param output: JSON file of the summary (None: not written).
+    :return: the engine's simulation, with its Instrumentation in ``sim.instrumentation``.
+    """
+    env = simpy.Environment()
+    instrumentation = Instrumentation(env)
+    with instrumentation.phase("simulate"):
+        sim = engine(env, *args, **kwargs)
+    sim.instrumentation = instrumentation
+    if output is not None:
+        instrumentation.write(output, label=engine.__name__)
+    return sim
@@ -1,7 +1,7 @@
+import math
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Dict, List, Tuple
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field, asdict, replace
 
 def calculate_empirical_stats(stay_times):
     if not stay_times:
@@ -10,6 +10,361 @@ def calculate_empirical_stats(stay_times):
     variance = np.var(stay_times)
     return mean, variance
 
+
+@dataclass
+class SojournSummary:
+    """Compact summary of a sojourn time sample (one stage or one population)"""
+
+    count: int = 0
+    avg: float = 0.0
+    var: float = 0.0
+    min: float = 0.0
+    max: float = 0.0
+    p50: float = 0.0
+    p90: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+
+    @classmethod
+    def from_samples(cls, samples) -> "SojournSummary":
+        samples = np.asarray(samples, dtype=float)
+        if samples.size == 0:
+            return cls()
+        p50, p90, p95, p99 = np.percentile(samples, [50, 90, 95, 99])
+        return cls(
+            count=int(samples.size),
+            avg=float(np.mean(samples)),
+            var=float(np.var(samples)),
+            min=float(np.min(samples)),
+            max=float(np.max(samples)),
+            p50=float(p50),
+            p90=float(p90),
+            p95=float(p95),
+            p99=float(p99),
+        )
+
+
+@dataclass
+class SojournSketch:
+    """
+    Mergeable log-bucket histogram of a sojourn distribution.
+
+    Every positive value falls in bucket ceil(log(x) / log(gamma)) with
+    gamma = (1 + alpha) / (1 - alpha), so quantiles and tail integrals are
+    known within a relative error alpha from a few hundred counters,
+    whatever the number of jobs.
+    """
+
+    alpha: float = 0.01
+    count: int = 0
+    total: float = 0.0
+    zero_count: int = 0
+    bins: Dict[int, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # JSON turns the bucket indexes into strings
+        self.bins = {int(k): int(v) for k, v in self.bins.items()}
+
+    @property
+    def gamma(self) -> float:
+        return (1 + self.alpha) / (1 - self.alpha)
+
+    @classmethod
+    def from_samples(cls, samples, alpha: float = 0.01) -> "SojournSketch":
+        sketch = cls(alpha=alpha)
+        sketch.add_many(samples)
+        return sketch
+
+    def add_many(self, samples):
+        samples = np.asarray(samples, dtype=float)
+        samples = samples[~np.isnan(samples)]
+        if samples.size == 0:
+            return
+        self.count += int(samples.size)
+        self.total += float(samples.sum())
+        positive = samples[samples > 0]
+        self.zero_count += int(samples.size - positive.size)
+        if positive.size:
+            index, counts = np.unique(
+                np.ceil(np.log(positive) / np.log(self.gamma)).astype(np.int64), return_counts=True
+            )
+            for i, c in zip(index.tolist(), counts.tolist()):
+                self.bins[i] = self.bins.get(i, 0) + c
+
+    def add(self, value: float):
+        """Add one value (cheap enough to be called for every job of a run)"""
+        if math.isnan(value):
+            return
+        self.count += 1
+        self.total += value
+        if value > 0:
+            index = math.ceil(math.log(value) / math.log(self.gamma))
+            self.bins[index] = self.bins.get(index, 0) + 1
+        else:
+            self.zero_count += 1
+
+    def merge(self, other: "SojournSketch"):
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge sketches with different accuracies")
+        self.count += other.count
+        self.total += other.total
+        self.zero_count += other.zero_count
+        for i, c in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + c
+
+    def _buckets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(representative value, count) of every bucket, increasing values"""
+        index = np.array(sorted(self.bins), dtype=float)
+        counts = np.array([self.bins[int(i)] for i in index], dtype=float)
+        values = 2 * self.gamma ** index / (self.gamma + 1)
+        return np.concatenate([[0.0], values]), np.concatenate([[self.zero_count], counts])
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        values, counts = self._buckets()
+        rank = q * (self.count - 1)
+        return float(values[np.searchsorted(np.cumsum(counts), rank, side="right")])
+
+    def expected_excess(self, threshold: float, scale=1.0):
+        """
+        Mean over the jobs of max(0, scale * sojourn - threshold).
+
+        :param scale: conversion of the sojourns to the unit of the threshold;
+            an array of scales gives an array of excesses.
+        """
+        scale = np.asarray(scale, dtype=float)
+        if self.count == 0:
+            excess = np.zeros(scale.shape)
+        else:
+            values, counts = self._buckets()
+            excess = np.maximum(0.0, np.multiply.outer(scale, values) - threshold) @ counts / self.count
+        return float(excess) if excess.ndim == 0 else excess
+
+    def exceedance(self, threshold: float, scale: float = 1.0) -> float:
+        """Share of the jobs whose (scaled) sojourn exceeds threshold"""
+        if self.count == 0:
+            return 0.0
+        values, counts = self._buckets()
+        return float(np.sum(counts[values * scale > threshold]) / self.count)
+
+
+@dataclass
+class RunResult:
+    """Result record emitted by every simulation engine"""
+
+    engine: str
+    # -> number of jobs submitted to the system (including refused ones)
+    total_requests: int = 0
+    # -> number of jobs whose result reached the front
+    completed: int = 0
+    # -> push tags refused by the test queue
+    test_rejected: int = 0
+    # -> results refused by the result queue (blank page unless backed up)
+    result_rejected: int = 0
+    # -> refused results saved in the backup
+    backed_up: int = 0
+    duration: float = 0.0
+    throughput: float = 0.0
+    # -> "test_queue", "result_queue", "total"
+    sojourn: Dict[str, SojournSummary] = field(default_factory=dict)
+    # -> total sojourn per population ("ING", "PREPA")
+    populations: Dict[str, SojournSummary] = field(default_factory=dict)
+    # -> average server utilization per stage
+    utilization: Dict[str, float] = field(default_factory=dict)
+    # -> provisioned server x time per stage (capacity integral for elastic pools)
+    server_time: Dict[str, float] = field(default_factory=dict)
+    # -> sojourn distribution per stage ("test_queue", "result_queue", "total")
+    sketches: Dict[str, SojournSketch] = field(default_factory=dict)
+    # -> retrial behaviour: orbit size, attempts per push, offered vs effective load
+    retrial: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def blank_pages(self) -> int:
+        return self.result_rejected - self.backed_up
+
+    @property
+    def rejection_rate(self) -> float:
+        return self.test_rejected / self.total_requests if self.total_requests > 0 else 0
+
+    @property
+    def result_rejection_rate(self) -> float:
+        return self.result_rejected / self.total_requests if self.total_requests > 0 else 0
+
+    @property
+    def blank_page_rate(self) -> float:
+        return self.blank_pages / self.total_requests if self.total_requests > 0 else 0
+
+    def stage(self, name: str) -> SojournSummary:
+        return self.sojourn.get(name, SojournSummary())
+
+    def mean_servers(self, name: str = "test") -> float:
+        """Average number of provisioned servers of a stage over the run"""
+        return self.server_time.get(name, 0.0) / self.duration if self.duration > 0 else 0
+
+    def cost_metrics(self, time_scale: float = 1.0) -> dict:
+        """Metrics dict in the shape expected by CostAnalyzer.calculate_total_cost"""
+        return {
+            "test_queue": {"blocking_rate": self.rejection_rate},
+            "result_queue": {"blocking_rate": self.result_rejection_rate},
+            "sojourn_times": {
+                stage: {
+                    "avg": self.stage(stage).avg * time_scale,
+                    # the wait penalty is integrated over the distribution when it is known
+                    **({"distribution": self.sketches[stage], "scale": time_scale}
+                       if stage in self.sketches else {}),
+                }
+                for stage in ("test_queue", "result_queue")
+            },
+        }
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunResult":
+        data = dict(data)
+        data["sojourn"] = {
+            k: SojournSummary(**v) for k, v in data.get("sojourn", {}).items()
+        }
+        data["populations"] = {
+            k: SojournSummary(**v) for k, v in data.get("populations", {}).items()
+        }
+        data["sketches"] = {
+            k: SojournSketch(**v) for k, v in data.get("sketches", {}).items()
+        }
+        return cls(**data)
+
+    def to_row(self) -> dict:
+        """Flat dict (one row of a DataFrame / CSV)"""
+        row = {
+            "engine": self.engine,
+            "total_requests": self.total_requests,
+            "completed": self.completed,
+            "test_rejected": self.test_rejected,
+            "result_rejected": self.result_rejected,
+            "backed_up": self.backed_up,
+            "rejection_rate": self.rejection_rate,
+            "blank_page_rate": self.blank_page_rate,
+            "duration": self.duration,
+            "throughput": self.throughput,
+        }
+        for prefix, summaries in (("sojourn", self.sojourn), ("pop", self.populations)):
+            for name, summary in summaries.items():
+                for key, value in asdict(summary).items():
+                    row[f"{prefix}_{name}_{key}"] = value
+        for name, value in self.utilization.items():
+            row[f"utilization_{name}"] = value
+        for name, value in self.server_time.items():
+            row[f"server_time_{name}"] = value
+        for name, value in self.retrial.items():
+            row[f"retrial_{name}"] = value
+        return row
+
+
+def windowed_summary(
+    arrival_times,
+    sojourn_times,
+    rejected_times,
+    window: float,
+    start: float = 0.0,
+    end: float = None,
+    extra_times: Dict[str, List[float]] = None,
+) -> List[dict]:
+    """
+    Break a run down by time window (jobs are assigned to the window of their arrival).
+
+    :param arrival_times: arrival time of each completed job.
+    :param sojourn_times: sojourn time of each completed job (same order).
+    :param rejected_times: arrival time of each rejected job.
+    :param window: window width.
+    :param extra_times: other event times to count per window (name -> times).
+    """
+    arrival_times = np.asarray(arrival_times, dtype=float)
+    sojourn_times = np.asarray(sojourn_times, dtype=float)
+    rejected_times = np.asarray(rejected_times, dtype=float)
+    extra_times = {k: np.asarray(v, dtype=float) for k, v in (extra_times or {}).items()}
+
+    if end is None:
+        candidates = [t.max() for t in [arrival_times, rejected_times, *extra_times.values()] if t.size]
+        end = max(candidates) if candidates else start
+    nb_windows = max(int(np.ceil((end - start) / window)), 1)
+    edges = start + window * np.arange(nb_windows + 1)
+
+    def bucket(times):
+        return np.clip(((times - start) // window).astype(int), 0, nb_windows - 1)
+
+    arrival_idx = bucket(arrival_times)
+    rejected_counts = np.bincount(bucket(rejected_times), minlength=nb_windows)
+    extra_counts = {k: np.bincount(bucket(v), minlength=nb_windows) for k, v in extra_times.items()}
+
+    rows = []
+    for i in range(nb_windows):
+        sojourns = sojourn_times[arrival_idx == i]
+        completed = int(sojourns.size)
+        rejected = int(rejected_counts[i])
+        arrivals = completed + rejected
+        row = {
+            "start": float(edges[i]),
+            "end": float(edges[i + 1]),
+            "arrivals": arrivals,
+            "arrival_rate": arrivals / window,
+            "completed": completed,
+            "rejected": rejected,
+            "rejection_rate": rejected / arrivals if arrivals > 0 else 0,
+            "avg_sojourn": float(np.mean(sojourns)) if completed else 0,
+            "p95_sojourn": float(np.percentile(sojourns, 95)) if completed else 0,
+            "max_sojourn": float(np.max(sojourns)) if completed else 0,
+        }
+        for k, counts in extra_counts.items():
+            row[k] = int(counts[i])
+        rows.append(row)
+    return rows
+
+
+def print_windowed_summary(rows: List[dict]):
+    print(f"{'window':>17} {'arrivals':>9} {'rate':>7} {'rejected':>9} {'avg':>8} {'p95':>8}")
+    for row in rows:
+        print(
+            f"[{row['start']:>7.0f},{row['end']:>7.0f}) {row['arrivals']:>9} "
+            f"{row['arrival_rate']:>7.3f} {row['rejection_rate']:>9.2%} "
+            f"{row['avg_sojourn']:>8.2f} {row['p95_sojourn']:>8.2f}"
+        )
+
+
+def print_summary(name: str, sim):
+    """
+    Print a short summary of a run.
+
+    :param name: label of the run.
+    :param sim: RunResult or any engine object exposing ``result()``.
+    """
+    result = sim if isinstance(sim, RunResult) else sim.result()
+
+    print(f"\n[{name}] ({result.engine})")
+    print(f"- Requests: {result.total_requests} (completed: {result.completed})")
+    print(f"- Rejection rate: {result.rejection_rate:.2%}")
+    print(f"- Blank page rate: {result.blank_page_rate:.2%}")
+    if result.backed_up:
+        print(f"- Backed up results: {result.backed_up}")
+    print(f"- Throughput: {result.throughput:.4f}")
+    for stage, summary in result.sojourn.items():
+        if summary.count == 0:
+            continue
+        print(
+            f"- Sojourn {stage}: avg={summary.avg:.3f} var={summary.var:.3f} "
+            f"p50={summary.p50:.3f} p95={summary.p95:.3f} p99={summary.p99:.3f}"
+        )
+    for population, summary in result.populations.items():
+        print(
+            f"- Sojourn {population}: avg={summary.avg:.3f} p95={summary.p95:.3f} "
+            f"(n={summary.count})"
+        )
+
 @dataclass
 class QueueMetrics:
     """Store metrics queue system with two queues"""
@@ -42,6 +397,8 @@ class QueueMetrics:
     system_clients: List[int] = field(default_factory=list)
     # -> backup length (results accumulation)
     backup_length: List[int] = field(default_factory=list)
+    # -> users waiting to retry a refused push at each timestamp
+    orbit_sizes: List[int] = field(default_factory=list)
 
     # ===== Timing tracking for each queue =====
     # -> used to calculate time spent waiting for testing
@@ -53,10 +410,33 @@ class QueueMetrics:
     # -> used with entry times to calculate results queue sojourn time
     result_queue_exit_times: Dict[str, float] = field(default_factory=dict)
 
+    # -> entry / exit times of the other pipeline stages (stage -> job -> time)
+    stage_entry_times: Dict[str, Dict[int, float]] = field(default_factory=dict)
+    stage_exit_times: Dict[str, Dict[int, float]] = field(default_factory=dict)
+    # -> sojourn distribution of each stage (and "total"), updated at every exit
+    sketches: Dict[str, SojournSketch] = field(default_factory=dict)
+    # -> population (promo) of each job, for the per-population sojourns
+    job_populations: Dict[int, str] = field(default_factory=dict)
+
     # ===== General =====
     test_queue_blocked: int = 0
     result_queue_blocked: int = 0
+    # -> refusals of the other pipeline stages
+    stage_blocked: Dict[str, int] = field(default_factory=dict)
+    backed_up: int = 0
     total_requests: int = 0
+    # -> time of each result saved in the backup
+    backup_times: List[float] = field(default_factory=list)
+    # -> attempts of each push that got through the pipeline
+    push_attempts: List[int] = field(default_factory=list)
+    # -> attempts of each push abandoned by its user
+    abandoned_attempts: List[int] = field(default_factory=list)
+
+    # ===== Failures =====
+    # -> (pool, server, start, end) of each server outage (pool: "test_server", "result_server")
+    outages: List[Tuple[str, int, float, float]] = field(default_factory=list)
+    # -> jobs interrupted by a failure, per pool
+    interrupted: Dict[str, int] = field(default_factory=dict)
 
     def record_state(
         self,
@@ -68,9 +448,11 @@ class QueueMetrics:
         result_queue_length: int,
         test_server_utilization: float,
         result_server_utilization: float,
+        orbit: int = 0,
     ):
         """Record system state at a given time"""
         self.timestamps.append(env_time)
+        self.orbit_sizes.append(orbit)
 
         # test queue
         self.test_server_count.append(test_agents)
@@ -90,23 +472,77 @@ class QueueMetrics:
             test_agents + result_agents + test_queue_length + result_queue_length
         )
 
+    @property
+    def offered_requests(self) -> int:
+        """Pushes that reached the test queue: admitted (total_requests) or refused"""
+        return self.total_requests + self.test_queue_blocked
+
     # === entry / exit
-    def record_test_queue_entry(self, user_id: str, time: float):
+    def record_test_queue_entry(self, user_id: int, time: float, population: Optional[str] = None):
         """Record entry to test queue"""
         self.test_queue_entry_times[user_id] = time
+        if population is not None:
+            self.job_populations[user_id] = population
         self.total_requests += 1
 
-    def record_test_queue_exit(self, user_id: str, time: float):
+    def _sketch(self, stage: str) -> SojournSketch:
+        sketch = self.sketches.get(stage)
+        if sketch is None:
+            sketch = self.sketches[stage] = SojournSketch()
+        return sketch
+
+    def record_test_queue_exit(self, user_id: int, time: float):
         """Record exit from test queue"""
         self.test_queue_exit_times[user_id] = time
+        entry = self.test_queue_entry_times.get(user_id)
+        if entry is not None:
+            self._sketch("test_queue").add(time - entry)
 
-    def record_result_queue_entry(self, user_id: str, time: float):
+    def record_result_queue_entry(self, user_id: int, time: float):
         """Record entry to result queue"""
         self.result_queue_entry_times[user_id] = time
 
-    def record_result_queue_exit(self, user_id: str, time: float):
+    def record_result_queue_exit(self, user_id: int, time: float):
         """Record exit from result queue"""
         self.result_queue_exit_times[user_id] = time
+        # same jobs as _sojourn_samples: those that went through the test queue
+        entry = self.test_queue_entry_times.get(user_id)
+        if entry is None:
+            return
+        result_entry = self.result_queue_entry_times.get(user_id)
+        if result_entry is not None:
+            self._sketch("result_queue").add(time - result_entry)
+        self._sketch("total").add(time - entry)
+
+    def record_stage_entry(self, stage: str, user_id: int, time: float, population: Optional[str] = None):
+        """Record entry to a pipeline stage"""
+        if stage == "test_queue":
+            self.record_test_queue_entry(user_id, time, population)
+        elif stage == "result_queue":
+            self.record_result_queue_entry(user_id, time)
+        else:
+            self.stage_entry_times.setdefault(stage, {})[user_id] = time
+
+    def record_stage_exit(self, stage: str, user_id: int, time: float):
+        """Record exit from a pipeline stage"""
+        if stage == "test_queue":
+            self.record_test_queue_exit(user_id, time)
+        elif stage == "result_queue":
+            self.record_result_queue_exit(user_id, time)
+        else:
+            self.stage_exit_times.setdefault(stage, {})[user_id] = time
+            entry = self.stage_entry_times.get(stage, {}).get(user_id)
+            if entry is not None:
+                self._sketch(stage).add(time - entry)
+
+    def record_stage_blocked(self, stage: str, time: float):
+        """Record a request refused by a full pipeline stage"""
+        if stage == "test_queue":
+            self.record_test_queue_blocked(time)
+        elif stage == "result_queue":
+            self.record_result_queue_blocked(time)
+        else:
+            self.stage_blocked[stage] = self.stage_blocked.get(stage, 0) + 1
 
     # ===
 
@@ -121,8 +557,140 @@ class QueueMetrics:
         self.result_queue_blocked += 1
         self.result_queue_blocked_times.append(time)
 
+    def record_backup(self, time: float):
+        """Record a blocked result saved in the backup"""
+        self.backed_up += 1
+        self.backup_times.append(time)
+
+    def record_push(self, attempts: int, served: bool):
+        """Record the attempts of a push, served or abandoned after refusals"""
+        if served:
+            self.push_attempts.append(attempts)
+        else:
+            self.abandoned_attempts.append(attempts)
+
+    def retrial_summary(self, duration: float) -> Dict[str, float]:
+        """Orbit size, attempts per push and offered / effective / fresh push rates"""
+        pushes = len(self.push_attempts) + len(self.abandoned_attempts)
+        if pushes == 0 or duration <= 0:
+            return {}
+        attempts = self.push_attempts + self.abandoned_attempts
+        # every attempt reaches the test queue
+        offered = self.offered_requests
+        return {
+            "orbit_avg": float(np.mean(self.orbit_sizes)) if self.orbit_sizes else 0.0,
+            "orbit_max": float(max(self.orbit_sizes, default=0)),
+            "attempts_avg": float(np.mean(attempts)),
+            "attempts_max": float(max(attempts)),
+            "abandoned": float(len(self.abandoned_attempts)),
+            "abandon_rate": len(self.abandoned_attempts) / pushes,
+            "fresh_rate": pushes / duration,
+            "offered_rate": offered / duration,
+            "effective_rate": self.total_requests / duration,
+            "retry_ratio": 1 - pushes / offered if offered > 0 else 0.0,
+        }
+
+    def record_outage(self, pool: str, server: int, start: float, end: float):
+        """Record a server outage (failure to repair)"""
+        self.outages.append((pool, server, start, end))
+
+    def record_interrupted(self, pool: str, time: float):
+        """Record a job interrupted by a server failure"""
+        self.interrupted[pool] = self.interrupted.get(pool, 0) + 1
+
     # ===
 
+    def _sojourn_samples(self) -> Dict[str, List[float]]:
+        """Per-stage and per-population sojourn samples"""
+        samples = {
+            "test_queue": [],
+            "result_queue": [],
+            "total": [],
+            "PREPA": [],
+            "ING": [],
+        }
+
+        for user_id, entry in self.test_queue_entry_times.items():
+            if user_id in self.test_queue_exit_times:
+                samples["test_queue"].append(self.test_queue_exit_times[user_id] - entry)
+
+            if (
+                user_id in self.result_queue_entry_times
+                and user_id in self.result_queue_exit_times
+            ):
+                samples["result_queue"].append(
+                    self.result_queue_exit_times[user_id]
+                    - self.result_queue_entry_times[user_id]
+                )
+
+            if user_id in self.result_queue_exit_times:
+                total_time = self.result_queue_exit_times[user_id] - entry
+                samples["total"].append(total_time)
+                population = self.job_populations.get(user_id)
+                if population in ("PREPA", "ING"):
+                    samples[population].append(total_time)
+
+        for stage, entries in self.stage_entry_times.items():
+            exits = self.stage_exit_times.get(stage, {})
+            samples[stage] = [exits[job] - entry for job, entry in entries.items() if job in exits]
+
+        return samples
+
+    def to_result(self, engine: str) -> RunResult:
+        """Build the compact RunResult of this run"""
+        samples = self._sojourn_samples()
+        duration = self.timestamps[-1] - self.timestamps[0] if self.timestamps else 0
+        completed = len(samples["total"])
+
+        return RunResult(
+            engine=engine,
+            total_requests=self.offered_requests,
+            completed=completed,
+            test_rejected=self.test_queue_blocked,
+            result_rejected=self.result_queue_blocked,
+            backed_up=self.backed_up,
+            duration=float(duration),
+            throughput=completed / duration if duration > 0 else 0,
+            sojourn={
+                stage: SojournSummary.from_samples(samples[stage])
+                for stage in ("test_queue", "result_queue", "total", *self.stage_entry_times)
+            },
+            sketches={
+                stage: replace(self.sketches[stage], bins=dict(self.sketches[stage].bins))
+                if stage in self.sketches else SojournSketch()
+                for stage in ("test_queue", "result_queue", "total", *self.stage_entry_times)
+            },
+            populations={
+                pop: SojournSummary.from_samples(samples[pop])
+                for pop in ("ING", "PREPA")
+                if samples[pop]
+            },
+            utilization={
+                "test": float(np.mean(self.test_server_utilization)) if self.test_server_utilization else 0,
+                "result": float(np.mean(self.result_server_utilization)) if self.result_server_utilization else 0,
+            },
+            retrial=self.retrial_summary(duration),
+        )
+
+    def windowed_metrics(self, window: float) -> List[dict]:
+        """Per-time-window breakdown of arrivals, refusals, blank pages and sojourn"""
+        arrivals = []
+        sojourns = []
+        for user_id, entry in self.test_queue_entry_times.items():
+            if user_id in self.result_queue_exit_times:
+                arrivals.append(entry)
+                sojourns.append(self.result_queue_exit_times[user_id] - entry)
+
+        return windowed_summary(
+            arrivals,
+            sojourns,
+            self.test_queue_blocked_times,
+            window,
+            start=self.timestamps[0] if self.timestamps else 0.0,
+            end=self.timestamps[-1] if self.timestamps else None,
+            extra_times={"result_blocked": self.result_queue_blocked_times},
+        )
+
     def calculate_metrics(self) -> dict:
         """Calculate all metrics"""
         metrics = {}
@@ -135,8 +703,8 @@ class QueueMetrics:
             "avg_utilization": np.mean(self.test_server_utilization),
             "var_utilization": np.var(self.test_server_utilization),
             "blocking_rate": (
-                self.test_queue_blocked / self.total_requests
-                if self.total_requests > 0
+                self.test_queue_blocked / self.offered_requests
+                if self.offered_requests > 0
                 else 0
             ),
         }
@@ -149,44 +717,17 @@ class QueueMetrics:
             "avg_utilization": np.mean(self.result_server_utilization),
             "var_utilization": np.var(self.result_server_utilization),
             "blocking_rate": (
-                self.result_queue_blocked / self.total_requests
-                if self.total_requests > 0
+                self.result_queue_blocked / self.offered_requests
+                if self.offered_requests > 0
                 else 0
             ),
         }
 
         # Calculate sojourn times for each queue
-        test_sojourn_times = []
-        result_sojourn_times = []
-        total_sojourn_times = []
-
-        for user_id in self.test_queue_entry_times:
-            # test-queue sojourn time
-            if user_id in self.test_queue_exit_times:
-                test_time = (
-                    self.test_queue_exit_times[user_id]
-                    - self.test_queue_entry_times[user_id]
-                )
-                test_sojourn_times.append(test_time)
-
-            # result-queue sojourn time
-            if (
-                user_id in self.result_queue_entry_times
-                and user_id in self.result_queue_exit_times
-            ):
-                result_time = (
-                    self.result_queue_exit_times[user_id]
-                    - self.result_queue_entry_times[user_id]
-                )
-                result_sojourn_times.append(result_time)
-
-            # total system sojourn time
-            if user_id in self.result_queue_exit_times:
-                total_time = (
-                    self.result_queue_exit_times[user_id]
-                    - self.test_queue_entry_times[user_id]
-                )
-                total_sojourn_times.append(total_time)
+        samples = self._sojourn_samples()
+        test_sojourn_times = samples["test_queue"]
+        result_sojourn_times = samples["result_queue"]
+        total_sojourn_times = samples["total"]
 
         # Add sojourn time metrics
         metrics["sojourn_times"] = {
@@ -230,6 +771,9 @@ class QueueMetrics:
 
     def plot_metrics(self, save_filename: str = "metrics.png"):
         """Generate improved plots for all metrics with better visual separation"""
+        # matplotlib (slow to import) only when plotting
+        import matplotlib.pyplot as plt
+
         fig = plt.figure(figsize=(20, 15))
         gs = fig.add_gridspec(6, 2, hspace=0.6, wspace=0.3)
         print(f"\n=== PLOTS: {save_filename} ===")
@@ -283,42 +827,15 @@ class QueueMetrics:
 
         # Sojourn times distribution
         ax4 = fig.add_subplot(gs[2, 0])
-        test_sojourn_times = []
-        result_sojourn_times = []
-        total_sojourn_times = []
-        total_prepa_sojourn_times = []
-        total_ing_sojourn_times = []
-
-        for user_id in self.test_queue_entry_times:
-            if user_id in self.test_queue_exit_times:
-                test_time = (
-                    self.test_queue_exit_times[user_id]
-                    - self.test_queue_entry_times[user_id]
-                )
-                test_sojourn_times.append(test_time)
-
-            if (
-                user_id in self.result_queue_entry_times
-                and user_id in self.result_queue_exit_times
-            ):
-                result_time = (
-                    self.result_queue_exit_times[user_id]
-                    - self.result_queue_entry_times[user_id]
-                )
-                result_sojourn_times.append(result_time)
-
-            if user_id in self.result_queue_exit_times:
-                total_time = (
-                    self.result_queue_exit_times[user_id]
-                    - self.test_queue_entry_times[user_id]
-                )
-
-                if 'PREPA' in user_id[:5]:
-                    total_prepa_sojourn_times.append(total_time)
-                elif 'ING' in user_id[:3]:
-                    total_ing_sojourn_times.append(total_time)
-                else:
-                    total_sojourn_times.append(total_time)
+        samples = self._sojourn_samples()
+        test_sojourn_times = samples["test_queue"]
+        result_sojourn_times = samples["result_queue"]
+        total_prepa_sojourn_times = samples["PREPA"]
+        total_ing_sojourn_times = samples["ING"]
+        if total_prepa_sojourn_times or total_ing_sojourn_times:
+            total_sojourn_times = []
+        else:
+            total_sojourn_times = samples["total"]
 
         # 4
         ax4.hist(
@@ -0,0 +1,297 @@
+import argparse
+import cProfile
+import importlib
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import simpy
+
+MODES = ("deterministic", "sampling")
+
+
+def _label(filename: str, lineno: int, name: str) -> str:
+    """Function name of the tables and the folded stacks (no ';', the stack separator)"""
+    if filename == "~":
+        # C function (built-in)
+        return name.replace(";", ",")
+    if filename.startswith("<"):
+        location = filename
+    else:
+        try:
+            location = os.path.relpath(filename)
+        except ValueError:
+            location = filename
+        if location.startswith(".."):
+            location = os.path.basename(filename)
+    return f"{name} ({location}:{lineno})".replace(";", ",")
+
+
+class SimulationProfiler:
+    """
+    Profile of the simulation phase only: while the profiler is active, every
+    ``simpy.Environment.run`` call is profiled, everything else (model set-up,
+    metrics, plots) is not.
+
+    - "deterministic": cProfile, exact call counts and times;
+    - "sampling": the stack of the simulating thread is sampled every ``interval``
+      seconds by a background thread, low overhead.
+
+    :param mode: "deterministic" or "sampling".
+    :param interval: sampling period (sampling mode).
+    """
+
+    def __init__(self, mode: str = "deterministic", interval: float = 0.005):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.profile = cProfile.Profile() if mode == "deterministic" else None
+        self.samples: Counter = Counter()
+        self.runs = 0
+        self._depth = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+        self._original_run = None
+
+    def __enter__(self):
+        self._original_run = original_run = simpy.Environment.run
+        profiler = self
+
+        def profiled_run(env, until=None):
+            # a nested run (e.g. a process calling env.run again) stays in the same profile
+            if profiler._depth:
+                return original_run(env, until)
+            profiler._start()
+            try:
+                return original_run(env, until)
+            finally:
+                profiler._finish()
+
+        simpy.Environment.run = profiled_run
+        if self.mode == "sampling":
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        simpy.Environment.run = self._original_run
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        return False
+
+    def _start(self):
+        self._depth += 1
+        self.runs += 1
+        if self.profile is not None:
+            self.profile.enable()
+        else:
+            self._thread_id = threading.get_ident()
+
+    def _finish(self):
+        if self.profile is not None:
+            self.profile.disable()
+        else:
+            self._thread_id = None
+        self._depth -= 1
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            thread_id = self._thread_id
+            if thread_id is None:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.samples[tuple(reversed(stack))] += 1
+
+    def save(self, directory, name: str) -> Path:
+        """
+        Write the raw profile of this process in ``directory/parts`` (one file per
+        worker and call: ``<name>.<pid>.<n>.prof`` or ``.folded``), for merge_profiles.
+        """
+        parts = Path(directory) / "parts"
+        parts.mkdir(parents=True, exist_ok=True)
+        stem = f"{name}.{os.getpid()}.{len(list(parts.glob(f'{name}.{os.getpid()}.*')))}"
+        if self.profile is not None:
+            path = parts / f"{stem}.prof"
+            self.profile.dump_stats(path)
+        else:
+            path = parts / f"{stem}.folded"
+            # folded counts in microseconds, like the deterministic mode
+            weight = self.interval * 1e6
+            _write_folded(path, {stack: count * weight for stack, count in self.samples.items()})
+        return path
+
+
+def _write_folded(path, folded: Dict[Tuple[str, ...], float]):
+    with open(path, "w") as f:
+        for stack, value in sorted(folded.items()):
+            if round(value) > 0:
+                f.write(f"{';'.join(stack)} {round(value)}\n")
+
+
+def _read_folded(path) -> Counter:
+    folded = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, value = line.rstrip("\n").rpartition(" ")
+            if stack:
+                folded[tuple(stack.split(";"))] += float(value)
+    return folded
+
+
+def folded_from_stats(stats: pstats.Stats, min_fraction: float = 1e-4) -> Counter:
+    """
+    Folded stacks (microseconds) rebuilt from the caller graph of a cProfile
+    profile: the time of each function is split between its call paths in
+    proportion to the time of each call edge. Recursive calls are folded into
+    the first occurrence of the function on the path, and paths worth less than
+    ``min_fraction`` of the total time are dropped.
+    """
+    entries = stats.stats
+    children = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    total = sum(entries[func][3] for func in roots)
+    folded = Counter()
+
+    def walk(func, path, time):
+        _, _, tt, ct, _ = entries[func]
+        scale = time / ct if ct > 0 else 0.0
+        path = path + (_label(*func),)
+        folded[path] += tt * scale * 1e6
+        for child, edge_time in children.get(func, ()):
+            child_time = edge_time * scale
+            if child_time < min_fraction * total or _label(*child) in path:
+                continue
+            walk(child, path, child_time)
+
+    for root in roots:
+        walk(root, (), entries[root][3])
+    return folded
+
+
+def _table_from_folded(folded: Counter, top: int) -> str:
+    self_time, total_time = Counter(), Counter()
+    for stack, value in folded.items():
+        self_time[stack[-1]] += value
+        for func in set(stack):
+            total_time[func] += value
+    grand_total = sum(folded.values()) or 1.0
+    lines = [f"{'self %':>7} {'self (s)':>10} {'total (s)':>10}  function"]
+    for func, value in self_time.most_common(top):
+        lines.append(
+            f"{value / grand_total:>7.1%} {value / 1e6:>10.4f} {total_time[func] / 1e6:>10.4f}  {func}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _table_from_stats(stats: pstats.Stats, top: int) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("tottime").print_stats(top)
+    stats.sort_stats("cumulative").print_stats(top)
+    return stream.getvalue()
+
+
+def reset_profiles(directory):
+    """Remove the per-worker profiles of a previous call (before a new sweep)"""
+    for part in (Path(directory) / "parts").glob("*"):
+        part.unlink()
+
+
+def merge_profiles(directory, top: int = 30) -> Dict[str, Path]:
+    """
+    Merge the per-worker profiles of ``directory/parts`` into one report:
+    ``hot_functions.txt`` (hot-function table), ``profile.folded`` (input of
+    flamegraph.pl, speedscope or inferno) and, for cProfile parts, ``profile.prof``
+    (pstats, snakeviz).
+
+    :return: report name -> path.
+    """
+    directory = Path(directory)
+    parts = directory / "parts"
+    report = {"hot_functions": directory / "hot_functions.txt", "folded": directory / "profile.folded"}
+    prof_parts = sorted(parts.glob("*.prof"))
+    if prof_parts:
+        stats = pstats.Stats(*map(str, prof_parts))
+        report["prof"] = directory / "profile.prof"
+        stats.dump_stats(report["prof"])
+        folded = folded_from_stats(stats)
+        table = _table_from_stats(stats, top)
+    else:
+        folded = Counter()
+        for part in sorted(parts.glob("*.folded")):
+            folded.update(_read_folded(part))
+        table = _table_from_folded(folded, top)
+    header = f"{len(prof_parts) or len(list(parts.glob('*.folded')))} profile(s) merged\n\n"
+    with open(report["hot_functions"], "w") as f:
+        f.write(header + table)
+    _write_folded(report["folded"], folded)
+    return report
+
+
+def profile_call(
+    func: Callable,
+    *args,
+    mode: str = "deterministic",
+    directory=None,
+    interval: float = 0.005,
+    merge: bool = True,
+    top: int = 30,
+    **kwargs,
+):
+    """
+    Run a scenario function (analyze_waterfall, compare_all_architectures,
+    exec_simulations...) with the simulation phase profiled.
+
+    :param mode: "deterministic" (cProfile) or "sampling".
+    :param directory: output of the profile (default output/profiles/<function>).
+    :param merge: write the merged report (after removing the parts of a previous
+        call); False in a sweep worker, the parent calls reset_profiles before the
+        sweep and merge_profiles once every worker is done.
+    :return: the function's return value.
+    """
+    directory = Path(directory or f"output/profiles/{func.__name__}")
+    if merge:
+        reset_profiles(directory)
+    profiler = SimulationProfiler(mode, interval)
+    with profiler:
+        result = func(*args, **kwargs)
+    profiler.save(directory, func.__name__)
+    if merge:
+        report = merge_profiles(directory, top)
+        print(f"Profile ({mode}, {profiler.runs} simulation runs): {report['hot_functions']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the simulation phase of a scenario function")
+    parser.add_argument("target", help="module:function, ex: src.scenarios.scenario1_waterfall:analyze_waterfall")
+    parser.add_argument("--mode", choices=MODES, default="deterministic")
+    parser.add_argument("--interval", type=float, default=0.005, help="sampling period (s)")
+    parser.add_argument("--output", default=None, help="output directory (default output/profiles/<function>)")
+    parser.add_argument("--top", type=int, default=30)
+    args = parser.parse_args()
+    module, _, name = args.target.partition(":")
+    func = getattr(importlib.import_module(module), name)
+    profile_call(func, mode=args.mode, directory=args.output, interval=args.interval, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import io
+import os
+import random
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class Task:
+    """
+    Node of a task graph.
+
+    :param name: task id (dependencies, report).
+    :param func: function without arguments, picklable (module-level) to run in a worker.
+    :param deps: tasks that must succeed before this one starts.
+    :param seed: seed of random / numpy.random at the start of the task (None: left as is),
+        so that the result does not depend on the tasks run before in the same worker.
+    """
+
+    name: str
+    func: Callable[[], object]
+    deps: Tuple[str, ...] = ()
+    seed: Optional[int] = 42
+
+
+@dataclass
+class TaskResult:
+    name: str
+    # stdout and stderr of the task, captured in the worker
+    output: str
+    start: float
+    end: float
+    error: Optional[str] = None
+    pid: Optional[int] = None
+
+    @property
+    def wall(self) -> float:
+        return self.end - self.start
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _execute(func: Callable[[], object], seed: Optional[int]):
+    """Run a task with its output captured (in a worker: the capture only affects this process)"""
+    if seed is not None:
+        import numpy as np
+
+        random.seed(seed)
+        np.random.seed(seed)
+    buffer = io.StringIO()
+    error = None
+    start = time.time()
+    with redirect_stdout(buffer), redirect_stderr(buffer):
+        try:
+            func()
+        except Exception:
+            error = traceback.format_exc()
+    return buffer.getvalue(), start, time.time(), error, os.getpid()
+
+
+def check_graph(tasks: Sequence[Task]) -> List[str]:
+    """
+    Validate the graph (unknown dependencies, cycles).
+
+    :return: task names in a topological order.
+    """
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        for dep in task.deps:
+            if dep not in by_name:
+                raise ValueError(f"Task {task.name} depends on unknown task {dep}")
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for task in tasks:
+        visit(task.name, [])
+    return order
+
+
+def run_graph(
+    tasks: Sequence[Task],
+    workers: Optional[int] = None,
+    on_done: Optional[Callable[[TaskResult], None]] = None,
+) -> Dict[str, TaskResult]:
+    """
+    Run a task graph on a process pool: a task is submitted as soon as all its
+    dependencies have succeeded; the dependents of a failed task are skipped.
+
+    :param workers: processes of the pool (None: one per core).
+    :param on_done: called in the parent with each result, in completion order.
+    :return: name -> result, in the order of ``tasks``.
+    """
+    check_graph(tasks)
+    by_name = {task.name: task for task in tasks}
+    results: Dict[str, TaskResult] = {}
+    pending = list(by_name)
+
+    def finish(result: TaskResult):
+        results[result.name] = result
+        if on_done is not None:
+            on_done(result)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                deps = by_name[name].deps
+                failed = [dep for dep in deps if dep in results and not results[dep].ok]
+                if failed:
+                    pending.remove(name)
+                    now = time.time()
+                    finish(TaskResult(name, "", now, now, error=f"skipped: dependency {failed[0]} failed"))
+                elif all(dep in results for dep in deps):
+                    pending.remove(name)
+                    task = by_name[name]
+                    running[pool.submit(_execute, task.func, task.seed)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    output, start, end, error, pid = future.result()
+                except Exception:
+                    # dead worker or task that cannot be pickled
+                    now = time.time()
+                    output, start, end, error, pid = "", now, now, traceback.format_exc(), None
+                finish(TaskResult(name, output, start, end, error, pid))
+    return {task.name: results[task.name] for task in tasks}
+
+
+def critical_path(tasks: Sequence[Task], results: Dict[str, TaskResult]) -> Tuple[float, List[str]]:
+    """Longest chain of task wall times along the dependencies (the best possible total time)"""
+    by_name = {task.name: task for task in tasks}
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    for name in check_graph(tasks):
+        before = max((best[dep] for dep in by_name[name].deps), default=(0.0, []), key=lambda b: b[0])
+        best[name] = (before[0] + results[name].wall, before[1] + [name])
+    return max(best.values(), key=lambda b: b[0], default=(0.0, []))
+
+
+def print_timings(tasks: Sequence[Task], results: Dict[str, TaskResult], total: float):
+    origin = min((r.start for r in results.values()), default=0.0)
+    print(f"\n{'task':<45} {'start':>7} {'wall':>8}  status")
+    for task in tasks:
+        result = results[task.name]
+        status = "ok" if result.ok else result.error.splitlines()[0] if result.error.startswith("skipped") else "FAILED"
+        print(f"{task.name:<45} {result.start - origin:>6.1f}s {result.wall:>7.1f}s  {status}")
+    length, path = critical_path(tasks, results)
+    work = sum(r.wall for r in results.values())
+    print(
+        f"\nTotal {total:.1f}s for {work:.1f}s of work (x{work / total if total > 0 else 0:.1f}), "
+        f"critical path {length:.1f}s: {' -> '.join(path)}"
+    )
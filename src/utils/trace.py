@@ -0,0 +1,212 @@
+import json
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from src.utils.metrics import SojournSketch
+
+# Per-job record: one row per push tag (refused, backed up or served)
+JOB_DTYPE = np.dtype(
+    [
+        # commit id: a backed-up commit has two rows (backup, then delivery) with the same id
+        ("job", "i8"),
+        ("user", "i4"),
+        ("promo", "i1"),
+        ("exo", "i2"),
+        ("test_entry", "f8"),
+        ("test_exit", "f8"),
+        ("result_entry", "f8"),
+        ("result_exit", "f8"),
+        # -> 1 passed, 0 failed, -1 unknown (refused before the result)
+        ("passed", "i1"),
+        ("blocked_test", "?"),
+        ("blocked_result", "?"),
+        ("backup", "?"),
+    ]
+)
+
+# System state sampled by collect_metrics
+STATE_DTYPE = np.dtype(
+    [
+        ("time", "f8"),
+        ("test_agents", "i4"),
+        ("test_queue_length", "i4"),
+        ("backup_length", "i4"),
+        ("result_agents", "i4"),
+        ("result_queue_length", "i4"),
+        ("test_server_utilization", "f4"),
+        ("result_server_utilization", "f4"),
+    ]
+)
+
+PROMOS = ("ING", "PREPA")
+
+
+class _ColumnTable:
+    """Append-only table stored as one raw binary file per column"""
+
+    def __init__(self, directory: Path, dtype: np.dtype, chunk_size: int):
+        self.directory = directory
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.buffer = np.zeros(chunk_size, dtype=dtype)
+        self.fill = 0
+        self.count = 0
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.files = {
+            name: open(directory / f"{name}.bin", "wb") for name in dtype.names
+        }
+
+    def append(self, row: tuple):
+        self.buffer[self.fill] = row
+        self.fill += 1
+        if self.fill == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.fill == 0:
+            return
+        chunk = self.buffer[: self.fill]
+        for name, f in self.files.items():
+            np.ascontiguousarray(chunk[name]).tofile(f)
+        self.count += self.fill
+        self.fill = 0
+
+    def close(self) -> dict:
+        self.flush()
+        for f in self.files.values():
+            f.close()
+        return {
+            "count": self.count,
+            "columns": {name: self.dtype[name].str for name in self.dtype.names},
+        }
+
+
+class TraceWriter:
+    """
+    Stream per-job records and state samples of a run to a columnar directory.
+
+    Rows are buffered and written in chunks of ``chunk_size`` so the writer
+    never holds more than one chunk per table in memory. The run itself still
+    keeps the per-job timestamps of QueueMetrics (the metrics and the plots
+    need them): the trace bounds memory during the analysis, through
+    ``load_trace`` and its memory-mapped columns, not during the run.
+
+    :param directory: output directory (created if needed).
+    :param chunk_size: number of rows buffered before a write.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 65536):
+        self.directory = Path(directory)
+        self.jobs = _ColumnTable(self.directory / "jobs", JOB_DTYPE, chunk_size)
+        self.states = _ColumnTable(self.directory / "states", STATE_DTYPE, chunk_size)
+        self.closed = False
+
+    def write_job(
+        self,
+        job: int,
+        user: int,
+        promo: str,
+        exo: int,
+        test_entry: float = np.nan,
+        test_exit: float = np.nan,
+        result_entry: float = np.nan,
+        result_exit: float = np.nan,
+        passed: int = -1,
+        blocked_test: bool = False,
+        blocked_result: bool = False,
+        backup: bool = False,
+    ):
+        self.jobs.append(
+            (
+                job,
+                user,
+                PROMOS.index(promo) if promo in PROMOS else -1,
+                exo,
+                test_entry,
+                test_exit,
+                result_entry,
+                result_exit,
+                passed,
+                blocked_test,
+                blocked_result,
+                backup,
+            )
+        )
+
+    def write_state(self, *values):
+        """Append a state sample (fields in STATE_DTYPE order)"""
+        self.states.append(values)
+
+    def close(self):
+        if self.closed:
+            return
+        meta = {
+            "promos": list(PROMOS),
+            "jobs": self.jobs.close(),
+            "states": self.states.close(),
+        }
+        with open(self.directory / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2)
+        self.closed = True
+
+
+def load_trace(directory: str, mmap: bool = True) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Load a trace written by TraceWriter.
+
+    :param directory: trace directory.
+    :param mmap: memory-map the columns instead of reading them in RAM.
+    :return: {"jobs": {column: array}, "states": {column: array}}
+    """
+    directory = Path(directory)
+    with open(directory / "meta.json") as f:
+        meta = json.load(f)
+
+    tables = {}
+    for table in ("jobs", "states"):
+        count = meta[table]["count"]
+        columns = {}
+        for name, dtype in meta[table]["columns"].items():
+            path = directory / table / f"{name}.bin"
+            if mmap and count > 0:
+                columns[name] = np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+            else:
+                columns[name] = np.fromfile(path, dtype=dtype, count=count)
+        tables[table] = columns
+    return tables
+
+
+def sojourn_sketch_from_trace(
+    directory: str, stage: str = "total", alpha: float = 0.01, chunk_size: int = 1 << 20
+) -> SojournSketch:
+    """
+    Sojourn distribution of one stage, streamed chunk by chunk from the job table.
+
+    :param stage: "test_queue", "result_queue" or "total".
+    """
+    jobs = load_trace(directory)["jobs"]
+    entry, exit_ = {
+        "test_queue": ("test_entry", "test_exit"),
+        "result_queue": ("result_entry", "result_exit"),
+        "total": ("test_entry", "result_exit"),
+    }[stage]
+    sketch = SojournSketch(alpha=alpha)
+    for start in range(0, len(jobs[entry]), chunk_size):
+        stop = start + chunk_size
+        # jobs refused or still in flight have a NaN bound and are skipped
+        sketch.add_many(np.asarray(jobs[exit_][start:stop]) - np.asarray(jobs[entry][start:stop]))
+    return sketch
+
+
+def trace_to_dataframe(directory: str, table: str = "jobs"):
+    """Load one table of a trace as a pandas DataFrame"""
+    import pandas as pd
+
+    columns = load_trace(directory)[table]
+    df = pd.DataFrame({name: np.asarray(col) for name, col in columns.items()})
+    if table == "jobs":
+        df["promo"] = pd.Categorical.from_codes(df["promo"], categories=PROMOS)
+    return df